@@ -0,0 +1,4 @@
+"""
+Benchmarks of the file validation, run as modules from the repository
+root, e.g. python -m benchmarks.bench_throughput
+"""
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of the numeric checks: the former eval() based helpers
+against the single pass classifier and its batch variant.
+
+Usage: python -m benchmarks.bench_numeric [count]
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import random
+import sys
+import timeit
+from validatefile import helper
+
+
+def evalkind(value: str) -> int:
+    """
+    Function that classifies a value the way the eval() based helpers did
+    """
+    try:
+        val = eval(value)
+    except Exception:
+        return helper.NOTNUMERIC
+    if isinstance(val, int):
+        return helper.INTEGER
+    if isinstance(val, float):
+        return helper.DECIMAL
+    return helper.NOTNUMERIC
+
+
+def samplevalues(count: int) -> list:
+    """
+    Function that generates a mix of integers, decimals and text
+    """
+    rnd = random.Random(0)
+    makers = (lambda: str(rnd.randint(-10 ** 6, 10 ** 6)),
+              lambda: '{0:.2f}'.format(rnd.uniform(-1000, 1000)),
+              lambda: rnd.choice(['N/A', 'abc', '12a', '1,000', '']))
+    return [rnd.choice(makers)() for _ in range(count)]
+
+
+def main(count: int = 100000) -> None:
+    values = samplevalues(count=count)
+    assert [evalkind(v) for v in values] == \
+        [helper.classifynumber(v) for v in values] == \
+        helper.classifynumbers(values)
+    timings = {
+        # A field listed under NumericCheck, IntegerCheck and DecimalCheck
+        # used to be eval'd once per check
+        'eval x3': lambda: [(evalkind(v), evalkind(v), evalkind(v))
+                            for v in values],
+        'eval x1': lambda: [evalkind(v) for v in values],
+        'classifynumber': lambda: [helper.classifynumber(v) for v in values],
+        'classifynumbers': lambda: helper.classifynumbers(values)
+    }
+    base = None
+    for name, func in timings.items():
+        best = min(timeit.repeat(func, number=1, repeat=3))
+        base = base or best
+        print('{name:<16} {rate:>12,.0f} values/s {speedup:>7.1f}x'
+              .format(name=name, rate=count / best, speedup=base / best))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,67 @@
+"""
+Benchmark of the startup cost: importing the package, constructing a
+ValidateFile with and without the config cache, and validating a single
+record end to end.
+
+Usage: python -m benchmarks.bench_startup [configfile]
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+from validatefile.main import ValidateFile
+
+
+def importtime() -> float:
+    """
+    Function that times importing the package in a fresh interpreter,
+    less the interpreter startup
+    """
+    def run(code):
+        return min(timeit.repeat(
+            lambda: subprocess.run([sys.executable, '-c', code], check=True),
+            number=1, repeat=5))
+    return run('import validatefile.main') - run('pass')
+
+
+def main(configfile: str = None) -> None:
+    configfile = configfile or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests',
+        'static', 'fieldchecks.ini')
+    with tempfile.TemporaryDirectory() as tempdir:
+        sourcefile = os.path.join(tempdir, 'sample_20200301.csv')
+        with open(sourcefile, 'w') as fo:
+            fo.write('Id,firstname,count\n1,Ram,1\n')
+        cachedir = os.path.join(tempdir, 'cache')
+        os.mkdir(cachedir)
+        # Fill the cache
+        ValidateFile(configfile=configfile, sourcefile=sourcefile,
+                     cachedir=cachedir)
+        timings = {
+            'import': importtime,
+            'construct': lambda: ValidateFile(configfile=configfile,
+                                              sourcefile=sourcefile),
+            'construct cached': lambda: ValidateFile(
+                configfile=configfile, sourcefile=sourcefile,
+                cachedir=cachedir),
+            'first result': lambda: ValidateFile(
+                configfile=configfile, sourcefile=sourcefile,
+                cachedir=cachedir).getresult()
+        }
+        for name, func in timings.items():
+            if name == 'import':
+                best = func()
+            else:
+                best = min(timeit.repeat(func, number=1, repeat=20))
+            print('{name:<18} {ms:>10.2f} ms'.format(name=name,
+                                                     ms=best * 1000))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
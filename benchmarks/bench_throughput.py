@@ -0,0 +1,198 @@
+"""
+Benchmark of getresult() on a synthetic feed: throughput, peak RSS and
+startup time across worker counts, with and without output file. Each
+measurement runs in a fresh interpreter so its peak RSS is its own. The
+results are saved as json, and can be compared with the ones of another
+version.
+
+Usage: python -m benchmarks.bench_throughput [--rows N] [--columns N]
+           [--checks EmptyCheck,FormatCheck,...] [--errorrate F]
+           [--cardinality N] [--workers 1,2,4] [--repeat N]
+           [--output results.json] [--compare previous.json]
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+from benchmarks import feed
+
+
+def peakrss(who: int) -> float:
+    """
+    Function that returns the peak RSS in MiB of the process or of its
+    largest waited for child
+    """
+    rss = resource.getrusage(who).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def measure(configfile: str, sourcefile: str, workers: int, output: bool,
+            repeat: int) -> dict:
+    """
+    Function that measures a single setting, meant to run in a fresh
+    interpreter. Startup covers importing the package, starting the
+    workers and validating a single record
+    """
+    start = time.perf_counter()
+    from validatefile.main import ValidateFile
+    tempdir = tempfile.mkdtemp()
+    try:
+        tiny = os.path.join(tempdir, feed.FILENAME)
+        with open(sourcefile, encoding='utf-8') as fi, \
+                open(tiny, 'w', encoding='utf-8') as fo:
+            fo.write(fi.readline() + fi.readline())
+        with Pool(processes=workers) as pool:
+            ValidateFile(configfile=configfile,
+                         sourcefile=tiny).getresult(pool=pool)
+            startup = time.perf_counter() - start
+            val = ValidateFile(configfile=configfile, sourcefile=sourcefile)
+            best = None
+            for _ in range(repeat):
+                outputdir = tempfile.mkdtemp(dir=tempdir) if output else None
+                start = time.perf_counter()
+                res = val.getresult(outputdir=outputdir, pool=pool)
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+                if outputdir:
+                    shutil.rmtree(outputdir)
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree(tempdir, ignore_errors=True)
+    rows = res['Results']['TotalRecordsAnalysed']
+    size = os.path.getsize(sourcefile)
+    return {'Workers': workers,
+            'Output': output,
+            'Seconds': best,
+            'RowsPerSecond': rows / best,
+            'BytesPerSecond': size / best,
+            'StartupSeconds': startup,
+            'ParentPeakRSSMiB': peakrss(resource.RUSAGE_SELF),
+            'WorkerPeakRSSMiB': peakrss(resource.RUSAGE_CHILDREN)}
+
+
+def revision() -> str:
+    """
+    Function that returns the git revision of the tree, if any
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, parameters: dict, previous: dict) -> None:
+    """
+    Function that prints the throughput of each setting against the one
+    of previous results
+    """
+    before = {(r['Workers'], r['Output']): r for r in previous['Results']}
+    print('Against {rev}'.format(rev=previous.get('Revision')))
+    if previous.get('Parameters') != parameters:
+        print('The feed parameters differ: {params}'
+              .format(params=previous.get('Parameters')))
+    for r in results:
+        old = before.get((r['Workers'], r['Output']))
+        if old:
+            print('{workers:>3} workers {output:<9} {ratio:>7.2f}x'
+                  .format(workers=r['Workers'],
+                          output='output' if r['Output'] else 'no output',
+                          ratio=r['RowsPerSecond'] / old['RowsPerSecond']))
+
+
+def parseargs(argv: list):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.bench_throughput')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--columns', type=int, default=12)
+    parser.add_argument('--checks', default=','.join(feed.CHECKS),
+                        help='comma separated checks given to the columns'
+                        ' in turn, "none" for a column without rules')
+    parser.add_argument('--errorrate', type=float, default=0.01)
+    parser.add_argument('--cardinality', type=int, default=None)
+    parser.add_argument('--workers', default=None,
+                        help='comma separated worker counts, 1 to the cpu'
+                        ' count by powers of 2 by default')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_throughput.json')
+    parser.add_argument('--compare', default=None)
+    parser.add_argument('--measure', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> None:
+    args = parseargs(argv if argv is not None else sys.argv[1:])
+    if args.measure:
+        print(json.dumps(measure(**json.loads(args.measure))))
+        return
+    if args.workers:
+        workers = [int(w) for w in args.workers.split(',')]
+    else:
+        workers = [1]
+        while workers[-1] * 2 <= (os.cpu_count() or 1):
+            workers.append(workers[-1] * 2)
+    checks = tuple(None if c == 'none' else c
+                   for c in args.checks.split(','))
+    parameters = {'Rows': args.rows, 'Columns': args.columns,
+                  'Checks': args.checks.split(','),
+                  'ErrorRate': args.errorrate,
+                  'Cardinality': args.cardinality, 'Repeat': args.repeat}
+    results = list()
+    with tempfile.TemporaryDirectory() as tempdir:
+        configfile, sourcefile = feed.makefeed(
+            dirpath=tempdir, rows=args.rows, columns=args.columns,
+            checks=checks, errorrate=args.errorrate,
+            cardinality=args.cardinality)
+        for w in workers:
+            for output in (False, True):
+                setting = {'configfile': configfile,
+                           'sourcefile': sourcefile, 'workers': w,
+                           'output': output, 'repeat': args.repeat}
+                proc = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_throughput',
+                     '--measure', json.dumps(setting)],
+                    capture_output=True, text=True, check=True)
+                r = json.loads(proc.stdout.splitlines()[-1])
+                results.append(r)
+                print('{workers:>3} workers {output:<9} {rate:>12,.0f} rows/s'
+                      ' {mb:>8.1f} MB/s startup {startup:>6.3f} s'
+                      ' rss {rss:>7.1f} + {wrss:>7.1f} MiB'
+                      .format(workers=w,
+                              output='output' if output else 'no output',
+                              rate=r['RowsPerSecond'],
+                              mb=r['BytesPerSecond'] / 1e6,
+                              startup=r['StartupSeconds'],
+                              rss=r['ParentPeakRSSMiB'],
+                              wrss=r['WorkerPeakRSSMiB']))
+    report = {'Revision': revision(),
+              'Python': platform.python_version(),
+              'Platform': platform.platform(),
+              'CPUs': os.cpu_count(),
+              'Parameters': parameters,
+              'Results': results}
+    with open(args.output, 'w', encoding='utf-8') as fo:
+        json.dump(report, fo, indent=2)
+    print('Saved to {path}'.format(path=args.output))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fo:
+            compare(results=results, parameters=parameters,
+                    previous=json.load(fo))
+
+
+if __name__ == '__main__':
+    main()
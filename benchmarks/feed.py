@@ -0,0 +1,132 @@
+"""
+Generator of synthetic delimited feeds and of the matching config files,
+varying the row count, column count, check mix, error rate and value
+cardinality.
+
+Usage: python -m benchmarks.feed dir [rows] [columns]
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import csv
+import os
+import random
+import sys
+
+
+CHECKS = ('EmptyCheck', 'NumericCheck', 'IntegerCheck', 'DecimalCheck',
+          'FormatCheck', 'LengthCheck')
+FORMATRULE = '{"pattern": "[^@]+@[^@]+\\\\.[^@]+", "count": 1}'
+LENGTHRULE = '{"min": 2, "max": 12}'
+FILENAME = 'sample_20200301.csv'
+
+# Makers of a valid and of an invalid value of each check, from a number
+MAKERS = {
+    'EmptyCheck': (lambda n: 'v{n}'.format(n=n), lambda n: ''),
+    'NumericCheck': (lambda n: str(n) if n % 2 else '{n}.5'.format(n=n),
+                     lambda n: 'x{n}'.format(n=n)),
+    'IntegerCheck': (lambda n: str(n), lambda n: '{n}.5'.format(n=n)),
+    'DecimalCheck': (lambda n: '{n}.25'.format(n=n), lambda n: str(n)),
+    'FormatCheck': (lambda n: 'user{n}@example.com'.format(n=n),
+                    lambda n: 'user{n}'.format(n=n)),
+    'LengthCheck': (lambda n: 'v{n}'.format(n=n % 10 ** 10),
+                    lambda n: 'x' * 20),
+    None: (lambda n: 'text{n}'.format(n=n), None)
+}
+
+
+def columnspecs(columns: int, checks: tuple = CHECKS) -> list:
+    """
+    Function that returns the (name, check) of each column, the checks
+    being given to the columns in turn. A None check leaves the column
+    without rules
+    """
+    checks = tuple(checks) or (None,)
+    return [('col{i}'.format(i=i), checks[i % len(checks)])
+            for i in range(columns)]
+
+
+def writeconfig(path: str, specs: list, delimiter: str = ',') -> None:
+    """
+    Function that writes the config file of the columns
+    """
+    sections = {c: [] for c in CHECKS}
+    for name, check in specs:
+        if check == 'FormatCheck':
+            sections[check].append('{n} = {r}'.format(n=name, r=FORMATRULE))
+        elif check == 'LengthCheck':
+            sections[check].append('{n} = {r}'.format(n=name, r=LENGTHRULE))
+        elif check:
+            sections[check].append(name)
+    lines = ['[global.settings]',
+             'Delimiter = {d}'.format(d=delimiter),
+             'Encoding = utf-8',
+             '',
+             '[file.rules]',
+             'Filename = sample_\\d{8}.csv',
+             '',
+             '[header.rules]',
+             'ValidateHeader = yes',
+             'CaseSensitive = yes',
+             'MatchHeaderCount = yes',
+             '',
+             '[header]']
+    lines.extend(name for name, _ in specs)
+    lines.extend(['', '[column.rules]', 'ValidateColumn = yes'])
+    for check in CHECKS:
+        lines.extend(['', '[{c}]'.format(c=check)] + sections[check])
+    with open(path, 'w', encoding='utf-8') as fo:
+        fo.write('\n'.join(lines) + '\n')
+
+
+def writefeed(path: str, specs: list, rows: int, errorrate: float = 0.01,
+              cardinality: int = None, seed: int = 0,
+              delimiter: str = ',') -> int:
+    """
+    Function that writes a feed of the columns. Values of a column are
+    drawn from cardinality distinct values, or are all distinct when it is
+    None, and each record gets an invalid value in one of its checked
+    columns with probability errorrate. Returns the number of records made
+    invalid
+    """
+    rnd = random.Random(seed)
+    checked = [i for i, (_, check) in enumerate(specs) if check]
+    makers = [MAKERS[check] for _, check in specs]
+    failed = 0
+    with open(path, 'w', encoding='utf-8', newline='') as fo:
+        out = csv.writer(fo, delimiter=delimiter, lineterminator='\n')
+        out.writerow([name for name, _ in specs])
+        for n in range(rows):
+            if cardinality:
+                row = [valid(rnd.randrange(cardinality))
+                       for valid, _ in makers]
+            else:
+                row = [valid(n) for valid, _ in makers]
+            if checked and rnd.random() < errorrate:
+                i = rnd.choice(checked)
+                row[i] = makers[i][1](n)
+                failed += 1
+            out.writerow(row)
+    return failed
+
+
+def makefeed(dirpath: str, rows: int, columns: int, checks: tuple = CHECKS,
+             errorrate: float = 0.01, cardinality: int = None,
+             seed: int = 0) -> tuple:
+    """
+    Function that writes a feed and its config to a dir.
+    Returns the paths of the config file and of the feed
+    """
+    specs = columnspecs(columns=columns, checks=checks)
+    configfile = os.path.join(dirpath, 'feed.ini')
+    sourcefile = os.path.join(dirpath, FILENAME)
+    writeconfig(path=configfile, specs=specs)
+    writefeed(path=sourcefile, specs=specs, rows=rows, errorrate=errorrate,
+              cardinality=cardinality, seed=seed)
+    return configfile, sourcefile
+
+
+if __name__ == '__main__':
+    print(*makefeed(sys.argv[1], *[int(a) for a in sys.argv[2:]]))
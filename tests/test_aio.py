@@ -0,0 +1,139 @@
+"""
+Unit test for aio module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.aio import AsyncValidateFile
+from validatefile.main import ValidateFile
+from validatefile import aio, main
+import asyncio
+import os
+import pytest
+import threading
+
+
+class TestAsyncValidateFile(object):
+    """Test class for AsyncValidateFile"""
+
+    @pytest.fixture
+    def sourcefile(self, tmpdir, monkeypatch):
+        """
+        Source file of a few chunks of records
+        """
+        monkeypatch.setattr(main, 'CHUNKSIZE', 5)
+        sourcefile = tmpdir.join('sample_20200301.csv')
+        lines = ['Id,firstname,count']
+        lines.extend('{i},Ram,{c}'.format(i=i, c=i if i % 4 else '')
+                     for i in range(40))
+        sourcefile.write('\n'.join(lines) + '\n')
+        yield sourcefile
+        aio.shutdown()
+
+    @staticmethod
+    def configfile():
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        return os.path.join(testdir, 'static', 'fieldchecks.ini')
+
+    def test_getresult(self, sourcefile):
+        """
+        Method to test that the result matches the synchronous one
+        """
+        expected = ValidateFile(configfile=self.configfile(),
+                                sourcefile=sourcefile).getresult()
+        progress = []
+
+        async def validate():
+            val = AsyncValidateFile(configfile=self.configfile(),
+                                    sourcefile=sourcefile)
+            return await val.getresult(progress=progress.append,
+                                       progressinterval=0)
+
+        assert asyncio.run(validate()) == expected
+        assert [p['Records'] for p in progress] == \
+            [5, 10, 15, 20, 25, 30, 35, 40, 40]
+        assert progress[-1]['ETA'] == 0
+
+    def test_iterresults(self, sourcefile):
+        """
+        Method to test streaming of the results
+        """
+        expected = list(ValidateFile(configfile=self.configfile(),
+                                     sourcefile=sourcefile).iterresults())
+
+        async def validate():
+            val = AsyncValidateFile(configfile=self.configfile(),
+                                    sourcefile=sourcefile)
+            return [r async for r in val.iterresults()]
+
+        assert asyncio.run(validate()) == expected
+
+    def test_manyfiles(self, sourcefile, tmpdir, monkeypatch):
+        """
+        Method to test that files validate concurrently on the shared pool,
+        started outside of the event loop thread
+        """
+        expected = ValidateFile(configfile=self.configfile(),
+                                sourcefile=sourcefile).getresult()
+        threads = set()
+
+        def sharedpool(startpool=aio.sharedpool):
+            threads.add(threading.current_thread())
+            return startpool()
+
+        monkeypatch.setattr(aio, 'sharedpool', sharedpool)
+
+        async def validate():
+            vals = [AsyncValidateFile(configfile=self.configfile(),
+                                      sourcefile=sourcefile)
+                    for _ in range(6)]
+            return await asyncio.gather(*(v.getresult() for v in vals))
+
+        assert asyncio.run(validate()) == [expected] * 6
+        assert aio._SHAREDPOOL is not None
+        assert threading.main_thread() not in threads
+        # Workers are not forked from the threads of the process, and the
+        # validations share one bound on the chunks in flight
+        assert aio._SHAREDPOOL._ctx.get_start_method() in ('forkserver',
+                                                           'spawn')
+        assert aio._sharedbounded()._pool is aio._SHAREDPOOL
+
+    def test_cancelledpool(self, sourcefile):
+        """
+        Method to test that the workers skip the tasks of a cancelled
+        validation only
+        """
+        pool = aio.CancellablePool(pool=aio.sharedpool())
+        other = aio.CancellablePool(pool=aio.sharedpool())
+        assert pool.apply_async(abs, (-1,)).get() == 1
+        pool.cancel()
+        with pytest.raises(aio.ValidationCancelled):
+            pool.apply_async(abs, (-1,)).get()
+        assert other.apply_async(abs, (-2,)).get() == 2
+
+    def test_cancel(self, sourcefile, tmpdir):
+        """
+        Method to test that cancelling a validation cleans up after it
+        """
+        outputdir = tmpdir.mkdir('output')
+
+        async def validate():
+            val = AsyncValidateFile(configfile=self.configfile(),
+                                    sourcefile=sourcefile)
+            started = asyncio.Event()
+            task = asyncio.ensure_future(val.getresult(
+                outputdir=str(outputdir),
+                progress=lambda _: started.set()))
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            for _ in range(100):
+                if not os.listdir(outputdir):
+                    break
+                await asyncio.sleep(0.05)
+
+        asyncio.run(validate())
+        assert os.listdir(outputdir) == []
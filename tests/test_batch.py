@@ -0,0 +1,64 @@
+"""
+Unit test for batch module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.main import ValidateFile
+from validatefile import batch
+from validatefile.cache import VerdictCache
+import os
+import pytest
+
+
+class TestBatch(object):
+    """Test class for the columnar batch engine"""
+
+    @pytest.fixture
+    def init_class(self):
+        """
+        Validate file class instantiation block
+        """
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        configfile = os.path.join(testdir, 'static', 'fieldchecks.ini')
+        return ValidateFile(configfile=configfile, sourcefile=None)
+
+    def test_matches_recordpath(self, init_class):
+        """
+        Method to test that batch and per record validation agree
+        """
+        header = ['Id', 'email', 'numericcolumn', 'count', 'integercolumn',
+                  'decimalcolumn', 'formatcolumn1', 'formatcolumn2',
+                  'lengthcolumn1', 'lengthcolumn2']
+        values = ['', ' ', '1', '-1', '+0', '007', '1.5', '-.5', '5.', '1e3',
+                  ' 3', 'ten', 'True', 'a@b.c', 'a@@b.c', 'hello', 'HELLO',
+                  '123456', 'ab', 'a\nb']
+        rows = [[v] * len(header) for v in values]
+        rows.append(['1', 'x'])
+        plan = init_class._getplan(fieldnames=header)
+        expected = dict()
+        for i, row in enumerate(rows):
+            ret = init_class._validaterow(row=row, plan=plan)
+            if ret:
+                expected[i] = ret
+        assert batch.validatebatch(plan=plan, rows=rows) == expected
+
+    def test_caches(self, init_class):
+        """
+        Method to test that cached batch validation gives the same failures
+        """
+        header = ['Id', 'count', 'formatcolumn1']
+        rows = [[str(i % 3), str(i), 'a@b.c' if i % 2 else 'x']
+                for i in range(50)]
+        plan = init_class._getplan(fieldnames=header)
+        expected = batch.validatebatch(plan=plan, rows=rows)
+        caches = {idx: VerdictCache(maxsize=10, warmup=20)
+                  for idx in range(3)}
+        assert batch.validatebatch(plan=plan, rows=rows,
+                                   caches=caches) == expected
+        # The high cardinality field switched its cache off
+        assert caches[1].enabled is False
+        assert caches[0].enabled is True
+        assert caches[0].stats()['Hits'] == 47
@@ -0,0 +1,81 @@
+"""
+Unit test for cache module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.cache import VerdictCache
+from validatefile import cache
+
+
+class TestVerdictCache(object):
+    """Test class for the verdict cache"""
+
+    def test_lru(self):
+        """
+        Method to test hits, misses and least recently used eviction
+        """
+        computed = list()
+
+        def compute(value):
+            computed.append(value)
+            return (value,) if value == 'x' else ()
+
+        cache = VerdictCache(maxsize=2, minhitrate=0, warmup=1)
+        assert cache.verdicts(values=['a', 'x', 'a', 'b', 'x', 'a'],
+                              compute=compute) == [(), ('x',), (), (), ('x',),
+                                                   ()]
+        # 'x' was evicted by 'b' as 'a' had been used more recently
+        assert computed == ['a', 'x', 'b', 'x', 'a']
+        assert cache.stats() == {'Hits': 1, 'Misses': 5, 'Evictions': 3,
+                                 'Disabled': False}
+        assert cache.verdict(value='a', compute=compute) == ()
+        assert cache.hits == 2
+
+    def test_switchoff(self):
+        """
+        Method to test that the cache switches itself off on a low hit rate
+        """
+        cache = VerdictCache(maxsize=100, minhitrate=0.5, warmup=10)
+        verdicts = cache.verdicts(values=[str(i) for i in range(25)],
+                                  compute=lambda v: ())
+        assert len(verdicts) == 10
+        assert cache.enabled is False
+        assert cache.stats()['Disabled'] is True
+        assert cache.verdict(value='1', compute=lambda v: ('c',)) == ('c',)
+        cache = VerdictCache(maxsize=100, minhitrate=0.5, warmup=10)
+        assert len(cache.verdicts(values=['a', 'b'] * 20,
+                                  compute=lambda v: ())) == 40
+        assert cache.enabled is True
+
+    def test_runcaches(self, monkeypatch):
+        """
+        Method to test that the caches of a run are kept across calls and
+        report the counts since the previous call
+        """
+        caches = cache.runcaches(runid='a', columns=(1, 3), maxsize=10)
+        assert sorted(caches) == [1, 3]
+        assert cache.runcaches(runid='a', columns=(1, 3), maxsize=10) is \
+            caches
+        caches[1].verdicts(values=['x', 'x', 'y'], compute=lambda v: ())
+        assert caches[1].newstats()['Hits'] == 1
+        caches[1].verdicts(values=['x'], compute=lambda v: ())
+        assert caches[1].newstats() == {'Hits': 1, 'Misses': 0,
+                                        'Evictions': 0, 'Disabled': False}
+        assert cache.runcaches(runid='b', columns=(1,), maxsize=10) is \
+            not caches
+        cache.dropruncaches(runid='a')
+        assert cache.runcaches(runid='a', columns=(1, 3), maxsize=10) is \
+            not caches
+        # Runs never dropped, as in workers, give way to new ones
+        cache.resetruncaches()
+        monkeypatch.setattr(cache, 'MAXRUNCACHES', 2)
+        caches = cache.runcaches(runid='a', columns=(1,), maxsize=10)
+        cache.runcaches(runid='b', columns=(1,), maxsize=10)
+        cache.runcaches(runid='c', columns=(1,), maxsize=10)
+        assert list(cache._RUNCACHES) == ['b', 'c']
+        assert cache.runcaches(runid='a', columns=(1,), maxsize=10) is \
+            not caches
+        cache.resetruncaches()
@@ -0,0 +1,43 @@
+"""
+Unit test for checkpoint module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.checkpoint import Checkpoint
+import os
+import pytest
+
+
+class TestCheckpoint(object):
+    """Test class for Checkpoint"""
+
+    def test_checkpoint(self, tmpdir):
+        """
+        Method to test saving and loading a checkpoint
+        """
+        sourcefile = tmpdir.join('sample.csv')
+        sourcefile.write('h\n1\n')
+        configfile = tmpdir.join('config.ini')
+        configfile.write('[global.settings]\n')
+        path = str(tmpdir.join('.sample.csv.checkpoint'))
+        checkpoint = Checkpoint(path=path, interval=3600,
+                                sourcefile=str(sourcefile),
+                                configfile=str(configfile))
+        assert checkpoint.load() is None
+        assert checkpoint.due() is False
+        checkpoint.save(state={'Offset': 2, 'Line': 1})
+        assert not os.path.exists(path + '.tmp')
+        state = checkpoint.load()
+        assert state['Offset'] == 2 and state['Line'] == 1
+        assert Checkpoint(path=path, interval=0, sourcefile=str(sourcefile),
+                          configfile=str(configfile)).due() is True
+        configfile.write('[global.settings]\nDelimiter = ,\n')
+        with pytest.raises(ValueError):
+            Checkpoint(path=path, interval=0, sourcefile=str(sourcefile),
+                       configfile=str(configfile)).load()
+        checkpoint.remove()
+        checkpoint.remove()
+        assert not os.path.exists(path)
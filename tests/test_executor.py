@@ -0,0 +1,53 @@
+"""
+Unit test for executor module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.executor import BoundedPool, SerialPool, newpool
+from multiprocessing import Pool
+import pytest
+import time
+
+
+class TestExecutor(object):
+    """Test class for executor module"""
+
+    def test_serialpool(self):
+        """
+        Method to test that the serial pool runs tasks as submitted and
+        raises their errors on get()
+        """
+        calls = list()
+        with SerialPool() as pool:
+            res = pool.apply_async(calls.append, (1,))
+            assert calls == [1] and res.get() is None
+            assert pool.apply_async(divmod, (7, 2)).get() == (3, 1)
+            res = pool.apply_async(divmod, (1, 0))
+            with pytest.raises(ZeroDivisionError):
+                res.get()
+
+    def test_newpool(self):
+        """
+        Method to test the pools of each executor
+        """
+        for executor in ('serial', 'thread', 'process'):
+            with newpool(executor=executor, workers=2) as pool:
+                assert pool.apply_async(divmod, (7, 2)).get() == (3, 1)
+        with pytest.raises(ValueError):
+            newpool(executor='fibers', workers=2)
+
+    def test_boundedpool(self):
+        """
+        Method to test that tasks past maxinflight wait for a slot
+        """
+        with Pool(processes=2) as pool:
+            bounded = BoundedPool(pool=pool, maxinflight=2)
+            results = [bounded.apply_async(time.sleep, (0.3,))
+                       for _ in range(2)]
+            start = time.monotonic()
+            results.append(bounded.apply_async(abs, (-1,)))
+            assert time.monotonic() - start > 0.1
+            assert results[-1].get(timeout=5) == 1
@@ -7,7 +7,9 @@ __PyVersion__ = 3
 
 
 from validatefile import helper
+from multiprocessing.pool import ThreadPool
 import pytest
+import sys
 
 
 class TestHelper(object):
@@ -54,6 +56,33 @@ class TestHelper(object):
         assert helper.isdecimal('hello') is False
         assert helper.isdecimal('34h') is False
 
+    def test_classifynumber(self):
+        """
+        Method to test the numeric classification function
+        """
+        assert helper.classifynumber('12') == helper.INTEGER
+        assert helper.classifynumber(' -+1_000 ') == helper.INTEGER
+        assert helper.classifynumber('0x1F') == helper.INTEGER
+        assert helper.classifynumber('-.5') == helper.DECIMAL
+        assert helper.classifynumber('1e3') == helper.DECIMAL
+        assert helper.classifynumber('007') == helper.NOTNUMERIC
+        assert helper.classifynumber('1j') == helper.NOTNUMERIC
+        assert helper.classifynumber('True') == helper.NOTNUMERIC
+        assert helper.classifynumber('1+1') == helper.NOTNUMERIC
+        assert helper.classifynumber('__import__("os")') == helper.NOTNUMERIC
+        assert helper.classifynumber(3) == helper.NOTNUMERIC
+
+    def test_classifynumbers(self):
+        """
+        Method to test the batch numeric classification function
+        """
+        values = ['1', '-2.5', 'x', '1e3', '', ' 4 ', '1\r']
+        expected = [helper.classifynumber(v) for v in values]
+        assert helper.classifynumbers(values) == expected
+        assert helper.classifynumbers(['1', 'a\nb']) == \
+            [helper.INTEGER, helper.NOTNUMERIC]
+        assert helper.classifynumbers([]) == []
+
     def test_isexpectedformat(self):
         """
         Method to test expected format function
@@ -84,3 +113,89 @@ class TestHelper(object):
         assert helper.isexpectedlength(value='hello', maxvalue=3) is False
         assert helper.isexpectedlength(value='hello', maxvalue=5,
                                        minvalue=1) is True
+
+    def test_compileformat(self):
+        """
+        Method to test compiled format function
+        """
+        check = helper.compileformat(pattern='\\d+')
+        assert bool(check('123')) is True
+        assert bool(check('12a')) is False
+        check = helper.compileformat(pattern='a', count=2, ignorecase=True)
+        assert check('aA') is True
+        assert check('a') is False
+        pytest.raises(ValueError, helper.compileformat, pattern='a', count=0)
+
+    def test_chunked(self):
+        """
+        Method to test chunked function
+        """
+        assert list(helper.chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+        assert list(helper.chunked([], 2)) == []
+
+    def test_imapbounded(self):
+        """
+        Method to test imapbounded function
+        """
+        taken = []
+
+        def items():
+            for i in range(6):
+                taken.append(i)
+                yield i
+
+        with ThreadPool(2) as pool:
+            res = helper.imapbounded(pool, abs, items(), 2)
+            assert next(res) == 0
+            assert taken == [0, 1, 2]
+            assert list(res) == [1, 2, 3, 4, 5]
+
+    def test_imapbounded_limits(self):
+        """
+        Method to test that imapbounded holds items back by weight and
+        while full
+        """
+        taken = []
+
+        def items(count):
+            for i in range(count):
+                taken.append(i)
+                yield [i] * 3
+
+        with ThreadPool(2) as pool:
+            res = helper.imapbounded(pool, len, items(6), 10, weight=len,
+                                     maxweight=7)
+            assert next(res) == 3
+            assert taken == [0, 1, 2]
+            assert list(res) == [3] * 5
+            taken.clear()
+            # Full holds every item back but the one being processed
+            res = helper.imapbounded(pool, len, items(4), 10,
+                                     full=lambda: True)
+            assert next(res) == 3
+            assert taken == [0, 1]
+            assert list(res) == [3] * 3
+
+    def test_residentmemory(self, monkeypatch):
+        """
+        Method to test the resident memory functions
+        """
+        assert 0 < helper.residentmemory() <= helper.peakmemory() * 2
+        assert helper.peakmemory(children=True) >= helper.peakmemory()
+        # Without the resource module, as on Windows
+        monkeypatch.setitem(sys.modules, 'resource', None)
+        assert helper.peakmemory() is None
+
+    def test_wilsoninterval(self):
+        """
+        Method to test wilsoninterval function
+        """
+        assert helper.zscore(0.95) == pytest.approx(1.959964)
+        lower, upper = helper.wilsoninterval(10, 100)
+        assert lower == pytest.approx(0.0552, abs=1e-4)
+        assert upper == pytest.approx(0.1744, abs=1e-4)
+        assert helper.wilsoninterval(0, 100)[0] == 0.0
+        assert helper.wilsoninterval(100, 100)[1] == pytest.approx(1.0)
+        assert helper.wilsoninterval(0, 0) == (0.0, 1.0)
+        with pytest.raises(ValueError):
+            helper.zscore(1)
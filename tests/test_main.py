@@ -3,10 +3,28 @@ __PyVersion__ = 3
 
 
 from validatefile.main import ValidateFile
+from validatefile import main
+from validatefile import helper
+import bz2
+import gzip
+import json
+import lzma
 import os
+import pickle
 import pytest
 
 
+def feedlines(records: int) -> list:
+    """
+    Function returning the lines of a test feed of records records, every
+    fourth record from the first one failing the EmptyCheck of count
+    """
+    lines = ['Id,firstname,count']
+    lines.extend('{i},Ram,{c}'.format(i=i, c=i if i % 4 else '')
+                 for i in range(records))
+    return lines
+
+
 class TestValidateFile:
 
     @pytest.fixture
@@ -19,6 +37,33 @@ class TestValidateFile:
         sourcefile = None
         return ValidateFile(configfile=configfile, sourcefile=sourcefile)
 
+    @pytest.fixture
+    def configfile(self):
+        """
+        Path of the test config
+        """
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        return os.path.join(testdir, 'static', 'fieldchecks.ini')
+
+    @pytest.fixture
+    def makefeed(self, tmpdir, monkeypatch):
+        """
+        Function writing a feed to sample_20200301.csv in a test dir, from
+        its lines or as feedlines(records), with the records per chunk and
+        the bytes per range of the run set if given
+        """
+        def makefeed(records: int = 0, lines: list = None,
+                     chunksize: int = None, rangesize: int = None):
+            if chunksize:
+                monkeypatch.setattr(main, 'CHUNKSIZE', chunksize)
+            if rangesize:
+                monkeypatch.setattr(main, 'RANGESIZE', rangesize)
+            sourcefile = tmpdir.ensure('test', dir=True)\
+                .join('sample_20200301.csv')
+            sourcefile.write('\n'.join(lines or feedlines(records)) + '\n')
+            return sourcefile
+        return makefeed
+
     def test_filename(self, init_class):
         """
         Method to test filename validation with the given pattern
@@ -303,6 +348,37 @@ class TestValidateFile:
         assert init_class._validaterecord(
             value=record)['ErrorCount']['EmptyCheck'] == 1
 
+    def test_getplan(self, init_class):
+        """
+        Method to test the compiled validation plan
+        """
+        header = ['Id', 'firstname', 'count', 'lengthcolumn1']
+        plan = init_class._getplan(fieldnames=header)
+        assert [c[0] for c in plan] == [0, 2, 3]
+        assert init_class._getplan(fieldnames=header) is plan
+        idx, emptyfail, numeric, checks = plan[1]
+        assert emptyfail[0] == 'EmptyCheck'
+        assert [f[0] for _, f in numeric] == ['NumericCheck']
+        assert [f[0] for _, f in checks] == ['FormatCheck', 'LengthCheck']
+        assert numeric[0][1][2] == '"count" failed numeric check.'
+
+    def test_validaterow(self, init_class):
+        """
+        Method to test positional record validation
+        """
+        header = ['Id', 'firstname', 'count', 'lengthcolumn1']
+        plan = init_class._getplan(fieldnames=header)
+        assert init_class._validaterow(row=['1', 'Ram', '12', 'abc'],
+                                       plan=plan) == []
+        failures = init_class._validaterow(row=['', 'Ram', '1234', 'a'],
+                                           plan=plan)
+        assert [f[0] for f in failures] == ['EmptyCheck', 'LengthCheck',
+                                            'LengthCheck']
+        assert [f[1] for f in failures] == ['Id', 'count', 'lengthcolumn1']
+        # Missing trailing fields are treated as empty
+        failures = init_class._validaterow(row=['1'], plan=plan)
+        assert [f[0] for f in failures] == ['EmptyCheck']
+
     def test_getresult(self, tmpdir):
         """
         Method to test getresult() logic
@@ -337,3 +413,756 @@ class TestValidateFile:
         assert bool(res['Results']['ErrorDetails']) is True
         assert res['Results']['ErrorDetails'][0]['DecimalCheck'] == 1
         assert res['Results']['ErrorDetails'][0]['FormatCheck'] == 1
+        res = init_class.getresult(usebatch=False)
+        assert res['Results']['ErrorDetails'][0]['DecimalCheck'] == 1
+        assert res['Results']['ErrorDetails'][0]['FormatCheck'] == 1
+
+    def test_parallelread(self, tmpdir, monkeypatch):
+        """
+        Method to test getresult() with workers reading byte ranges
+        """
+        monkeypatch.setattr(main, 'RANGESIZE', 200)
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        configfile = os.path.join(testdir, 'static', 'fieldchecks.ini')
+        sourcefile = tmpdir.join('sample_20200301.csv')
+        lines = [b'Id,firstname,lastname,email,numericcolumn,count,'
+                 b'integercolumn,decimalcolumn,formatcolumn1,formatcolumn2,'
+                 b'lengthcolumn1,lengthcolumn2\n']
+        for i in range(50):
+            lines.append(b'%d,Ram,"J",t@g.com,%d,1,2,1.5,s@e.com,Hello,CDE,'
+                         b'rj\n' % (i, i) if i % 7 else
+                         b',Ram,J,,x,,2.5,1,sampleemail.com,Hi,C,rjrjrj\n')
+        sourcefile.write(b''.join(lines))
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        expected = init_class.getresult()
+        res = init_class.getresult(parallelread=True)
+        assert res == expected
+        assert res['Results']['RecordsFailed'] == 8
+        for usebatch in (True, False):
+            res = init_class.getresult(parallelread=True, cachesize=10,
+                                       cachecolumns=['email', 'COUNT'],
+                                       usebatch=usebatch)
+            stats = res['Results'].pop('CacheStats')
+            assert res == expected
+            assert sorted(stats) == ['count', 'email']
+            assert stats['email']['Hits'] + stats['email']['Misses'] == 50
+        # The caches of a worker carry over from chunk to chunk
+        monkeypatch.setattr(main, 'CHUNKSIZE', 5)
+        for executor in ('serial', 'process'):
+            res = init_class.getresult(cachesize=10, cachecolumns=['COUNT'],
+                                       executor=executor, workers=1)
+            stats = res['Results']['CacheStats']['count']
+            assert stats == {'Hits': 48, 'Misses': 2, 'Evictions': 0,
+                             'Disabled': False}
+        # A quoted field spanning lines falls back to the single reader
+        lines.insert(
+            20, b'1,"Ram\nJ",x,t@g.com,1,1,1,1.5,s@e.com,Hello,C,rj\n')
+        sourcefile.write(b''.join(lines))
+        expected = init_class.getresult()
+        assert expected['Results']['TotalRecordsAnalysed'] == 51
+        assert init_class.getresult(parallelread=True) == expected
+
+    def test_outputorder(self, configfile, makefeed):
+        """
+        Method to test that the output file keeps the source order
+        """
+        sourcefile = makefeed(records=20, chunksize=3, rangesize=100)
+        tempdir = sourcefile.dirpath()
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        for parallelread in (False, True):
+            res = init_class.getresult(outputdir=tempdir,
+                                       parallelread=parallelread)
+            with open(res['Results']['OutputFile']) as fo:
+                output = fo.read().splitlines()
+            assert output[0] == 'Id\tfirstname\tcount\t_is_error\t_error_desc'
+            assert [o.split('\t')[0] for o in output[1:]] == \
+                [str(i) for i in range(20)]
+            assert output[1] == '0\tRam\t\t1\t"""count"" failed empty check."'
+            assert output[2] == '1\tRam\t1\t0\t'
+            assert sorted(os.listdir(tempdir)) == sorted([
+                'sample_20200301.csv',
+                os.path.basename(res['Results']['OutputFile'])])
+            os.remove(res['Results']['OutputFile'])
+
+    def test_outputmodes(self, configfile, makefeed):
+        """
+        Method to test the errors only, compact codes and gzip outputs
+        """
+        lines = feedlines(records=20)
+        lines.insert(5, '')
+        sourcefile = makefeed(lines=lines, chunksize=3, rangesize=100)
+        tempdir = sourcefile.dirpath()
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        with pytest.raises(ValueError):
+            init_class.getresult(outputmode='failures')
+        expected = init_class.getresult()
+        for kwargs in ({}, {'parallelread': True},
+                       {'checkpointinterval': 0}):
+            res = init_class.getresult(outputdir=tempdir, outputmode='errors',
+                                       **kwargs)
+            assert res['Results']['TotalRecordsAnalysed'] == \
+                expected['Results']['TotalRecordsAnalysed']
+            with open(res['Results']['OutputFile']) as fo:
+                output = fo.read().splitlines()
+            os.remove(res['Results']['OutputFile'])
+            assert output[0] == '_line\tId\tfirstname\tcount\t_error_desc'
+            assert output[1:] == [
+                '{line}\t{i}\tRam\t\t"""count"" failed empty check."'
+                .format(line=i + 2 + (i > 2), i=i) for i in range(0, 20, 4)]
+
+            res = init_class.getresult(outputdir=tempdir, compactcodes=True,
+                                       compressoutput=True, **kwargs)
+            outputfile = res['Results']['OutputFile']
+            assert outputfile.endswith('.txt.gz')
+            with gzip.open(outputfile, 'rt') as fo:
+                output = fo.read().splitlines()
+            assert output[0] == 'Id\tfirstname\tcount\t_is_error\t_error_codes'
+            assert output[1:3] == ['0\tRam\t\t1\tE2', '1\tRam\t1\t0\t']
+            assert len(output) == 21
+            legendfile = res['Results']['LegendFile']
+            assert legendfile == outputfile[:-len('.txt.gz')] + '.legend.json'
+            with open(legendfile) as fo:
+                legend = json.load(fo)
+            assert legend['Checks']['E'] == 'EmptyCheck'
+            assert legend['Columns']['2'] == 'count'
+            assert legend['Descriptions']['E2'] == \
+                '"count" failed empty check.'
+            os.remove(outputfile)
+            os.remove(legendfile)
+        assert os.listdir(tempdir) == ['sample_20200301.csv']
+
+    def test_iterresults(self, configfile, makefeed):
+        """
+        Method to test streaming of the validation results
+        """
+        lines = feedlines(records=12)
+        lines.insert(4, '')
+        sourcefile = makefeed(lines=lines, chunksize=3, rangesize=40)
+        tempdir = sourcefile.dirpath()
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        for parallelread in (False, True):
+            res = list(init_class.iterresults(parallelread=parallelread))
+            # The header does not match the config
+            assert [r[2]['Level'] for r in res[:2]] == ['Header',
+                                                        'HeaderCount']
+            res = res[2:]
+            assert [r[0] for r in res] == [2, 3, 4] + list(range(6, 15))
+            assert res[0][1] == {'Id': '0', 'firstname': 'Ram', 'count': ''}
+            assert res[0][2]['Level'] == 'Field'
+            assert res[1][2] == {}
+            res = list(init_class.iterresults(failuresonly=True,
+                                              parallelread=parallelread))[2:]
+            assert [(r[0], r[1]['Id']) for r in res] == \
+                [(2, '0'), (7, '4'), (11, '8')]
+        # A quoted field spanning lines makes the byte range readers fall
+        # back to a single reader, which keeps counting lines
+        lines.insert(10, '99,"Ram\nJ",1')
+        sourcefile.write('\n'.join(lines) + '\n')
+        expected = [r[0] for r in init_class.iterresults() if r[1]]
+        assert expected == [2, 3, 4] + list(range(6, 12)) + \
+            list(range(13, 17))
+        assert [r[0] for r in init_class.iterresults(parallelread=True)
+                if r[1]] == expected
+        sourcefile = tempdir.join('sample.csv')
+        sourcefile.write('Id,name\n1,Ram\n')
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        res = list(init_class.iterresults())
+        assert [(r[0], r[1], r[2]['Level']) for r in res[:2]] == \
+            [(0, None, 'Filename'), (1, None, 'Header')]
+
+    def test_rowindex(self, configfile, makefeed):
+        """
+        Method to test the failing rows index across read modes
+        """
+        lines = feedlines(records=12)
+        lines.insert(4, '')
+        sourcefile = makefeed(lines=lines, chunksize=3, rangesize=40)
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        assert 'FailingRows' not in init_class.getresult()['Results']
+        expected = [r[0] for r in init_class.iterresults(failuresonly=True)
+                    if r[1]]
+        assert expected == [2, 7, 11]
+        for kwargs in ({}, {'parallelread': True}, {'usebatch': False},
+                       {'checkpointinterval': 0}):
+            res = init_class.getresult(rowindex=True, **kwargs)
+            index = res['Results']['FailingRows']
+            assert index.keys() == [('EmptyCheck', 'count')]
+            assert list(index.rows(column='count')) == expected
+            assert index.todict() == {'EmptyCheck': {'count': expected}}
+
+    def test_profile(self, configfile, makefeed):
+        """
+        Method to test that column profiles match across read modes
+        """
+        lines = ['Id,firstname,count']
+        lines.extend('{i},Ram{j},{c}'.format(i=i, j=i % 3,
+                                             c=i if i % 4 else '')
+                     for i in range(12))
+        lines.append('99,J')
+        sourcefile = makefeed(lines=lines, chunksize=3, rangesize=40)
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        res = init_class.getresult(profile=True)['Results']['Profile']
+        assert list(res) == ['Id', 'firstname', 'count']
+        assert res['count'] == {
+            'Count': 13, 'Nulls': 1, 'Empty': 3, 'MinLength': 0,
+            'MaxLength': 2, 'Numeric': 9, 'MinNumber': 1, 'MaxNumber': 11,
+            'TopValues': [['', 3], ['1', 1], ['10', 1], ['11', 1], ['2', 1],
+                          ['3', 1], ['5', 1], ['6', 1], ['7', 1], ['9', 1]],
+            'Distinct': 10}
+        assert res['firstname']['TopValues'][:3] == \
+            [['Ram0', 4], ['Ram1', 4], ['Ram2', 4]]
+        assert res['Id']['MaxNumber'] == 99
+        for kwargs in ({'parallelread': True}, {'checkpointinterval': 0}):
+            assert init_class.getresult(profile=True, **kwargs)[
+                'Results']['Profile'] == res
+        res = init_class.getresult(profile=True, profilecolumns=['COUNT'])
+        assert list(res['Results']['Profile']) == ['count']
+
+    def test_metrics(self, configfile, makefeed):
+        """
+        Method to test the metrics block and callback
+        """
+        sourcefile = makefeed(records=500, chunksize=50, rangesize=1000)
+        tempdir = sourcefile.dirpath()
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        assert 'Metrics' not in init_class.getresult()['Results']
+        for kwargs in ({}, {'parallelread': True}, {'outputdir': tempdir}):
+            pushed = list()
+            res = init_class.getresult(metricscallback=pushed.append,
+                                       **kwargs)
+            metrics = res['Results']['Metrics']
+            assert pushed == [metrics]
+            phases = metrics['Phases']
+            assert sorted(phases) == ['Columns', 'Filename', 'Header',
+                                      'Total']
+            assert phases['Total'] >= phases['Columns'] > 0
+            assert metrics['Rows'] == 500
+            assert metrics['Bytes'] == os.path.getsize(sourcefile)
+            assert metrics['RowsPerSecond'] > 0
+            assert metrics['Validate'] > 0
+            assert (metrics['Write'] > 0) == ('outputdir' in kwargs)
+            assert sorted(metrics['Checks']) == [
+                'EmptyCheck', 'FormatCheck', 'LengthCheck', 'NumericCheck']
+            assert sorted(metrics['Columns']) == ['Id', 'count']
+            assert 0 < metrics['WorkerUtilization']
+        # An abandoned run reports no metrics
+        pushed = list()
+        for _ in init_class.iterresults(metricscallback=pushed.append):
+            break
+        assert pushed == []
+
+    def test_progress(self, configfile, makefeed):
+        """
+        Method to test the progress reports across read modes
+        """
+        sourcefile = makefeed(records=500, chunksize=50, rangesize=1000)
+        size = os.path.getsize(sourcefile)
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        for kwargs in ({}, {'parallelread': True},
+                       {'checkpointinterval': 0}):
+            reports = list()
+            init_class.getresult(progress=reports.append, progressinterval=0,
+                                 **kwargs)
+            records = [r['Records'] for r in reports]
+            # Byte ranges are reported as they complete, and the end of the
+            # run is reported on its own
+            if not kwargs.get('parallelread'):
+                assert records == list(range(50, 550, 50)) + [500]
+            assert records[:-1] == sorted(set(records)) and \
+                records[-1] == 500
+            assert all(0 < r['Bytes'] <= size == r['TotalBytes']
+                       for r in reports)
+            assert reports[-1]['Bytes'] == size
+            assert reports[-1]['ETA'] == 0
+            reports = list()
+            init_class.getresult(progress=reports.append,
+                                 progressinterval=3600, **kwargs)
+            assert len(reports) == 2 and reports[-1]['Records'] == 500
+
+    def test_executor(self, configfile, makefeed, monkeypatch):
+        """
+        Method to test that the executors, worker counts and chunk sizes
+        give the same result, and the adaptive choice between them
+        """
+        sourcefile = makefeed(records=500)
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        expected = init_class.getresult()
+        expectedlines = [r[0] for r in init_class.iterresults()]
+        for kwargs in ({'executor': 'serial'},
+                       {'executor': 'thread', 'workers': 3},
+                       {'executor': 'process', 'workers': 2},
+                       {'executor': 'process', 'startmethod': 'spawn'},
+                       {'executor': 'thread', 'chunksize': 7,
+                        'parallelread': True},
+                       {'chunksize': 30, 'checkpointinterval': 0}):
+            assert init_class.getresult(**kwargs) == expected
+            assert [r[0] for r in init_class.iterresults(**kwargs)] == \
+                expectedlines
+        with pytest.raises(ValueError):
+            init_class.getresult(executor='fibers')
+        run = {'Plan': init_class._getplan(
+                   fieldnames=feedlines(records=0)[0].split(',')),
+               'Compression': None}
+        # The whole file fits in the probe
+        assert init_class._sizerun(run=run, workers=4) == \
+            ('serial', 1, main.CHUNKSIZE)
+        assert init_class._sizerun(run=run, executor='thread', workers=4,
+                                   chunksize=10) == ('thread', 4, 10)
+        # A file estimated to take long gets a pool of processes, with
+        # chunks giving each worker a few of them
+        monkeypatch.setattr(main, 'PROBEROWS', 100)
+        monkeypatch.setattr(main, 'SERIALSECONDS', 0)
+        monkeypatch.setattr(main, 'MINCHUNKSIZE', 10)
+        executor, workers, chunksize = init_class._sizerun(run=run,
+                                                           workers=4)
+        assert (executor, workers) == ('process', 4)
+        assert 20 <= chunksize <= 40
+        monkeypatch.setattr(main, 'SERIALSECONDS', 3600)
+        assert init_class._sizerun(run=run, workers=4)[0] == 'serial'
+
+    def test_backpressure(self, configfile, makefeed):
+        """
+        Method to test that the limits on chunks in flight, queued records
+        and memory keep the result, and that the peak memory is reported
+        """
+        sourcefile = makefeed(records=300, chunksize=20, rangesize=1000)
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        expected = init_class.getresult()
+        expectedlines = [r[0] for r in init_class.iterresults()]
+        assert 'PeakRSS' not in expected['Results']
+        for kwargs in ({'maxinflight': 1, 'executor': 'thread'},
+                       {'maxqueuedrows': 50, 'executor': 'process'},
+                       {'maxmemory': 1, 'executor': 'thread'},
+                       {'maxmemory': 1, 'parallelread': True,
+                        'executor': 'thread'}):
+            res = init_class.getresult(**kwargs)
+            peak = res['Results'].pop('PeakRSS', None)
+            assert res == expected
+            assert bool(peak) == ('maxmemory' in kwargs)
+            if peak:
+                assert 0 < peak <= helper.peakmemory(children=True)
+            assert [r[0] for r in init_class.iterresults(**kwargs)] == \
+                expectedlines
+
+    def test_rawsplit(self, tmpdir, configfile, monkeypatch):
+        """
+        Method to test that Quoting = none gives the results of the csv
+        reader, falling back to it on quotes
+        """
+        monkeypatch.setattr(main, 'CHUNKSIZE', 20)
+        monkeypatch.setattr(main, 'RANGESIZE', 500)
+        monkeypatch.setattr(main.reader, 'BLOCKSIZE', 64)
+        tempdir = tmpdir.mkdir('test')
+        rawconfig = tempdir.join('raw.ini')
+        with open(configfile, encoding='utf-8') as fo:
+            rawconfig.write(fo.read().replace(
+                'Encoding =  utf-8', 'Encoding =  utf-8\nQuoting = none'))
+        lines = feedlines(records=300)
+        lines.insert(9, '')
+        variants = {'plain': '\n'.join(lines) + '\n',
+                    'crlf': '\r\n'.join(lines),
+                    'quoted': '\n'.join(lines).replace('150,Ram',
+                                                       '150,"R\nam"')}
+        for name, data in variants.items():
+            sourcefile = tempdir.mkdir(name).join('sample_20200301.csv')
+            sourcefile.write(data.encode(), mode='wb')
+            expected = ValidateFile(sourcefile=sourcefile,
+                                    configfile=configfile)
+            init_class = ValidateFile(sourcefile=sourcefile,
+                                      configfile=str(rawconfig))
+            assert init_class.dictconfig['_RawSplit']
+            for kwargs in ({}, {'parallelread': True},
+                           {'checkpointinterval': 0}, {'profile': True},
+                           {'outputmode': 'errors'}):
+                if 'outputmode' in kwargs:
+                    kwargs['outputdir'] = str(tempdir.mkdir(
+                        name + str(len(kwargs))))
+                res = init_class.getresult(**kwargs)
+                other = expected.getresult(**kwargs)
+                if 'outputdir' in kwargs:
+                    with open(res['Results'].pop('OutputFile'), 'rb') as f1, \
+                            open(other['Results'].pop('OutputFile'),
+                                 'rb') as f2:
+                        assert f1.read() == f2.read()
+                assert res == other
+                assert list(init_class.iterresults(**kwargs)) == \
+                    list(expected.iterresults(**kwargs))
+        with pytest.raises(ValueError):
+            rawconfig.write(rawconfig.read().replace('none', 'all'))
+            ValidateFile(sourcefile=sourcefile, configfile=str(rawconfig))
+
+    def test_uniquecheck(self, configfile, makefeed):
+        """
+        Method to test single and composite unique keys
+        """
+        rows = [(str(i % 120), 'n{i}'.format(i=i % 140),
+                 str(i % 120) if i % 4 else '') for i in range(300)]
+        lines = ['Id,firstname,count'] + [','.join(r) for r in rows]
+        lines.insert(9, '')
+        sourcefile = makefeed(lines=lines, chunksize=20)
+        tempdir = sourcefile.dirpath()
+        uniqueconfig = tempdir.join('unique.ini')
+        with open(configfile, encoding='utf-8') as fo:
+            uniqueconfig.write(fo.read() + '\n[UniqueCheck]\nfirstname\n'
+                               'Pair = Id, count\nMissing = nofield\n')
+        expected = dict()
+        for key, positions in (('firstname', (1,)), ('Pair', (0, 2))):
+            seen = set()
+            for line, row in enumerate(lines[1:], start=2):
+                if not row:
+                    continue
+                value = tuple(row.split(',')[i] for i in positions)
+                if value in seen:
+                    expected.setdefault(line, set()).add(key)
+                seen.add(value)
+        baseline = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        failing = {line for line, _, _ in
+                   baseline.iterresults(failuresonly=True) if line > 1}
+        init_class = ValidateFile(sourcefile=sourcefile,
+                                  configfile=str(uniqueconfig))
+        for kwargs in ({}, {'executor': 'process', 'workers': 2},
+                       {'checkpointinterval': 0}, {'parallelread': True},
+                       {'uniquememory': 64},
+                       {'uniquememory': 64, 'executor': 'process',
+                        'workers': 2}):
+            res = init_class.getresult(**kwargs)['Results']
+            counts = res['ErrorDetails'][-1]
+            assert counts['UniqueCheck'] == sum(len(v) for v in
+                                                expected.values())
+            assert res['TotalRecordsAnalysed'] == 300
+            assert res['RecordsFailed'] == len(failing | set(expected))
+            assert res['RecordsPassed'] == 300 - res['RecordsFailed']
+            found = dict()
+            for line, _, errors in init_class.iterresults(failuresonly=True,
+                                                          **kwargs):
+                if line > 1 and 'UniqueCheck' in errors['ErrorCount']:
+                    found[line] = {d.split('"')[1] for d in errors['Error']
+                                   if 'unique' in d}
+            assert found == expected
+        res = init_class.getresult(outputdir=str(tempdir), compactcodes=True)
+        with open(res['Results']['OutputFile']) as fo:
+            output = fo.read().splitlines()
+        for line, keys in expected.items():
+            # Records follow the header, less the blank line
+            flag, codes = output[line - 1 - (line > 10)].split('\t')[-2:]
+            assert flag == '1'
+            assert {c for c in codes.split(';') if c[0] == 'U'} == \
+                {'U1' if k == 'firstname' else 'U0' for k in keys}
+        with open(res['Results']['LegendFile']) as fo:
+            assert json.load(fo)['Descriptions']['U1'] == \
+                '"firstname" failed unique check'
+
+    def test_parserule(self):
+        """
+        Method to test that rule entries are parsed, not evaluated
+        """
+        rule = ValidateFile._parserule(
+            section='FormatCheck', fieldname='f',
+            value='{"pattern": "[A-Z]", "ignorecase": True}',
+            required='pattern')
+        assert rule == {'pattern': '[A-Z]', 'ignorecase': True}
+        for value in ('__import__("os").getcwd()', '{"max": len("ab")}',
+                      '{"min": 2}', '[1, 2]', '{'):
+            with pytest.raises(ValueError):
+                ValidateFile._parserule(section='LengthCheck', fieldname='f',
+                                        value=value, required='max')
+
+    def test_cachedir(self, tmpdir, monkeypatch):
+        """
+        Method to test the cache of the parsed config
+        """
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        configfile = os.path.join(testdir, 'static', 'fieldchecks.ini')
+        cachedir = tmpdir.mkdir('cache')
+        expected = ValidateFile(configfile=configfile, sourcefile=None)
+        val = ValidateFile(configfile=configfile, sourcefile=None,
+                           cachedir=cachedir)
+        assert len(os.listdir(cachedir)) == 1
+        # The config is not parsed again
+        monkeypatch.setattr(ValidateFile, '_set_dictconfig', None)
+        val = ValidateFile(configfile=configfile, sourcefile=None,
+                           cachedir=cachedir)
+        assert val._dictconfig == expected._dictconfig
+        header = ['Id', 'formatcolumn1', 'lengthcolumn1']
+        row = ['1', 'a@b', 'abcdef']
+        assert val._validaterow(row=row, plan=val._getplan(header)) == \
+            expected._validaterow(row=row, plan=expected._getplan(header))
+        # A changed config gets its own entry
+        changed = tmpdir.join('changed.ini')
+        with open(configfile) as fo:
+            changed.write(fo.read() + '\n')
+        monkeypatch.undo()
+        ValidateFile(configfile=changed, sourcefile=None, cachedir=cachedir)
+        assert len(os.listdir(cachedir)) == 2
+        # A cache of an older layout is parsed again and replaced
+        for name in os.listdir(cachedir):
+            path = os.path.join(cachedir, name)
+            with open(path, 'rb') as fb:
+                dictconfig, formats, lengths = pickle.load(fb)
+            del dictconfig['UniqueCheck']
+            with open(path, 'wb') as fb:
+                pickle.dump((dictconfig, formats, lengths), fb)
+        val = ValidateFile(configfile=configfile, sourcefile=None,
+                           cachedir=cachedir)
+        assert val._dictconfig == expected._dictconfig
+        assert len(os.listdir(cachedir)) == 2
+
+    def test_failurebudget(self, configfile, makefeed, monkeypatch):
+        """
+        Method to test the fail-fast error budget
+        """
+        # Records 0, 4, 8, ... fail, at lines 2, 6, 10, ...
+        sourcefile = makefeed(records=100, chunksize=4, rangesize=40)
+        tempdir = sourcefile.dirpath()
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        for parallelread in (False, True):
+            res = init_class.getresult(parallelread=parallelread)['Results']
+            assert 'Aborted' not in res
+            assert res['RecordsFailed'] == 25
+            # Workers send back only the lines of the failing records
+            chunks = list()
+            addchunk = ValidateFile._addchunk
+            with monkeypatch.context() as m:
+                m.setattr(ValidateFile, '_addchunk',
+                          lambda self, **kwargs: chunks.append(
+                              kwargs['value']) or addchunk(self, **kwargs))
+                res = init_class.getresult(parallelread=parallelread,
+                                           maxfailures=50)['Results']
+            assert 'Aborted' not in res
+            assert all(not c.get('Records') for c in chunks)
+            assert [n for c in chunks for n in c['FailedLines']] == \
+                list(range(2, 102, 4))
+            res = init_class.getresult(parallelread=parallelread,
+                                       maxfailures=2,
+                                       outputdir=tempdir)['Results']
+            assert res['Aborted']['Line'] == 10
+            assert res['RecordsFailed'] == 3
+            assert res['TotalRecordsAnalysed'] < 100
+            with open(res['OutputFile']) as fo:
+                assert len(fo.read().splitlines()) == \
+                    res['TotalRecordsAnalysed'] + 1
+            os.remove(res['OutputFile'])
+            res = init_class.getresult(parallelread=parallelread,
+                                       maxfailures=0)['Results']
+            assert res['Aborted']['Line'] == 2
+            res = init_class.getresult(parallelread=parallelread,
+                                       maxfailureratio=0.2)['Results']
+            # The ratio is checked after every chunk, and the line is the
+            # one of the last failing record of the chunk
+            assert res['Aborted']['Line'] in (2, 6)
+            res = init_class.getresult(parallelread=parallelread,
+                                       maxfailureratio=0.4)['Results']
+            assert 'Aborted' not in res
+        # The header does not match the config
+        res = init_class.getresult(skiponheadererror=True)['Results']
+        assert res['Aborted']['Line'] == 1
+        assert res['TotalRecordsAnalysed'] == 0
+
+    def test_getsample(self, configfile, makefeed):
+        """
+        Method to test sampling mode
+        """
+        lines = ['Id,firstname,count']
+        lines.extend('{i},Ram,{c}'.format(i=i, c=i % 10 if i % 4 else '')
+                     for i in range(400))
+        lines.insert(3, '"4","Ram\nJ","1"')
+        sourcefile = makefeed(lines=lines)
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        # A sample of all the records is exact
+        res = init_class.getsample(samplesize=1000, method='reservoir')
+        assert res['Results']['TotalRecordsAnalysed'] == 401
+        sample = res['Results']['Sample']
+        assert sample['Method'] == 'reservoir'
+        assert sample['Checks']['EmptyCheck']['Failed'] == 100
+        assert sample['Records']['Failed'] == 100
+        assert [e['Level'] for e in res['Results']['ErrorDetails']] == \
+            ['Header', 'HeaderCount']
+        res = init_class.getsample(samplesize=50, method='reservoir', seed=1)
+        assert res['Results']['TotalRecordsAnalysed'] == 50
+        assert res == init_class.getsample(samplesize=50, method='reservoir',
+                                           seed=1)
+        for method in ('seek', 'reservoir'):
+            res = init_class.getsample(samplesize=100, method=method, seed=2)
+            assert 0 < res['Results']['TotalRecordsAnalysed'] <= 100
+            rate = res['Results']['Sample']['Checks']['EmptyCheck']
+            assert rate['Lower'] <= rate['Rate'] <= rate['Upper']
+            assert rate['Lower'] < 0.25 < rate['Upper']
+        with pytest.raises(ValueError):
+            init_class.getsample(method='all')
+
+    def test_resume(self, tmpdir, configfile, makefeed):
+        """
+        Method to test that a resumed run gives the same result and output
+        as an uninterrupted one
+        """
+        lines = feedlines(records=40)
+        lines.insert(5, '')
+        lines.insert(9, '"99","Ram\nJ","1000"')
+        sourcefile = makefeed(lines=lines, chunksize=3)
+        outputdir = tmpdir.mkdir('output')
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        expected = init_class.getresult(outputdir=outputdir)
+        with open(expected['Results']['OutputFile']) as fo:
+            expectedoutput = fo.read()
+        os.remove(expected['Results']['OutputFile'])
+        expectedlines = [r[0] for r in init_class.iterresults()]
+        # Interrupted run
+        res = init_class.iterresults(outputdir=outputdir,
+                                     checkpointinterval=0)
+        for _ in range(20):
+            next(res)
+        res.close()
+        checkpoint = os.path.join(outputdir, '.sample_20200301.csv.checkpoint')
+        assert os.path.exists(checkpoint)
+        outputfile = [f for f in os.listdir(outputdir) if f.endswith('.txt')]
+        assert len(outputfile) == 1
+        # Records written after the checkpoint are dropped
+        with open(os.path.join(outputdir, outputfile[0]), 'a') as fo:
+            fo.write('partial\trecord')
+        lines = [r[0] for r in init_class.iterresults(resume=True,
+                                                      outputdir=outputdir)]
+        assert lines[:2] == [1, 1]
+        assert expectedlines[-len(lines) + 2:] == lines[2:]
+        assert not os.path.exists(checkpoint)
+        os.remove(os.path.join(outputdir, outputfile[0]))
+        # Interrupted again, then resumed with getresult()
+        res = init_class.iterresults(outputdir=outputdir,
+                                     checkpointinterval=0)
+        for _ in range(20):
+            next(res)
+        res.close()
+        outputfile = [f for f in os.listdir(outputdir) if f.endswith('.txt')]
+        assert len(outputfile) == 1
+        res = init_class.getresult(outputdir=outputdir, resume=True)
+        assert res['Results']['OutputFile'] == \
+            os.path.join(outputdir, outputfile[0])
+        with open(res['Results']['OutputFile']) as fo:
+            assert fo.read() == expectedoutput
+        del res['Results']['OutputFile']
+        del expected['Results']['OutputFile']
+        assert res == expected
+        assert os.listdir(outputdir) == outputfile
+        # Resuming without a checkpoint runs from the start
+        os.remove(os.path.join(outputdir, outputfile[0]))
+        res = init_class.getresult(resume=True)
+        del res['Results']['OutputFile']
+        assert res == expected
+
+    def test_follow(self, tmpdir):
+        """
+        Method to test validation of a growing file
+        """
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        configfile = os.path.join(testdir, 'static', 'fieldchecks.ini')
+        tempdir = tmpdir.mkdir('test')
+        outputdir = tmpdir.mkdir('output')
+        sourcefile = tempdir.join('sample_20200301.csv')
+        sourcefile.write('Id,firstname,count\n0,Ram,\n1,Ram,1\n2,Ra')
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        reports = init_class.follow(interval=0.01, idletimeout=0.05,
+                                    outputdir=outputdir)
+        report = next(reports)
+        assert [e.get('Level') for e in report['Results']['ErrorDetails']] \
+            == ['Header', 'HeaderCount', None]
+        assert report['Results']['TotalRecordsAnalysed'] == 2
+        assert report['Increment']['RecordsFailed'] == 1
+        assert [r[0] for r in report['Increment']['Records']] == [2]
+        # The incomplete record and the open quoted field wait for the rest
+        sourcefile.write('m,2\n\n3,"Ram\n', mode='a')
+        report = next(reports)
+        assert report['Results']['TotalRecordsAnalysed'] == 3
+        assert report['Increment']['TotalRecordsAnalysed'] == 1
+        sourcefile.write('J",\n', mode='a')
+        report = next(reports)
+        assert report['Results']['TotalRecordsAnalysed'] == 4
+        assert report['Results']['RecordsFailed'] == 2
+        assert report['Results']['ErrorDetails'][-1] == {'EmptyCheck': 2}
+        assert [r[0] for r in report['Increment']['Records']] == [6]
+        assert report['Increment']['Records'][0][1]['firstname'] == 'Ram\nJ'
+        # A replaced file is followed from its start
+        newfile = tempdir.join('new.csv')
+        newfile.write('Id,firstname,count\n5,Ram,\n')
+        os.replace(newfile, sourcefile)
+        report = next(reports)
+        assert report['Replaced']
+        assert 'Increment' not in report
+        assert report['Results']['TotalRecordsAnalysed'] == 4
+        report = next(reports)
+        assert 'Replaced' not in report
+        assert report['Results']['TotalRecordsAnalysed'] == 1
+        assert report['Results']['ErrorDetails'][-1] == {'EmptyCheck': 1}
+        assert [r[0] for r in report['Increment']['Records']] == [2]
+        with pytest.raises(StopIteration):
+            next(reports)
+        with open(report['Results']['OutputFile']) as fo:
+            output = fo.read().splitlines()
+        header = 'Id\tfirstname\tcount\t_is_error\t_error_desc'
+        assert output[0] == output[6] == header
+        assert [o.split('\t')[0] for o in output[1:]] == \
+            ['0', '1', '2', '3', 'J"', 'Id', '5']
+
+    def test_followblocks(self, configfile, makefeed, monkeypatch):
+        """
+        Method to test that a large append is validated a block at a time
+        """
+        monkeypatch.setattr(main, 'FOLLOWBYTES', 64)
+        lines = feedlines(records=40)
+        # A record longer than a block is read whole
+        lines.insert(20, '99,"{name}",1'.format(name='R' * 100 + '\nJ'))
+        sourcefile = makefeed(lines=lines)
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        reports = list(init_class.follow(interval=0.01, idletimeout=0.02))
+        assert len(reports) > 5
+        assert all(r['Increment']['TotalRecordsAnalysed'] <= 10
+                   for r in reports)
+        assert reports[-1]['Results']['TotalRecordsAnalysed'] == 41
+        assert reports[-1]['Results']['RecordsFailed'] == 10
+        assert [n for r in reports for n, _, _ in r['Increment']['Records']] \
+            == [n + 2 + 2 * (n >= 20) for n in range(0, 40, 4)]
+
+    def test_compressed(self, configfile, makefeed):
+        """
+        Method to test validation of compressed files
+        """
+        lines = feedlines(records=60)
+        lines.insert(7, '')
+        data = ('\n'.join(lines) + '\n').encode()
+        sourcefile = makefeed(lines=lines, chunksize=4, rangesize=60)
+        tempdir = sourcefile.dirpath()
+        init_class = ValidateFile(sourcefile=sourcefile, configfile=configfile)
+        expected = init_class.getresult()
+        expectedlines = [r[0] for r in init_class.iterresults()]
+        assert not [e for e in expected['Results']['ErrorDetails']
+                    if e.get('Level') == 'Filename']
+
+        def members(data, cuts):
+            return b''.join(gzip.compress(data[a:b]) for a, b in
+                            zip([0] + cuts, cuts + [len(data)]))
+
+        newlines = [i + 1 for i, c in enumerate(data) if c == ord('\n')]
+        quoted = data.replace(b'5,Ram,5', b'5,"Ram\n",5')
+        variants = {
+            'gz': gzip.compress(data),
+            'bz2': bz2.compress(data),
+            'xz': lzma.compress(data),
+            # Members of whole lines, decompressed by the workers
+            'aligned.gz': members(data, newlines[1::3]),
+            # Members cut mid-line make the workers fall back
+            'unaligned.gz': members(data, [10, 100, 300]),
+            'quoted.gz': members(quoted, newlines[1::3])
+        }
+        for ext, compressed in variants.items():
+            sourcefile = tempdir.mkdir(ext).join(
+                'sample_20200301.csv.' + ext.split('.')[-1])
+            sourcefile.write(compressed, mode='wb')
+            init_class = ValidateFile(sourcefile=sourcefile,
+                                      configfile=configfile)
+            for kwargs in ({}, {'parallelread': True},
+                           {'checkpointinterval': 0}):
+                res = init_class.getresult(**kwargs)
+                if ext == 'quoted.gz':
+                    assert res['Results']['TotalRecordsAnalysed'] == 60
+                    continue
+                assert res == expected
+                assert [r[0] for r in init_class.iterresults(**kwargs)] == \
+                    expectedlines
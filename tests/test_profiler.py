@@ -0,0 +1,66 @@
+"""
+Unit test for profiler module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.profiler import ColumnProfile, HyperLogLog
+from validatefile import profiler
+import json
+
+
+class TestProfiler(object):
+    """Test class for profiler module"""
+
+    def test_hyperloglog(self):
+        """
+        Method to test the distinct count estimate and merging sketches
+        """
+        first = HyperLogLog()
+        first.update(str(i) for i in range(50000))
+        assert abs(first.estimate() - 50000) < 50000 * 0.05
+        second = HyperLogLog()
+        second.update(str(i) for i in range(25000, 75000))
+        first.merge(second)
+        assert abs(first.estimate() - 75000) < 75000 * 0.05
+        small = HyperLogLog()
+        small.update(['a', 'b', 'c', 'a'])
+        assert small.estimate() == 3
+        assert HyperLogLog.fromdict(first.todict()).estimate() == \
+            first.estimate()
+
+    def test_columnprofile(self, monkeypatch):
+        """
+        Method to test that chunk profiles merge into the profile of all
+        the values
+        """
+        values = ['a'] * 30 + ['b'] * 20 + ['', ' ', None, '-0x10', '2.5'] + \
+            [str(i) for i in range(100, 130)]
+        expected = ColumnProfile().update(values).summary(topk=2)
+        profile = ColumnProfile()
+        for start in range(0, len(values), 7):
+            profile.merge(ColumnProfile().update(values[start:start + 7]))
+        summary = profile.summary(topk=2)
+        assert summary == expected
+        assert {k: v for k, v in summary.items() if k != 'Distinct'} == {
+            'Count': 85, 'Nulls': 1, 'Empty': 2, 'MinLength': 0,
+            'MaxLength': 5, 'Numeric': 32, 'MinNumber': -16,
+            'MaxNumber': 129, 'TopValues': [['a', 30], ['b', 20]]}
+        assert summary['Distinct'] == 36
+        state = json.loads(json.dumps(profile.todict()))
+        assert ColumnProfile.fromdict(state).summary(topk=2) == summary
+        # Integers too long to convert are left out of the min and max
+        summary = ColumnProfile().update(['9' * 5000, '7', '-3']).summary()
+        assert (summary['Numeric'], summary['MinNumber'],
+                summary['MaxNumber']) == (2, -3, 7)
+        # With fewer counters than distinct values the most frequent values
+        # are still found, with lower bound counts
+        monkeypatch.setattr(profiler, 'TOPKCAPACITY', 5)
+        profile = ColumnProfile()
+        for start in range(0, len(values), 7):
+            profile.merge(ColumnProfile().update(values[start:start + 7]))
+        top = profile.summary(topk=2)['TopValues']
+        assert [v for v, _ in top] == ['a', 'b']
+        assert 0 < top[0][1] <= 30 and 0 < top[1][1] <= 20
@@ -0,0 +1,43 @@
+"""
+Unit test for progress module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.progress import ProgressMeter
+from validatefile import progress
+import pytest
+
+
+class TestProgressMeter(object):
+    """Test class for ProgressMeter"""
+
+    def test_throttle(self, monkeypatch):
+        """
+        Method to test that reports are throttled and carry the rate and
+        the estimated time left
+        """
+        now = [100.0]
+        monkeypatch.setattr(progress.time, 'monotonic', lambda: now[0])
+        reports = list()
+        meter = ProgressMeter(callback=reports.append, interval=5,
+                              totalbytes=1000)
+        for records, position in ((10, 100), (20, 200), (30, 300)):
+            now[0] += 3
+            meter.update(records=records, position=position)
+        assert [r['Records'] for r in reports] == [10, 30]
+        assert reports[1]['RecordsPerSecond'] == pytest.approx(20 / 6)
+        assert reports[1]['Elapsed'] == pytest.approx(9)
+        # 300 bytes in 9 seconds, 700 bytes left
+        assert reports[1]['ETA'] == pytest.approx(21)
+        # The end of the run is reported even without new records
+        meter.finish(records=30)
+        assert [(r['Records'], r['Bytes'], r['ETA']) for r in reports[2:]] \
+            == [(30, 1000, 0.0)]
+        now[0] += 1
+        meter.update(records=40, position=400)
+        meter.finish(records=50)
+        assert [(r['Records'], r['Bytes'], r['ETA']) for r in reports[3:]] \
+            == [(50, 1000, 0.0)]
@@ -0,0 +1,156 @@
+"""
+Unit test for reader module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile import reader
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import pytest
+import random
+
+
+class TestReader(object):
+    """Test class for reader module"""
+
+    def test_isasciicompatible(self):
+        """
+        Method to test the encoding check
+        """
+        assert reader.isasciicompatible('utf-8') is True
+        assert reader.isasciicompatible('latin-1') is True
+        assert reader.isasciicompatible('utf-16') is False
+        assert reader.isasciicompatible('no-such-encoding') is False
+
+    def test_splitranges(self, tmpdir):
+        """
+        Method to test newline aligned byte ranges
+        """
+        sourcefile = tmpdir.join('sample.csv')
+        data = b'h\n' + b''.join(b'%d,abc\n' % i for i in range(100))
+        sourcefile.write(data + b'last')
+        ranges = reader.splitranges(path=str(sourcefile), start=2, size=50)
+        assert ranges[0][0] == 2
+        assert ranges[-1][1] == len(data) + 4
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[end - 1:end] == b'\n'
+        assert reader.splitranges(path=str(sourcefile), start=len(data) + 4,
+                                  size=50) == []
+
+    def test_readrange(self, tmpdir):
+        """
+        Method to test reading a byte range
+        """
+        sourcefile = tmpdir.join('sample.csv')
+        sourcefile.write('h\né,b\r\nc\n'.encode('utf-8'))
+        assert reader.readrange(path=str(sourcefile), start=2, end=8,
+                                encoding='utf-8') == 'é,b\r\n'
+
+    def test_rawreader(self, monkeypatch):
+        """
+        Method to test the raw splitter against csv.reader
+        """
+        monkeypatch.setattr(reader, 'BLOCKSIZE', 8)
+        data = 'h,i\né,b\r\n\nc,d,e\nlast'.encode('utf-8')
+        position = [0]
+        raw = reader.RawReader(fb=io.BytesIO(data), encoding='utf-8',
+                               delimiter=',', position=position)
+        assert next(raw) == ['h', 'i']
+        assert raw.line_num == 1 and position[0] == 4
+        assert list(raw) == [['é', 'b'], [], ['c', 'd', 'e'], ['last']]
+        assert raw.line_num == 5 and position[0] == len(data)
+        raw = reader.RawReader(fb=io.BytesIO(data), encoding='utf-8',
+                               delimiter=',', columns=(1,))
+        assert list(raw)[3] == ['', 'd', '']
+        # A quote hands the rest of the file to csv.reader
+        data = b'a,b\nc,d\n"e\nf",g\nh,i\n'
+        position = [0]
+        raw = reader.RawReader(fb=io.BytesIO(data), encoding='utf-8',
+                               delimiter=',', position=position)
+        assert list(raw) == list(csv.reader(io.StringIO(data.decode())))
+        assert raw.line_num == 5 and position[0] == len(data)
+
+    def test_samplelines(self, tmpdir):
+        """
+        Method to test sampling of lines around random offsets
+        """
+        sourcefile = tmpdir.join('sample.csv')
+        data = b'h\n' + b''.join(b'%d,abc\n' % i for i in range(100))
+        sourcefile.write(data + b'last')
+        lines = reader.samplelines(path=str(sourcefile), start=2, count=10,
+                                   rnd=random.Random(0))
+        assert len(lines) == 10
+        assert lines == sorted(set(lines), key=lines.index)
+        assert all(data.find(b'\n' + line + b'\n') >= 0 for line in lines)
+        lines = reader.samplelines(path=str(sourcefile), start=2, count=500,
+                                   rnd=random.Random(0))
+        assert set(lines) <= set(data[2:].split(b'\n')[:-1] + [b'last'])
+        assert reader.samplelines(path=str(sourcefile), start=len(data) + 4,
+                                  count=5, rnd=random.Random(0)) == []
+
+    def test_completeprefix(self):
+        """
+        Method to test the cut of incomplete lines and records
+        """
+        assert reader.completeprefix(b'') == 0
+        assert reader.completeprefix(b'a,b') == 0
+        assert reader.completeprefix(b'a,b\nc') == 4
+        assert reader.completeprefix(b'a,b\n"c\nd",e\n') == 12
+        assert reader.completeprefix(b'a\n"b\nc\n') == 2
+        assert reader.completeprefix(b'a\n"b""\nc",d\n"e') == 12
+
+    def test_compression(self, tmpdir):
+        """
+        Method to test detection of the compression and reading it
+        """
+        data = b'h\n' + b''.join(b'%d,abc\n' % i for i in range(100))
+        for name, compress in (('a.gz', gzip.compress), ('a.bz2',
+                               bz2.compress), ('a.xz', lzma.compress),
+                               ('a.csv', bytes)):
+            sourcefile = tmpdir.join(name)
+            sourcefile.write(compress(data), mode='wb')
+            compression = reader.compression(path=str(sourcefile))
+            assert compression == {'a.gz': 'gzip', 'a.bz2': 'bz2',
+                                   'a.xz': 'xz'}.get(name)
+            with reader.openbinary(path=str(sourcefile),
+                                   compression=compression) as fb:
+                assert fb.read() == data
+            with reader.opentext(path=str(sourcefile), encoding='utf-8',
+                                 compression=compression) as fo:
+                assert fo.readline() == 'h\n'
+        # Plain content wins over the extension, which is used when empty
+        sourcefile = tmpdir.join('b.gz')
+        sourcefile.write(data, mode='wb')
+        assert reader.compression(path=str(sourcefile)) is None
+        sourcefile.write(b'', mode='wb')
+        assert reader.compression(path=str(sourcefile)) == 'gzip'
+        assert reader.uncompressedname('/x/sample.csv.gz') == 'sample.csv'
+        assert reader.uncompressedname('/x/sample.csv') == 'sample.csv'
+
+    def test_readmembers(self, tmpdir):
+        """
+        Method to test reading ranges of gzip members
+        """
+        members = [gzip.compress(b'%d,abc\n' % i * 20) for i in range(30)]
+        sourcefile = tmpdir.join('a.gz')
+        sourcefile.write(b''.join(members), mode='wb')
+        ranges = reader.memberranges(path=str(sourcefile), size=200)
+        assert len(ranges) > 1
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(b''.join(members))
+        data = b''.join(reader.readmembers(path=str(sourcefile), start=start,
+                                           end=end) for start, end in ranges)
+        assert data == gzip.decompress(b''.join(members))
+        with pytest.raises(ValueError):
+            reader.readmembers(path=str(sourcefile), start=0,
+                               end=len(members[0]) - 1)
+        with pytest.raises(ValueError):
+            reader.readmembers(path=str(sourcefile), start=1,
+                               end=len(members[0]))
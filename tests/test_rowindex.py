@@ -0,0 +1,56 @@
+"""
+Unit test for rowindex module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.rowindex import RowIndex
+import json
+import pickle
+
+
+class TestRowIndex(object):
+    """Test class for RowIndex"""
+
+    @staticmethod
+    def failures(*names):
+        return [(c, f, '') for c, f in names]
+
+    def test_merge(self):
+        """
+        Method to test merging the indexes of chunks, in and out of order
+        """
+        first = RowIndex.fromfailures(
+            lines=[2, 3, 5],
+            failures={0: self.failures(('EmptyCheck', 'count')),
+                      2: self.failures(('EmptyCheck', 'count'),
+                                       ('FormatCheck', 'Id'))})
+        second = RowIndex.fromfailures(
+            lines=[1, 2], failures={1: self.failures(('FormatCheck', 'Id'))})
+        second.shift(offset=5)
+        index = RowIndex()
+        index.merge(first)
+        index.merge(second)
+        assert index.keys() == [('EmptyCheck', 'count'), ('FormatCheck', 'Id')]
+        assert list(index.rows(column='count')) == [2, 5]
+        assert list(index.rows(check='FormatCheck')) == [5, 7]
+        assert list(index.rows()) == [2, 5, 7]
+        assert index.count(check='LengthCheck') == 0
+        reverse = RowIndex()
+        reverse.merge(second)
+        reverse.merge(first)
+        assert reverse == index
+
+    def test_serialize(self):
+        """
+        Method to test the json and pickle round trips
+        """
+        index = RowIndex.fromfailures(
+            lines=[4, 9], failures={0: self.failures(('EmptyCheck', 'a')),
+                                    1: self.failures(('LengthCheck', 'b'))})
+        value = json.loads(json.dumps(index.todict()))
+        assert value == {'EmptyCheck': {'a': [4]}, 'LengthCheck': {'b': [9]}}
+        assert RowIndex.fromdict(value=value) == index
+        assert pickle.loads(pickle.dumps(index)) == index
@@ -0,0 +1,116 @@
+"""
+Unit test for session module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile.session import ValidationSession
+from validatefile.main import ValidateFile
+from validatefile import session as sessionmodule
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pytest
+import time
+
+
+class TestValidationSession(object):
+    """Test class for ValidationSession"""
+
+    @pytest.fixture
+    def sourcedir(self, tmpdir):
+        """
+        Dir of a few source files
+        """
+        sourcedir = tmpdir.mkdir('source')
+        for n in range(5):
+            lines = ['Id,firstname,count']
+            lines.extend('{i},Ram,{c}'.format(i=i, c=i if i % 4 else '')
+                         for i in range(n * 3))
+            sourcedir.join('sample_2020030{n}.csv'.format(n=n))\
+                .write('\n'.join(lines) + '\n')
+        sourcedir.join('readme.txt').write('not a feed\n')
+        return sourcedir
+
+    @staticmethod
+    def configfile():
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        return os.path.join(testdir, 'static', 'fieldchecks.ini')
+
+    def test_validate(self, sourcedir):
+        """
+        Method to test that results match the ones of ValidateFile
+        """
+        sourcefile = str(sourcedir.join('sample_20200304.csv'))
+        expected = ValidateFile(configfile=self.configfile(),
+                                sourcefile=sourcefile).getresult()
+        with ValidationSession(processes=2) as session:
+            assert session.validate(configfile=self.configfile(),
+                                    sourcefile=sourcefile) == expected
+            pool = session.pool
+            assert session.validate(configfile=self.configfile(),
+                                    sourcefile=sourcefile) == expected
+            assert session.pool is pool
+            assert len(session._configs) == 1
+            res = list(session.iterresults(configfile=self.configfile(),
+                                           sourcefile=sourcefile,
+                                           failuresonly=True))
+            assert [r[0] for r in res[2:]] == [2, 6, 10]
+        with pytest.raises(ValueError):
+            session.validate(configfile=self.configfile(),
+                             sourcefile=sourcefile)
+
+    def test_validatemany(self, sourcedir):
+        """
+        Method to test validation of a dir and of a glob pattern
+        """
+        with ValidationSession(processes=2) as session:
+            res = session.validatemany(configfile=self.configfile(),
+                                       sources=str(sourcedir))
+            assert len(res) == 6
+            res = session.validatemany(
+                configfile=self.configfile(),
+                sources=str(sourcedir.join('*.csv')))
+        assert sorted(os.path.basename(f) for f in res) == \
+            ['sample_2020030{n}.csv'.format(n=n) for n in range(5)]
+        for n in range(5):
+            result = res[str(sourcedir.join('sample_2020030{n}.csv'
+                                            .format(n=n)))]['Results']
+            assert result['TotalRecordsAnalysed'] == n * 3
+        # A file failing to validate does not lose the others
+        sourcedir.join('sample_20200309.csv').write(b'\xff\xfe\n', mode='wb')
+        with ValidationSession(processes=2) as session:
+            res = session.validatemany(configfile=self.configfile(),
+                                       sources=str(sourcedir.join('*.csv')))
+        assert len(res) == 6
+        error = res[str(sourcedir.join('sample_20200309.csv'))]
+        assert error == {'Error': error['Error']}
+        assert 'UnicodeDecodeError' in error['Error']
+        assert res[str(sourcedir.join('sample_20200304.csv'))]['Results'][
+            'TotalRecordsAnalysed'] == 12
+
+    def test_sharedpool(self, sourcedir, monkeypatch):
+        """
+        Method to test that concurrent validations start one pool and keep
+        at most twice the workers of chunks in flight between them
+        """
+        started = []
+        pool = sessionmodule.Pool
+
+        def slowpool(*args, **kwargs):
+            time.sleep(0.2)
+            started.append(pool(*args, **kwargs))
+            return started[-1]
+
+        monkeypatch.setattr(sessionmodule, 'Pool', slowpool)
+        with ValidationSession(processes=2) as session:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                pools = list(executor.map(lambda _: session.pool, range(4)))
+            assert len(started) == 1
+            assert all(p is started[0] for p in pools)
+            res = session.validatemany(configfile=self.configfile(),
+                                       sources=str(sourcedir.join('*.csv')))
+            assert len(res) == 5
+        started[0].join()
+
@@ -0,0 +1,82 @@
+"""
+Unit test for unique module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile import unique
+from validatefile.unique import KeyIndex
+from array import array
+import os
+
+
+class TestUnique(object):
+    """Test class for unique module"""
+
+    def test_keydigests(self):
+        """
+        Method to test the digests of single and composite keys
+        """
+        rows = [['a', 'x'], ['b', 'y'], ['a', 'x'], ['', ''], ['a'],
+                ['a', 'y']]
+        digests, lines = unique.keydigests(rows=rows,
+                                           lines=[2, 3, 4, 5, 6, 7],
+                                           positions=(0, 1))
+        assert list(lines) == [2, 3, 4, 6, 7]
+        assert digests[0] == digests[2]
+        assert len(set(digests)) == 4
+        digests, lines = unique.keydigests(rows=rows,
+                                           lines=[2, 3, 4, 5, 6, 7],
+                                           positions=(0,))
+        assert len(set(digests)) == 2 and list(lines) == [2, 3, 4, 6, 7]
+
+    def test_partitions(self):
+        """
+        Method to test the partition count and the split of the digests
+        """
+        assert unique.partitioncount(entries=0, maxmemory=1000) == 64
+        assert unique.partitioncount(entries=10 ** 6, maxmemory=2 ** 20) \
+            == 128
+        assert unique.partitioncount(entries=10 ** 12, maxmemory=1) == \
+            unique.MAXPARTITIONS
+        parts = unique.partitiondigests(digests=array('Q', [9, 2, 17, 3]),
+                                        lines=array('Q', [2, 3, 4, 5]),
+                                        partitions=8)
+        assert {p: (list(d), list(n)) for p, (d, n) in parts.items()} == \
+            {1: ([9, 17], [2, 4]), 2: ([2], [3]), 3: ([3], [5])}
+
+    def test_findduplicates(self):
+        """
+        Method to test that later occurrences of a digest are duplicates
+        """
+        digests = array('Q', [5, 0, 7, 5, 0, 1 << 63, 5, 1 << 63])
+        lines = array('Q', range(2, 10))
+        assert list(unique.findduplicates((None, digests, lines))) == \
+            [5, 6, 8, 9]
+
+    def test_spill(self, tmpdir):
+        """
+        Method to test that spilled partitions give the same duplicates
+        """
+        digests = array('Q', [i * 7919 % 500 for i in range(2000)])
+        lines = array('Q', range(2000))
+        expected = set(range(500, 2000))
+        for maxmemory in (10 ** 9, 1000):
+            index = KeyIndex(maxmemory=maxmemory, partitions=8,
+                             spilldir=str(tmpdir))
+            for start in range(0, 2000, 100):
+                index.add(parts=unique.partitiondigests(
+                    digests=digests[start:start + 100],
+                    lines=lines[start:start + 100], partitions=8))
+            assert index.spilled == (maxmemory == 1000)
+            found = set()
+            size = 0
+            for partition in index.partitions():
+                found.update(unique.findduplicates(partition))
+                size += unique.dedupsize(partition)
+            assert size == 2000 * unique.DEDUPSIZE
+            assert found == expected
+            index.close()
+            assert os.listdir(str(tmpdir)) == []
@@ -0,0 +1,52 @@
+"""
+Unit test for writer module
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from validatefile import writer
+import gzip
+
+
+class TestWriter(object):
+    """Test class for writer module"""
+
+    def test_mergeshards(self, tmpdir):
+        """
+        Method to test that shards are merged in the given order
+        """
+        shards = list()
+        for seq in (1, 0, 2):
+            path = writer.shardpath(sharddir=str(tmpdir), seq=seq)
+            fo, out = writer.openshard(path=path)
+            with fo:
+                out.writerows([[seq, 'a'], [seq, None]])
+            shards.append(path)
+        assert shards[1].endswith('0000000000.txt')
+        outputfile = str(tmpdir.join('out.txt'))
+        writer.mergeshards(fieldnames=['n', 'v'], shards=sorted(shards),
+                           outputfile=outputfile)
+        with open(outputfile, 'rb') as fo:
+            assert fo.read() == (b'n\tv\r\n0\ta\r\n0\t\r\n1\ta\r\n1\t\r\n'
+                                 b'2\ta\r\n2\t\r\n')
+
+    def test_compress(self, tmpdir):
+        """
+        Method to test that compressed shards merge into a gzip file
+        """
+        shards = list()
+        for seq in range(2):
+            path = writer.shardpath(sharddir=str(tmpdir), seq=seq)
+            fo, out = writer.openshard(path=path, compress=True)
+            with fo:
+                out.writerow([seq, 'a'])
+            shards.append(path)
+        outputfile = str(tmpdir.join('out.txt.gz'))
+        writer.mergeshards(fieldnames=['n', 'v'], shards=shards,
+                           outputfile=outputfile, compress=True)
+        with open(outputfile, 'ab') as fo:
+            writer.writerows(rows=[[2, 'a']], fo=fo, compress=True)
+        with gzip.open(outputfile, 'rb') as fo:
+            assert fo.read() == b'n\tv\r\n0\ta\r\n1\ta\r\n2\ta\r\n'
@@ -0,0 +1,250 @@
+"""
+Module to validate files from an asyncio event loop
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+import asyncio
+import atexit
+import itertools
+import multiprocessing
+import os
+import threading
+from functools import partial
+from validatefile.cache import resetruncaches
+from validatefile.executor import BoundedPool
+from validatefile.main import ValidateFile
+
+
+_SHAREDPOOL = None
+# Number of workers of the shared pool
+SHAREDWORKERS = os.cpu_count() or 1
+# View of the shared pool bounding the chunks in flight of all the
+# validations to twice the workers
+_SHAREDBOUNDED = None
+_SHAREDPOOLLOCK = threading.Lock()
+_DONE = object()
+# Tokens of the last cancelled validations, a ring shared with the workers
+# of the shared pool, which skip the chunks of those validations
+CANCELLEDSLOTS = 256
+_CANCELLED = None
+_TOKENS = itertools.count(1)
+_NEXTSLOT = itertools.count()
+
+
+class ValidationCancelled(Exception):
+    pass
+
+
+def _initworker(cancelled) -> None:
+    """
+    Function to set up a worker of the shared pool
+    """
+    global _CANCELLED
+    _CANCELLED = cancelled
+    resetruncaches()
+
+
+def sharedpool():
+    """
+    Function to get the process pool shared by all the asynchronous
+    validations. It is started on first use and terminated at exit. Its
+    workers are started by a fork server where there is one, spawned
+    otherwise, as the calling process runs threads
+    """
+    global _SHAREDPOOL, _SHAREDBOUNDED, _CANCELLED
+    with _SHAREDPOOLLOCK:
+        if _SHAREDPOOL is None:
+            context = multiprocessing.get_context(
+                'forkserver' if 'forkserver' in
+                multiprocessing.get_all_start_methods() else 'spawn')
+            _CANCELLED = context.Array('Q', CANCELLEDSLOTS)
+            _SHAREDPOOL = context.Pool(processes=SHAREDWORKERS,
+                                       initializer=_initworker,
+                                       initargs=(_CANCELLED,))
+            _SHAREDBOUNDED = BoundedPool(pool=_SHAREDPOOL,
+                                         maxinflight=2 * SHAREDWORKERS)
+            atexit.register(shutdown)
+        return _SHAREDPOOL
+
+
+def _sharedbounded() -> BoundedPool:
+    """
+    Function to get the shared pool as used by the validations
+    """
+    sharedpool()
+    return _SHAREDBOUNDED
+
+
+def shutdown():
+    """
+    Function to terminate the shared process pool
+    """
+    global _SHAREDPOOL, _SHAREDBOUNDED
+    with _SHAREDPOOLLOCK:
+        if _SHAREDPOOL is not None:
+            _SHAREDPOOL.terminate()
+            _SHAREDPOOL.join()
+            _SHAREDPOOL = None
+            _SHAREDBOUNDED = None
+
+
+def cancel(token: int) -> None:
+    """
+    Function to have the workers of the shared pool skip the chunks of a
+    validation that are still queued
+    """
+    with _CANCELLED.get_lock():
+        _CANCELLED[next(_NEXTSLOT) % CANCELLEDSLOTS] = token
+
+
+def _guarded(token: int, func, *args):
+    """
+    Function run by the workers of the shared pool in place of a task of a
+    validation, raising ValidationCancelled if it was cancelled
+    """
+    if _CANCELLED is not None:
+        with _CANCELLED.get_lock():
+            cancelled = token in _CANCELLED[:]
+        if cancelled:
+            raise ValidationCancelled()
+    return func(*args)
+
+
+class CancellablePool(object):
+    """
+    View of the shared pool for a single validation, whose tasks are
+    skipped by the workers once the validation is cancelled
+    """
+
+    __slots__ = ('_pool', '_token')
+
+    def __init__(self, pool) -> None:
+        self._pool = pool
+        self._token = next(_TOKENS)
+
+    def apply_async(self, func, args: tuple = ()):
+        return self._pool.apply_async(_guarded,
+                                      (self._token, func) + tuple(args))
+
+    def cancel(self) -> None:
+        cancel(token=self._token)
+
+
+class AsyncValidateFile(object):
+    """
+    Class to validate a file from an asyncio event loop.
+    The records are validated by a process pool shared with the other
+    validations, which keep at most twice its workers of chunks in flight
+    between them, while starting the pool, reading the file and collecting
+    the results run in a thread of the executor, one chunk at a time, so
+    the event loop is never blocked.
+    Cancelling a validation stops it from reading and submitting further
+    chunks, and the workers of the shared pool skip its chunks still
+    queued. Only the chunks being validated at the time run to the end.
+    With a pool of your own, pass its number of workers as workers, and
+    the chunks already submitted are left to finish
+    """
+
+    __slots__ = ('_validatefile', '_pool', '_executor')
+
+    def __init__(self, configfile: str, sourcefile: str, pool=None,
+                 executor=None):
+        """
+        :param configfile: path of the config file
+        :param sourcefile: path of the file to validate
+        :param pool: multiprocessing Pool to validate the records with,
+                     the pool shared by all the validations by default
+        :param executor: concurrent.futures executor to read the file and
+                         collect the results in, the default executor of
+                         the event loop by default
+        """
+        self._validatefile = ValidateFile(configfile=configfile,
+                                          sourcefile=sourcefile)
+        self._pool = pool
+        self._executor = executor
+
+    async def _iterchunks(self, result: dict, **kwargs):
+        """
+        Asynchronous generator method to get the errors and chunk counts of
+        the validation, as yielded by ValidateFile._run()
+        :param result: validation result, filled in as the validation
+                       progresses
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        if pool is None:
+            # Starting the pool is left to the executor
+            pool = CancellablePool(pool=await loop.run_in_executor(
+                self._executor, _sharedbounded))
+            kwargs['workers'] = SHAREDWORKERS
+        run = self._validatefile._run(result=result, pool=pool, **kwargs)
+        while True:
+            future = loop.run_in_executor(self._executor, next, run, _DONE)
+            try:
+                value = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if isinstance(pool, CancellablePool):
+                    pool.cancel()
+                # The generator cannot be closed while a step is running in
+                # the executor, close it once the step is done. The step
+                # fails if it waits on a skipped chunk.
+                future.add_done_callback(self._closerun(run=run))
+                raise
+            if value is _DONE:
+                return
+            try:
+                yield value
+            except BaseException:
+                # The consumer stopped early
+                run.close()
+                raise
+
+    @staticmethod
+    def _closerun(run):
+        """
+        Method to get the callback closing the run of a cancelled
+        validation once its running step is done
+        """
+        def close(future):
+            if not future.cancelled():
+                future.exception()
+            run.close()
+        return close
+
+    async def getresult(self, outputdir: str = None, progress=None,
+                        **kwargs) -> dict:
+        """
+        Method to validate the file, see ValidateFile.getresult() for the
+        parameters and the result.
+        The progress callable is called in the event loop
+        """
+        result = ValidateFile._newresult()
+        if progress is not None:
+            progress = partial(asyncio.get_running_loop().call_soon_threadsafe,
+                               progress)
+        chunks = self._iterchunks(result=result, outputdir=outputdir,
+                                  progress=progress, **kwargs)
+        async for _ in chunks:
+            pass
+        return result
+
+    async def iterresults(self, failuresonly: bool = False,
+                          outputdir: str = None, progress=None, **kwargs):
+        """
+        Asynchronous generator method to stream the validation results, see
+        ValidateFile.iterresults() for the parameters and what is yielded.
+        The progress callable is called in the event loop
+        """
+        result = ValidateFile._newresult()
+        if progress is not None:
+            progress = partial(asyncio.get_running_loop().call_soon_threadsafe,
+                               progress)
+        chunks = self._iterchunks(
+            result=result, outputdir=outputdir,
+            records='failures' if failuresonly else 'all', progress=progress,
+            **kwargs)
+        async for value in chunks:
+            for item in ValidateFile._iterchunk(value=value):
+                yield item
@@ -0,0 +1,168 @@
+"""
+Module with the columnar engine that validates a chunk of records one
+column at a time
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from functools import partial
+from itertools import compress
+from operator import not_
+from time import process_time
+from validatefile import helper
+
+
+def validatebatch(plan: tuple, rows: list, caches: dict = None,
+                  timings: dict = None) -> dict:
+    """
+    Function that validates a chunk of positional records against a
+    compiled plan, column by column.
+    Returns a dict of row index to failures for the failing rows only,
+    with the failures of each row in the same order as per-record
+    validation would give them
+    :param plan: compiled plan as returned by ValidateFile._getplan()
+    :param rows: list of positional records
+    :param caches: optional dict of field position to VerdictCache
+    :param timings: optional dict to add the cpu seconds spent per check
+                    name under `Checks` and per field position under
+                    `Columns` to
+    """
+    failures = dict()
+    for column in plan:
+        if timings is not None:
+            start = process_time()
+        values = _column(rows=rows, idx=column[0])
+        offset = 0
+        cache = caches.get(column[0]) if caches else None
+        if cache is not None and cache.enabled:
+            verdicts = cache.verdicts(values=values,
+                                      compute=partial(validatevalue,
+                                                      column=column))
+            for i in compress(range(len(verdicts)), verdicts):
+                failures.setdefault(i, []).extend(verdicts[i])
+            # The cache stops short of the values when it switches off
+            offset = len(verdicts)
+            values = values[offset:]
+        if values:
+            _validatecolumn(column=column, values=values, offset=offset,
+                            failures=failures, timings=timings)
+        if timings is not None:
+            _addtime(timings=timings['Columns'], key=column[0], start=start)
+    return failures
+
+
+def _addtime(timings: dict, key, start: float) -> None:
+    """
+    Function that adds the cpu seconds since start to a key of timings
+    """
+    timings[key] = timings.get(key, 0.0) + process_time() - start
+
+
+def validatevalue(value: str, column: tuple) -> tuple:
+    """
+    Function that validates a single value against a column of a compiled
+    plan. Returns the failures of the value
+    :param value: value of the field
+    :param column: (position, emptyfailure, numeric, checks) plan entry
+    """
+    _, emptyfail, numeric, checks = column
+    if not value.strip():
+        return (emptyfail,) if emptyfail else ()
+    failures = list()
+    if numeric:
+        kind = helper.classifynumber(value=value)
+        for accepted, fail in numeric:
+            if kind not in accepted:
+                failures.append(fail)
+    for check, fail in checks:
+        if not check(value):
+            failures.append(fail)
+    return tuple(failures)
+
+
+def _validatecolumn(column: tuple, values: list, offset: int,
+                    failures: dict, timings: dict = None) -> None:
+    """
+    Function that validates the values of a column and adds their failures
+    to the failures of the rows
+    :param column: (position, emptyfailure, numeric, checks) plan entry
+    :param values: values of the column
+    :param offset: row index of the first value
+    :param failures: dict of row index to failures
+    :param timings: optional dict to add the cpu seconds spent per check
+                    name under `Checks` to. The shared classification of the
+                    numeric checks is added to the first of them
+    """
+    _, emptyfail, numeric, checks = column
+    if timings is not None:
+        timings = timings['Checks']
+        start = process_time()
+    empty = [not v.strip() for v in values]
+    if any(empty):
+        if emptyfail:
+            for i in compress(range(len(values)), empty):
+                failures.setdefault(i + offset, []).append(emptyfail)
+        positions = list(compress(range(len(values)), map(not_, empty)))
+        values = [values[i] for i in positions]
+    else:
+        positions = None
+    if timings is not None and emptyfail:
+        _addtime(timings=timings, key=emptyfail[0], start=start)
+    if not values:
+        return
+    checkfailures = list()
+    if numeric:
+        if timings is not None:
+            start = process_time()
+        kinds = helper.classifynumbers(values=values)
+        for accepted, fail in numeric:
+            checkfailures.append(
+                ([i for i, k in enumerate(kinds) if k not in accepted], fail))
+            if timings is not None:
+                _addtime(timings=timings, key=fail[0], start=start)
+                start = process_time()
+    for check, fail in checks:
+        if timings is not None:
+            start = process_time()
+        if isinstance(check, partial) and \
+                check.func is helper.isexpectedlength:
+            bad = _lengthfailures(values=values, **check.keywords)
+        else:
+            bad = compress(range(len(values)),
+                           map(not_, map(check, values)))
+        if timings is not None:
+            # The check runs as the failures are collected
+            bad = list(bad)
+            _addtime(timings=timings, key=fail[0], start=start)
+        checkfailures.append((bad, fail))
+    for bad, fail in checkfailures:
+        for i in bad:
+            if positions is not None:
+                i = positions[i]
+            failures.setdefault(i + offset, []).append(fail)
+
+
+def _column(rows: list, idx: int) -> list:
+    """
+    Function that extracts a column, treating missing fields as empty
+    """
+    try:
+        return [row[idx] for row in rows]
+    except IndexError:
+        return [row[idx] if idx < len(row) else '' for row in rows]
+
+
+def _lengthfailures(values: list, maxvalue: int,
+                    minvalue: int = None) -> list:
+    """
+    Function that returns the positions failing a length check
+    """
+    lengths = map(len, values)
+    if minvalue and maxvalue:
+        return [i for i, n in enumerate(lengths)
+                if not minvalue <= n <= maxvalue]
+    elif maxvalue:
+        return [i for i, n in enumerate(lengths) if n > maxvalue]
+    return list(range(len(values)))
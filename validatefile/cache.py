@@ -0,0 +1,158 @@
+"""
+Module with the bounded LRU cache of per-value verdicts
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import threading
+from collections import OrderedDict
+
+
+# Verdict caches kept by this process across the chunks of the runs it
+# validates, per run id then thread id, the least recently used run first
+_RUNCACHES = OrderedDict()
+_RUNCACHESLOCK = threading.Lock()
+# Number of runs whose caches a process keeps at once. Only the parent
+# drops the caches of a finished run, so workers of a long-lived pool let
+# them go as new runs come
+MAXRUNCACHES = 8
+
+
+class VerdictCache(object):
+    """
+    Bounded LRU cache of the failures found for the values of a column.
+    The cache switches itself off once the hit rate after the warm up stays
+    below the minimum hit rate
+    """
+    __slots__ = ('_maxsize', '_minhitrate', '_warmup', '_data', 'hits',
+                 'misses', 'evictions', 'enabled', '_reported')
+
+    def __init__(self, maxsize: int, minhitrate: float = 0.5,
+                 warmup: int = 1000) -> None:
+        self._maxsize = maxsize
+        self._minhitrate = minhitrate
+        self._warmup = warmup
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.enabled = True
+        # Counts as of the last call to newstats()
+        self._reported = (0, 0, 0)
+
+    def verdict(self, value: str, compute):
+        """
+        Method to get the verdict of a value, computing and caching it if
+        it is missing
+        :param value: value of the column
+        :param compute: callable returning the verdict of a single value
+        """
+        if not self.enabled:
+            return compute(value)
+        return self.verdicts(values=(value,), compute=compute)[0]
+
+    def verdicts(self, values, compute) -> list:
+        """
+        Method to get the verdict of each value, computing and caching the
+        ones that are missing. The hit rate is checked every warm up
+        lookups, so the returned list stops short of the values when the
+        cache switches itself off
+        :param values: values of the column
+        :param compute: callable returning the verdict of a single value
+        """
+        data = self._data
+        ret = list()
+        for start in range(0, len(values), self._warmup):
+            if not self.enabled:
+                break
+            block = values[start:start + self._warmup]
+            hits = 0
+            for v in block:
+                try:
+                    verdict = data[v]
+                except KeyError:
+                    verdict = compute(v)
+                    data[v] = verdict
+                    if len(data) > self._maxsize:
+                        data.popitem(last=False)
+                        self.evictions += 1
+                else:
+                    data.move_to_end(v)
+                    hits += 1
+                ret.append(verdict)
+            self.hits += hits
+            self.misses += len(block) - hits
+            self._checkhitrate()
+        return ret
+
+    def _checkhitrate(self) -> None:
+        """
+        Method to switch the cache off when it does not pay off
+        """
+        lookups = self.hits + self.misses
+        if lookups >= self._warmup and \
+                self.hits < lookups * self._minhitrate:
+            self.enabled = False
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        Method to get the hit, miss and eviction counts
+        """
+        return {'Hits': self.hits, 'Misses': self.misses,
+                'Evictions': self.evictions, 'Disabled': not self.enabled}
+
+    def newstats(self) -> dict:
+        """
+        Method to get the hit, miss and eviction counts since the previous
+        call, for caches that outlive a chunk
+        """
+        hits, misses, evictions = self._reported
+        self._reported = (self.hits, self.misses, self.evictions)
+        return {'Hits': self.hits - hits, 'Misses': self.misses - misses,
+                'Evictions': self.evictions - evictions,
+                'Disabled': not self.enabled}
+
+
+def runcaches(runid: str, columns: tuple, maxsize: int) -> dict:
+    """
+    Function that returns the verdict caches of the fields of a run for the
+    calling thread, created on first use and kept for the next chunks of
+    the run, so their contents and hit rates carry over
+    :param runid: id of the run
+    :param columns: positions of the cached fields
+    :param maxsize: maximum number of values per cache
+    """
+    ident = threading.get_ident()
+    with _RUNCACHESLOCK:
+        threads = _RUNCACHES.get(runid)
+        if threads is None:
+            threads = _RUNCACHES[runid] = dict()
+            while len(_RUNCACHES) > MAXRUNCACHES:
+                _RUNCACHES.popitem(last=False)
+        else:
+            _RUNCACHES.move_to_end(runid)
+        caches = threads.get(ident)
+        if caches is None:
+            caches = threads[ident] = {idx: VerdictCache(maxsize=maxsize)
+                                       for idx in columns}
+    return caches
+
+
+def dropruncaches(runid: str) -> None:
+    """
+    Function that drops the verdict caches of a run held by this process
+    """
+    with _RUNCACHESLOCK:
+        _RUNCACHES.pop(runid, None)
+
+
+def resetruncaches() -> None:
+    """
+    Function that drops all the verdict caches held by this process, used
+    as the initializer of worker processes
+    """
+    with _RUNCACHESLOCK:
+        _RUNCACHES.clear()
@@ -0,0 +1,96 @@
+"""
+Module to save and load the checkpoints of a validation run
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import hashlib
+import json
+import os
+import time
+
+
+class Checkpoint(object):
+    """
+    Class for the checkpoint file of a validation run. It holds the byte
+    offset and line of the last record of the last chunk fully processed,
+    the counts so far and the size of the output file at that point.
+    It is saved at most once per interval, atomically, so a crash leaves
+    either the previous or the new checkpoint
+    """
+
+    __slots__ = ('_path', '_interval', '_savedat', '_stamp')
+
+    def __init__(self, path: str, interval: float, sourcefile: str,
+                 configfile: str) -> None:
+        """
+        :param path: path of the checkpoint file
+        :param interval: minimum number of seconds between two saves
+        :param sourcefile: path of the source file
+        :param configfile: path of the config file
+        """
+        self._path = path
+        self._interval = interval or 0
+        self._savedat = time.monotonic()
+        self._stamp = self.stamp(sourcefile=sourcefile,
+                                 configfile=configfile)
+
+    @staticmethod
+    def stamp(sourcefile: str, configfile: str) -> dict:
+        """
+        Method to get what identifies the source and config files, which
+        must not change between a checkpoint and the resumed run
+        """
+        stat = os.stat(sourcefile)
+        with open(configfile, 'rb') as fb:
+            config = hashlib.sha256(fb.read()).hexdigest()
+        return {'SourceSize': stat.st_size, 'SourceMtime': stat.st_mtime_ns,
+                'Config': config}
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self) -> dict:
+        """
+        Method to load the saved state, None if there is no checkpoint.
+        Raises ValueError if the source or the config file changed since
+        """
+        try:
+            with open(self._path, 'r', encoding='utf-8') as fo:
+                state = json.load(fo)
+        except FileNotFoundError:
+            return None
+        if any(state.get(k) != v for k, v in self._stamp.items()):
+            raise ValueError('The source or config file changed since the'
+                             ' checkpoint {path}'.format(path=self._path))
+        return state
+
+    def due(self) -> bool:
+        """
+        Method to check whether the interval has passed since the last save
+        """
+        return time.monotonic() - self._savedat >= self._interval
+
+    def save(self, state: dict) -> None:
+        """
+        Method to save the state, replacing the previous one
+        """
+        temppath = self._path + '.tmp'
+        with open(temppath, 'w', encoding='utf-8') as fo:
+            json.dump(dict(state, **self._stamp), fo)
+            fo.flush()
+            os.fsync(fo.fileno())
+        os.replace(temppath, self._path)
+        self._savedat = time.monotonic()
+
+    def remove(self) -> None:
+        """
+        Method to remove the checkpoint once the run is complete
+        """
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
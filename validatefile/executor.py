@@ -0,0 +1,108 @@
+"""
+Module with the executors the chunks of records are validated with
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import multiprocessing
+import threading
+from multiprocessing.pool import ThreadPool
+from validatefile.cache import resetruncaches
+
+
+EXECUTORS = ('serial', 'thread', 'process')
+
+
+class SerialPool(object):
+    """
+    In-process stand-in for a multiprocessing Pool, running each task as
+    it is submitted. It saves starting workers for small files
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> 'SerialPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    @staticmethod
+    def apply_async(func, args: tuple = ()) -> 'SerialResult':
+        try:
+            return SerialResult(value=func(*args))
+        except Exception as e:
+            return SerialResult(error=e)
+
+    def close(self) -> None:
+        pass
+
+    def join(self) -> None:
+        pass
+
+    def terminate(self) -> None:
+        pass
+
+
+class SerialResult(object):
+    """
+    Result of a task run by SerialPool, with the get() of an AsyncResult
+    """
+
+    __slots__ = ('_value', '_error')
+
+    def __init__(self, value=None, error: Exception = None) -> None:
+        self._value = value
+        self._error = error
+
+    def get(self, timeout: float = None):
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class BoundedPool(object):
+    """
+    View of a pool shared by concurrent validations, which holds off
+    submitting a task while maxinflight tasks of any of them are queued or
+    running, so their number does not grow with the number of validations
+    """
+
+    __slots__ = ('_pool', '_slots')
+
+    def __init__(self, pool, maxinflight: int) -> None:
+        self._pool = pool
+        self._slots = threading.BoundedSemaphore(maxinflight)
+
+    def apply_async(self, func, args: tuple = ()):
+        self._slots.acquire()
+        try:
+            return self._pool.apply_async(func, args,
+                                          callback=self._release,
+                                          error_callback=self._release)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, _) -> None:
+        self._slots.release()
+
+
+def newpool(executor: str, workers: int, startmethod: str = None):
+    """
+    Function that starts a pool of the given kind: 'serial' to run the
+    tasks in process, 'thread' for a pool of threads, which pays off on
+    free-threaded builds, or 'process' for a pool of processes started
+    with the given start method ('fork', 'spawn' or 'forkserver')
+    """
+    if executor == 'serial':
+        return SerialPool()
+    if executor == 'thread':
+        return ThreadPool(processes=workers)
+    if executor == 'process':
+        return multiprocessing.get_context(startmethod).Pool(
+            processes=workers, initializer=resetruncaches)
+    raise ValueError('executor must be one of {kinds}'
+                     .format(kinds=', '.join(EXECUTORS)))
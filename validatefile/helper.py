@@ -6,7 +6,15 @@ __Author__ = "Ram J"
 __PyVersion__ = 3
 
 
+import math
+import os
 import re
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
 
 
 def isempty(value: str) -> bool:
@@ -20,42 +28,91 @@ def isnumeric(value: str) -> bool:
     """
     Function that checks for numeric
     """
-    try:
-        val = eval(value)
-    except Exception:
-        return False
-    if isinstance(val, int) or isinstance(val, float):
-        return True
-    else:
-        return False
+    return classifynumber(value=value) != NOTNUMERIC
 
 
 def isinteger(value: str) -> bool:
     """
     Function that checks for interger
     """
-    try:
-        val = eval(value)
-    except Exception:
-        return False
-    if isinstance(val, int):
-        return True
-    else:
-        return False
+    return classifynumber(value=value) == INTEGER
 
 
 def isdecimal(value: str) -> bool:
     """
     Function that checks for decimal
     """
+    return classifynumber(value=value) == DECIMAL
+
+
+# Kinds of number returned by classifynumber
+NOTNUMERIC, INTEGER, DECIMAL = 0, 1, 2
+
+# Python integer and float literals, with any number of signs and the
+# whitespace eval() tolerates around them
+_DIGITS = r'[0-9](?:_?[0-9])*'
+_INTEGER = (r'(?:[1-9](?:_?[0-9])*|0(?:_?0)*|0[xX](?:_?[0-9a-fA-F])+|'
+            r'0[oO](?:_?[0-7])+|0[bB](?:_?[01])+)')
+_POINTFLOAT = r'(?:(?:{d})?\.{d}|{d}\.)'.format(d=_DIGITS)
+_EXPONENT = r'[eE][+-]?{d}'.format(d=_DIGITS)
+_DECIMAL = r'(?:{p}(?:{e})?|{d}{e})'.format(p=_POINTFLOAT, e=_EXPONENT,
+                                           d=_DIGITS)
+_NUMBER = (r'[ \t\f\r\n]*(?:[+-][ \t\f]*)*(?:({i})|({d}))[ \t\f\r\n]*'
+           .format(i=_INTEGER, d=_DECIMAL))
+_NUMBERMATCH = re.compile(_NUMBER).fullmatch
+# One match per line of a newline-joined batch of values, the groups being
+# empty for values that are not numbers
+_NUMBERLINES = re.compile(r'^(?:[ \t\f\r]*(?:[+-][ \t\f]*)*(?:({i})|({d}))'
+                          r'[ \t\f\r]*|.*)$'.format(i=_INTEGER, d=_DECIMAL),
+                          flags=re.MULTILINE)
+
+
+def classifynumber(value: str) -> int:
+    """
+    Function that classifies a value as INTEGER, DECIMAL or NOTNUMERIC in
+    a single pass. Integers and decimals follow the python literal syntax
+    (signs, underscores, exponents, hex/octal/binary integers) without
+    evaluating the value
+    """
+    if not isinstance(value, str):
+        return NOTNUMERIC
+    match = _NUMBERMATCH(value)
+    if match is None:
+        return NOTNUMERIC
+    return INTEGER if match.group(1) else DECIMAL
+
+
+def classifynumbers(values: list) -> list:
+    """
+    Function that classifies a list of values, as classifynumber would,
+    in a single regex pass over the newline-joined values
+    """
+    text = '\n'.join(values)
+    if text.count('\n') == len(values) - 1:
+        found = _NUMBERLINES.findall(text)
+        if len(found) == len(values):
+            return [INTEGER if i else DECIMAL if d else NOTNUMERIC
+                    for i, d in found]
+    return [classifynumber(value=v) for v in values]
+
+
+def tonumber(value: str, kind: int):
+    """
+    Function that converts a value classified as INTEGER or DECIMAL by
+    classifynumber to an int or a float, without evaluating it. Returns
+    None for an integer too long to convert (over 4300 digits by default
+    from python 3.11)
+    """
+    text = value.strip(' \t\f\r\n')
+    negative = False
+    while text[0] in '+-':
+        negative ^= text[0] == '-'
+        text = text[1:].lstrip(' \t\f')
     try:
-        val = eval(value)
-    except Exception:
-        return False
-    if isinstance(val, float):
-        return True
-    else:
-        return False
+        number = int(text, 0) if kind == INTEGER else float(text)
+    except ValueError:
+        return None
+    return -number if negative else number
 
 
 def isexpectedformat(string: str, pattern: str, count: int = None,
@@ -64,25 +121,32 @@ def isexpectedformat(string: str, pattern: str, count: int = None,
     Function that checks for the given format.
     Providing optional parameter count will check for the number of occurences
     """
+    check = compileformat(pattern=pattern, count=count, ignorecase=ignorecase)
+    return True if check(string) else False
+
+
+def compileformat(pattern: str, count: int = None, ignorecase: bool = False):
+    """
+    Function that compiles the given format into a reusable check.
+    The returned callable takes the string to be checked and is truthy
+    under the same rules as isexpectedformat
+    """
     if count is not None and count == 0:
         raise ValueError('If provided, count should be greater than zero')
-    if count:
-        if ignorecase:
-            pattern = re.compile(pattern=pattern, flags=re.IGNORECASE)
-        else:
-            pattern = re.compile(pattern=pattern)
-        res = pattern.findall(string=string)
-        if res and (len(res) == count):
-            return True
+    if ignorecase:
+        pattern = re.compile(pattern=pattern, flags=re.IGNORECASE)
     else:
-        if ignorecase:
-            pattern = re.compile(pattern=pattern, flags=re.IGNORECASE)
-        else:
-            pattern = re.compile(pattern=pattern)
-        res = pattern.fullmatch(string=string)
-        if res:
-            return True
-    return False
+        pattern = re.compile(pattern=pattern)
+    if count:
+        return partial(_hascount, pattern, count)
+    return pattern.fullmatch
+
+
+def _hascount(pattern, count: int, string: str) -> bool:
+    """
+    Function that checks the number of occurences of a compiled pattern
+    """
+    return len(pattern.findall(string)) == count
 
 
 def isexpectedlength(value: str, maxvalue: int, minvalue: int = None) -> bool:
@@ -95,3 +159,140 @@ def isexpectedlength(value: str, maxvalue: int, minvalue: int = None) -> bool:
         return True if minvalue <= length <= maxvalue else False
     elif maxvalue:
         return True if length <= maxvalue else False
+
+
+def chunked(iterable, size: int):
+    """
+    Function that groups the items of an iterable into lists of the given
+    size. The last list holds the remaining items
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imapbounded(pool, func, iterable, maxinflight: int, weight=None,
+                maxweight: int = None, full=None):
+    """
+    Function that maps func over the iterable with the pool, like
+    Pool.imap, but only takes the next item from the iterable while fewer
+    than maxinflight items are being processed. Results are yielded in
+    order, and the items wait for them to be consumed. With weight and
+    maxweight, an item also waits while the summed weight of the items
+    being processed would exceed maxweight, and with full while full()
+    returns True. An item never waits for an empty pool
+    """
+    pending = deque()
+    load = 0
+    for item in iterable:
+        cost = weight(item) if weight else 0
+        while pending and (len(pending) >= maxinflight or
+                           (maxweight and load + cost > maxweight) or
+                           (full and full())):
+            res, done = pending.popleft()
+            load -= done
+            yield res.get()
+        pending.append((pool.apply_async(func, (item,)), cost))
+        load += cost
+    while pending:
+        yield pending.popleft()[0].get()
+
+
+def residentmemory() -> int:
+    """
+    Function that returns the resident memory of the process in bytes, its
+    peak resident memory where the current one is not known, or 0 where
+    neither is
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as fo:
+            return int(fo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peakmemory() or 0
+
+
+def peakmemory(children: bool = False) -> int:
+    """
+    Function that returns the peak resident memory of the process in bytes
+    over its life, or None where the resource module is missing (Windows)
+    :param children: set to True to return the highest of the peaks of the
+                     process and of its child processes waited for
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        rss = max(rss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Bytes on macOS, KiB elsewhere
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+@contextmanager
+def timed(timings: dict, key: str):
+    """
+    Context manager that adds the wall seconds spent in its block to a key
+    of timings, and does nothing when timings is None
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[key] = timings.get(key, 0.0) + time.perf_counter() - start
+
+
+def timediter(iterable, timings: dict, key: str):
+    """
+    Generator function that adds the wall seconds spent getting the items
+    of the iterable to a key of timings
+    """
+    iterator = iter(iterable)
+    while True:
+        with timed(timings=timings, key=key):
+            item = next(iterator, timediter)
+        if item is timediter:
+            return
+        yield item
+
+
+def zscore(confidence: float) -> float:
+    """
+    Function that returns the z score of a two-sided confidence level of
+    the normal distribution, e.g. 1.96 for 0.95
+    """
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be between 0 and 1')
+    low, high = 0.0, 40.0
+    # Bisection on the cumulative distribution, precise to 1e-12
+    while high - low > 1e-12:
+        mid = (low + high) / 2
+        if math.erf(mid / math.sqrt(2)) < confidence:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def wilsoninterval(count: int, total: int, confidence: float = 0.95) -> tuple:
+    """
+    Function that returns the Wilson score interval (lower, upper) of a
+    proportion of count in total. It stays within [0, 1] and holds for
+    proportions close to 0 or 1 and small totals
+    """
+    if not total:
+        return 0.0, 1.0
+    z = zscore(confidence=confidence)
+    p = count / total
+    denominator = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total +
+                           z * z / (4 * total * total)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
@@ -2,22 +2,77 @@ __Author__ = "Ram Prakash Jayapalan"
 __PyVersion__ = 3
 
 
+import ast
 import configparser
+import copy
+import gzip
+import hashlib
+import pickle
+import io
 import os
 import re
 import csv
-from multiprocessing import Pool, Manager, Process
-from validatefile import helper
+from bisect import bisect_left, bisect_right
+from contextlib import nullcontext
+from array import array
+from itertools import islice
+from validatefile import helper, batch, reader, writer
+from validatefile.executor import EXECUTORS, newpool
+from validatefile import cache
+from validatefile.checkpoint import Checkpoint
+from validatefile.progress import ProgressMeter
+from validatefile.rowindex import RowIndex
+from validatefile import profiler, unique
+from collections import deque
 import random
+import shutil
+import tempfile
 from datetime import datetime
 from functools import partial
 import logging
 import time
+import uuid
 
-logging.basicConfig(level='INFO',
-                    format='%(asctime)s:%(name)s:%(levelname)s:%(message)s')
 log = logging.getLogger('ValidateFile')
 
+# Values of Quoting under global.settings: quoted fields are parsed by the
+# csv module, or the records are split on the delimiter as they are
+QUOTING = ('minimal', 'none')
+# Records per chunk handed to a worker, at most
+CHUNKSIZE = 25000
+# Records per chunk the adaptive sizing goes down to, and chunks per
+# worker it aims for so the workers stay evenly loaded
+MINCHUNKSIZE = 1000
+CHUNKSPERWORKER = 4
+# Records validated in process to estimate the throughput of a file
+PROBEROWS = 2000
+# Estimated seconds of validation in process under which starting a pool
+# of workers does not pay off
+SERIALSECONDS = 0.5
+# Bytes of key digests held in memory by the unique check before they are
+# spilled to disk
+UNIQUEMEMORY = 256 * 1024 * 1024
+# Bytes read from the start of a file to estimate its record count
+ESTIMATEBYTES = 1024 * 1024
+# Assumed compression ratio of compressed files when estimating their
+# record count
+COMPRESSIONRATIO = 5
+# Approximate size of a byte range read by a worker in parallel read mode
+RANGESIZE = 16 * 1024 * 1024
+# Bytes of a followed file read at a time, each block giving a report
+FOLLOWBYTES = 16 * 1024 * 1024
+# Default number of seconds between two checkpoints of a resumed run
+CHECKPOINTINTERVAL = 60
+# Changed whenever the cached config layout changes, to leave old caches
+CONFIGCACHEVERSION = b'3\n'
+# Keys of the cached config that a cache of an older layout may lack
+CONFIGKEYS = ('Quoting', '_RawSplit', 'UniqueCheck', 'UniqueCheckDesc')
+# Letter of each check in the compact error codes of the output
+CHECKCODES = {'EmptyCheck': 'E', 'NumericCheck': 'N', 'IntegerCheck': 'I',
+              'DecimalCheck': 'D', 'FormatCheck': 'F', 'LengthCheck': 'L',
+              'UniqueCheck': 'U'}
+OUTPUTMODES = ('all', 'errors')
+
 
 class SectionMissingError(Exception):
     pass
@@ -27,15 +82,81 @@ class ValidateFile(object):
     """
     File validation class
     """
-    __slots__ = ('_configfile', '_sourcefile', '_dictconfig', '_outputqueue')
+    __slots__ = ('_configfile', '_sourcefile', '_dictconfig', '_formats',
+                 '_lengths', '_plans')
 
-    def __init__(self, configfile: str, sourcefile: str) -> None:
+    def __init__(self, configfile: str, sourcefile: str,
+                 cachedir: str = None) -> None:
+        """
+        :param configfile: path of the config file
+        :param sourcefile: path of the file to validate
+        :param cachedir: dir to cache the parsed config in, keyed by the
+                         content of the config file, so it is only parsed
+                         once
+        """
         self._configfile = configfile
         self._sourcefile = sourcefile
         self._dictconfig = None
-        self._outputqueue = Manager().Queue()
-        # Set config file as dict object
+        self._formats = None
+        self._lengths = None
+        self._plans = dict()
+        if cachedir:
+            self._set_cachedconfig(cachedir=cachedir)
+        else:
+            # Set config file as dict object
+            self._set_dictconfig()
+            # Compile the column rules once so records need no config
+            # lookups
+            self._set_rules()
+
+    def withsource(self, sourcefile: str) -> 'ValidateFile':
+        """
+        Method to get a validator of another source file with the same
+        config, reusing the parsed config and the compiled rules
+        :param sourcefile: path of the file to validate
+        """
+        val = copy.copy(self)
+        val._sourcefile = sourcefile
+        return val
+
+    def _set_cachedconfig(self, cachedir: str) -> None:
+        """
+        Setter method to load the parsed config and rules from the cache
+        dir, or to parse the config file and cache them
+        :param cachedir: cache dir
+        """
+        with open(self._configfile, 'rb') as fb:
+            key = hashlib.sha256(CONFIGCACHEVERSION + fb.read()).hexdigest()
+        path = os.path.join(cachedir, key + '.pickle')
+        try:
+            with open(path, 'rb') as fb:
+                dictconfig, formats, lengths = pickle.load(fb)
+            if all(k in dictconfig for k in CONFIGKEYS):
+                self._dictconfig = dictconfig
+                self._formats = formats
+                self._lengths = lengths
+                return
+            log.warning('Ignoring config cache {path} of an older layout'
+                        .format(path=path))
+        except FileNotFoundError:
+            pass
+        except (OSError, EOFError, ValueError, TypeError,
+                pickle.UnpicklingError):
+            log.warning('Ignoring unreadable config cache {path}'
+                        .format(path=path))
         self._set_dictconfig()
+        self._set_rules()
+        # Written to a temp file first, so other processes never load a
+        # partial cache
+        fd, temppath = tempfile.mkstemp(dir=cachedir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fb:
+                pickle.dump((self._dictconfig, self._formats, self._lengths),
+                            fb, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temppath, path)
+        except BaseException:
+            os.remove(temppath)
+            raise
 
     def _set_dictconfig(self) -> None:
         """
@@ -56,6 +177,18 @@ class ValidateFile(object):
                            ' global.settings section')
         dictconfig['Delimiter'] = config['global.settings']['Delimiter']
         dictconfig['Encoding'] = config['global.settings']['Encoding']
+        dictconfig['_Delimiter'] = dictconfig['Delimiter'].encode()\
+            .decode('unicode_escape')
+        dictconfig['Quoting'] = config.get('global.settings', 'Quoting',
+                                           fallback='minimal').lower()
+        if dictconfig['Quoting'] not in QUOTING:
+            raise ValueError('Quoting under global.settings must be one of'
+                             ' {values}'.format(values=', '.join(QUOTING)))
+        # Unquoted files are split on raw bytes, which needs the delimiter
+        # and the newline to be single bytes
+        dictconfig['_RawSplit'] = dictconfig['Quoting'] == 'none' and \
+            reader.isasciicompatible(encoding=dictconfig['Encoding']) and \
+            len(dictconfig['_Delimiter'].encode(dictconfig['Encoding'])) == 1
         dictconfig['Filename'] = config.get('file.rules', 'Filename',
                                             fallback=None)
         dictconfig['FilenameError'] = config.get('file.rules',
@@ -113,8 +246,11 @@ class ValidateFile(object):
         dictconfig['DecimalCheckDesc'] = config.get('DecimalCheck.description',
                                                     'Description',
                                                     fallback=fb)
-        dictconfig['FormatCheck'] = [{c: eval(config.get('FormatCheck', c))}
-                                     for c in config['FormatCheck']]
+        dictconfig['FormatCheck'] = [
+            {c: self._parserule(section='FormatCheck', fieldname=c,
+                                value=config.get('FormatCheck', c),
+                                required='pattern')}
+            for c in config['FormatCheck']]
         val = dict()
         for idx, item in enumerate(dictconfig['FormatCheck']):
             for k, v in item.items():
@@ -127,8 +263,11 @@ class ValidateFile(object):
         dictconfig['FormatCheckDesc'] = config.get('FormatCheck.description',
                                                    'Description',
                                                    fallback=fb)
-        dictconfig['LengthCheck'] = [{c: eval(config.get('LengthCheck', c))}
-                                     for c in config['LengthCheck']]
+        dictconfig['LengthCheck'] = [
+            {c: self._parserule(section='LengthCheck', fieldname=c,
+                                value=config.get('LengthCheck', c),
+                                required='max')}
+            for c in config['LengthCheck']]
         val = dict()
         for idx, item in enumerate(dictconfig['LengthCheck']):
             for k, v in item.items():
@@ -141,8 +280,121 @@ class ValidateFile(object):
         dictconfig['LengthCheckDesc'] = config.get('LengthCheck.description',
                                                    'Description',
                                                    fallback=fb)
+        # A field name, or a key name with the comma separated fields of a
+        # composite key
+        dictconfig['UniqueCheck'] = {
+            k: [c.strip() for c in v.split(',')] if v else [k]
+            for k, v in config['UniqueCheck'].items()} \
+            if config.has_section('UniqueCheck') else {}
+        fb = '"{fieldname}" failed unique check'
+        dictconfig['UniqueCheckDesc'] = config.get('UniqueCheck.description',
+                                                   'Description',
+                                                   fallback=fb)
         self._dictconfig = dictconfig
 
+    @staticmethod
+    def _parserule(section: str, fieldname: str, value: str,
+                   required: str) -> dict:
+        """
+        Method to parse the dict literal of a FormatCheck or LengthCheck
+        entry, without evaluating it
+        :param section: section of the entry
+        :param fieldname: field of the entry
+        :param value: dict literal
+        :param required: key the dict must have
+        """
+        try:
+            rule = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            rule = None
+        if not isinstance(rule, dict) or required not in rule:
+            raise ValueError('{section} entry of "{fieldname}" must be a dict'
+                             ' with a "{required}" key'
+                             .format(section=section, fieldname=fieldname,
+                                     required=required))
+        return rule
+
+    def _set_rules(self) -> None:
+        """
+        Setter method to compile the FormatCheck and LengthCheck rules into
+        reusable checks, in the same order as their config entries
+        """
+        formats = list()
+        for item in self._dictconfig['FormatCheck']:
+            d = [v for v in item.values()][0]
+            formats.append(helper.compileformat(
+                pattern=d['pattern'], count=d.get('count', None),
+                ignorecase=d.get('ignorecase', False)))
+        lengths = list()
+        for item in self._dictconfig['LengthCheck']:
+            d = [v for v in item.values()][0]
+            lengths.append(partial(helper.isexpectedlength,
+                                   maxvalue=d['max'],
+                                   minvalue=d.get('min', None)))
+        self._formats = formats
+        self._lengths = lengths
+        self._plans = dict()
+
+    def _compilecolumn(self, fieldname: str) -> tuple:
+        """
+        Method to compile the checks that apply to a single field.
+        Returns the empty check failure (or None), a tuple of
+        (accepted kinds, failure) pairs for the numeric checks, which share
+        a single classification of the value, and a tuple of
+        (check, failure) pairs for the other checks. A failure is a
+        pre-formatted (checkname, fieldname, description) tuple
+        :param fieldname: name of the field as found in the header
+        """
+        if not isinstance(fieldname, str):
+            return None, (), ()
+        dc = self._dictconfig
+        names = (fieldname, fieldname.lower())
+
+        def failure(checkname):
+            desc = dc[checkname + 'Desc'].format(fieldname=fieldname)
+            return (checkname, fieldname, desc)
+
+        emptyfail = None
+        if any(n in dc['_EmptyCheck'] for n in names):
+            emptyfail = failure('EmptyCheck')
+        numeric = list()
+        for checkname, accepted in (
+                ('NumericCheck', (helper.INTEGER, helper.DECIMAL)),
+                ('IntegerCheck', (helper.INTEGER,)),
+                ('DecimalCheck', (helper.DECIMAL,))):
+            if any(n in dc['_' + checkname] for n in names):
+                numeric.append((frozenset(accepted), failure(checkname)))
+        checks = list()
+        for checkname, compiled in (('FormatCheck', self._formats),
+                                    ('LengthCheck', self._lengths)):
+            for n in names:
+                if n in dc['_' + checkname]:
+                    pos = dc['_' + checkname][n]
+                    checks.append((compiled[pos], failure(checkname)))
+                    break
+        return emptyfail, tuple(numeric), tuple(checks)
+
+    def _getplan(self, fieldnames: list) -> tuple:
+        """
+        Method to get the compiled validation plan for a header.
+        The plan holds one (position, emptyfailure, numeric, checks) entry
+        per field that has at least one rule, so fields without rules cost
+        nothing
+        :param fieldnames: header of the records to be validated
+        """
+        key = tuple(fieldnames)
+        plan = self._plans.get(key)
+        if plan is None:
+            columns = list()
+            for idx, fieldname in enumerate(key):
+                emptyfail, numeric, checks = self._compilecolumn(
+                    fieldname=fieldname)
+                if emptyfail or numeric or checks:
+                    columns.append((idx, emptyfail, numeric, checks))
+            plan = tuple(columns)
+            self._plans[key] = plan
+        return plan
+
     @property
     def dictconfig(self):
         return self._dictconfig
@@ -205,145 +457,703 @@ class ValidateFile(object):
         else:
             return {}
 
+    def _validaterow(self, row: list, plan: tuple) -> list:
+        """
+        Method to validate a positional record against a compiled plan.
+        Returns the list of failures, empty if the record is valid
+        :param row: list of field values in header order
+        :param plan: compiled plan as returned by _getplan()
+        """
+        failures = list()
+        classify = helper.classifynumber
+        for idx, emptyfail, numeric, checks in plan:
+            try:
+                v = row[idx]
+            except IndexError:
+                v = ''
+            # Empty values are only flagged by the empty check, every
+            # other check is skipped for them
+            if not v.strip():
+                if emptyfail:
+                    failures.append(emptyfail)
+                continue
+            if numeric:
+                kind = classify(value=v)
+                for accepted, fail in numeric:
+                    if kind not in accepted:
+                        failures.append(fail)
+            for check, fail in checks:
+                if not check(v):
+                    failures.append(fail)
+        return failures
+
+    @staticmethod
+    def _asresult(failures: list) -> dict:
+        """
+        Method to summarise the failures of a record
+        :param failures: failures as returned by _validaterow()
+        """
+        if not failures:
+            return {}
+        error_count = dict()
+        for checkname, _, _ in failures:
+            error_count[checkname] = error_count.setdefault(checkname, 0) + 1
+        return {'Level': 'Field', 'Error': [f[2] for f in failures],
+                'ErrorCount': error_count}
+
     def _validaterecord(self, value: dict) -> dict:
         """
         Method to validate given record
         :param value: dict containing header and row as key/value
         """
-        # For every field in a given record, perform validation based on the
-        # config file
-        error_desc = list()
+        plan = self._getplan(fieldnames=value.keys())
+        failures = self._validaterow(row=list(value.values()), plan=plan)
+        return self._asresult(failures=failures)
+
+    def _validaterowcached(self, row: list, plan: tuple,
+                           caches: dict) -> list:
+        """
+        Method to validate a positional record, taking the verdict of the
+        fields with a cache from the cache
+        :param row: list of field values in header order
+        :param plan: compiled plan as returned by _getplan()
+        :param caches: dict of field position to VerdictCache
+        """
+        failures = list()
+        for column in plan:
+            idx = column[0]
+            try:
+                v = row[idx]
+            except IndexError:
+                v = ''
+            cache = caches.get(idx)
+            if cache is not None:
+                failures.extend(cache.verdict(
+                    value=v, compute=partial(batch.validatevalue,
+                                             column=column)))
+            else:
+                failures.extend(batch.validatevalue(value=v, column=column))
+        return failures
+
+    @staticmethod
+    def _newrun(fieldnames: list, plan: list, usebatch: bool = True,
+                compression: str = None, sharddir: str = None,
+                cachesize: int = 0, runid: str = None,
+                cachecolumns: tuple = (), records: str = None,
+                failedlines: bool = False, codes: list = None,
+                compress: bool = False, index: bool = False,
+                profile: list = None, metrics: bool = False,
+                chunksize: int = None, keys: tuple = (),
+                columns: tuple = None) -> dict:
+        """
+        Method to build the settings of a run, as taken by the workers, the
+        ones not given being off
+        """
+        return {'Fieldnames': fieldnames, 'Plan': plan,
+                'Width': len(fieldnames), 'UseBatch': usebatch,
+                'Compression': compression, 'ShardDir': sharddir,
+                'CacheSize': cachesize,
+                # Workers keep the verdict caches of the run across chunks
+                'RunId': runid,
+                'CacheColumns': cachecolumns, 'Records': records,
+                'FailedLines': failedlines, 'Codes': codes,
+                'Compress': compress, 'Index': index, 'Profile': profile,
+                'Metrics': metrics, 'ChunkSize': chunksize, 'Keys': keys,
+                'Columns': columns}
+
+    def _processchunk(self, run: dict, value: list, lines: list = None,
+                      out=None, caches: dict = None,
+                      marks: list = None) -> dict:
+        """
+        Method to orchestrate field validations for a chunk of records.
+        Returns the record counts and error counts of the chunk, the
+        (line number, record, failures) of its records if the run streams
+        records, and the lines of its failing records if the run has a
+        failure budget
+        :param run: settings of the run as built by _run()
+        :param value: list of positional records
+        :param lines: line numbers of the records, if the run streams
+        records or indexes the failing ones
+        :param out: csv writer the annotated records are written to, if the
+        results need to be written to output file.
+        :param caches: optional dict of field position to VerdictCache
+        :param marks: (record index, failure) of the duplicate keys of the
+                      chunk, found before hand
+        """
+        plan = run['Plan']
+        timings = self._newtimings() if run['Metrics'] else None
+        with helper.timed(timings=timings, key='Validate'):
+            if run['UseBatch']:
+                failures = batch.validatebatch(plan=plan, rows=value,
+                                               caches=caches, timings=timings)
+            else:
+                failures = dict()
+                for i, row in enumerate(value):
+                    if caches:
+                        ret = self._validaterowcached(row=row, plan=plan,
+                                                      caches=caches)
+                    else:
+                        ret = self._validaterow(row=row, plan=plan)
+                    if ret:
+                        failures[i] = ret
+        for i, fail in marks or ():
+            failures[i] = list(failures.get(i, ())) + [fail]
         error_count = dict()
-        for k, v in value.items():
-            # Empty check
-            if (k in self._dictconfig['_EmptyCheck'] or
-               k.lower() in self._dictconfig['_EmptyCheck']):
-                if helper.isempty(value=v):
-                    error_desc.append(self._dictconfig['EmptyCheckDesc']
-                                      .format(fieldname=k))
-                    error_count['EmptyCheck'] = error_count\
-                        .setdefault('EmptyCheck', 0) + 1
-            # Numeric check
-            if (k in self._dictconfig['_NumericCheck'] or
-               k.lower() in self._dictconfig['_NumericCheck']) and \
-               helper.isempty(value=v) is False:
-                if not helper.isnumeric(value=v):
-                    error_desc.append(self._dictconfig['NumericCheckDesc']
-                                      .format(fieldname=k))
-                    error_count['NumericCheck'] = error_count\
-                        .setdefault('NumericCheck', 0) + 1
-            # Integer check
-            if (k in self._dictconfig['_IntegerCheck'] or
-               k.lower() in self._dictconfig['_IntegerCheck']) and \
-               helper.isempty(value=v) is False:
-                if not helper.isinteger(value=v):
-                    error_desc.append(self._dictconfig['IntegerCheckDesc']
-                                      .format(fieldname=k))
-                    error_count['IntegerCheck'] = error_count\
-                        .setdefault('IntegerCheck', 0) + 1
-            # Decimal check
-            if (k in self._dictconfig['_DecimalCheck'] or
-               k.lower() in self._dictconfig['_DecimalCheck']) and \
-               helper.isempty(value=v) is False:
-                if not helper.isdecimal(value=v):
-                    error_desc.append(self._dictconfig['DecimalCheckDesc']
-                                      .format(fieldname=k))
-                    error_count['DecimalCheck'] = error_count\
-                        .setdefault('DecimalCheck', 0) + 1
-            # Format check
-            if (k in self._dictconfig['_FormatCheck'] or
-               k.lower() in self._dictconfig['_FormatCheck']) and \
-               helper.isempty(value=v) is False:
-                try:
-                    pos = self._dictconfig['_FormatCheck'][k]
-                except KeyError:
-                    pos = self._dictconfig['_FormatCheck'][k.lower()]
-                key = [_ for _ in self._dictconfig['FormatCheck'][pos]
-                       .keys()][0]
-                d = self._dictconfig['FormatCheck'][pos][key]
-                pattern = d['pattern']
-                count = d.get('count', None)
-                ignorecase = d.get('ignorecase', False)
-                if not helper.isexpectedformat(string=v, pattern=pattern,
-                                               count=count,
-                                               ignorecase=ignorecase):
-                    error_desc.append(self._dictconfig['FormatCheckDesc']
-                                      .format(fieldname=k))
-                    error_count['FormatCheck'] = error_count\
-                        .setdefault('FormatCheck', 0) + 1
-            # Length check
-            if (k in self._dictconfig['_LengthCheck'] or
-               k.lower() in self._dictconfig['_LengthCheck']) and \
-               helper.isempty(value=v) is False:
-                try:
-                    pos = self._dictconfig['_LengthCheck'][k]
-                except KeyError:
-                    pos = self._dictconfig['_LengthCheck'][k.lower()]
-                key = [_ for _ in self._dictconfig['LengthCheck'][pos]
-                       .keys()][0]
-                d = self._dictconfig['LengthCheck'][pos][key]
-                maxvalue = d['max']
-                minvalue = d.get('min', None)
-                if not helper.isexpectedlength(value=v, maxvalue=maxvalue,
-                                               minvalue=minvalue):
-                    error_desc.append(self._dictconfig['LengthCheckDesc']
-                                      .format(fieldname=k))
-                    error_count['LengthCheck'] = error_count\
-                        .setdefault('LengthCheck', 0) + 1
-        if error_desc:
-            return {'Level': 'Field', 'Error': error_desc,
-                    'ErrorCount': error_count}
+        for i in sorted(failures):
+            for checkname, _, _ in failures[i]:
+                error_count[checkname] = error_count\
+                    .setdefault(checkname, 0) + 1
+        if out:
+            width = run['Width']
+            codes = run['Codes']
+            with helper.timed(timings=timings, key='Write'):
+                out.writerows(self._annotate(row=row, width=width,
+                                             failures=failures.get(i),
+                                             codes=codes)
+                              for i, row in enumerate(value))
+        counts = {'TotalRecordsAnalysed': len(value),
+                  'RecordsPassed': len(value) - len(failures),
+                  'RecordsFailed': len(failures),
+                  'ErrorCount': error_count}
+        if timings is not None:
+            fieldnames = run['Fieldnames']
+            timings['Columns'] = {fieldnames[k]: v for k, v
+                                  in timings['Columns'].items()}
+            counts['Timings'] = timings
+        if run['Records'] == 'failures':
+            counts['Records'] = [(lines[i], value[i], failures[i])
+                                 for i in sorted(failures)]
+        elif run['Records'] == 'all':
+            counts['Records'] = [(lines[i], row, failures.get(i, []))
+                                 for i, row in enumerate(value)]
+        if run['FailedLines']:
+            counts['FailedLines'] = [lines[i] for i in sorted(failures)]
+        if run['Index']:
+            counts['Index'] = RowIndex.fromfailures(lines=lines,
+                                                    failures=failures)
+        if run['Profile']:
+            counts['Profile'] = profiler.profilechunk(rows=value,
+                                                      columns=run['Profile'])
+        return counts
+
+    @classmethod
+    def _annotate(cls, row: list, width: int, failures: list,
+                  codes: dict = None) -> list:
+        """
+        Method to add the `_is_error` and `_error_desc` (or `_error_codes`)
+        columns to a record
+        :param row: positional record
+        :param width: number of fields in the header
+        :param failures: failures of the record, if any
+        :param codes: compact code of each failure, to write codes instead
+                      of descriptions
+        """
+        row = row[:width] + [''] * (width - len(row))
+        if failures:
+            row.extend([1, cls._describe(failures=failures, codes=codes)])
         else:
+            row.extend([0, None])
+        return row
+
+    @staticmethod
+    def _describe(failures: list, codes: dict = None) -> str:
+        """
+        Method to get the error description of a failing record, or its
+        compact error codes
+        :param failures: failures of the record
+        :param codes: compact code of each failure
+        """
+        if codes:
+            return ';'.join(codes[f] for f in failures)
+        return '; '.join(f[2] for f in failures)
+
+    @classmethod
+    def _errorrows(cls, run: dict, records: list) -> list:
+        """
+        Method to get the output rows of the failing records of a chunk in
+        errors only mode: the source line number, the record and the error
+        description or codes
+        :param run: settings of the run as built by _run()
+        :param records: (line number, positional record, failures) of the
+                        records of the chunk
+        """
+        width = run['Width']
+        return [[line] + row[:width] + [''] * (width - len(row)) +
+                [cls._describe(failures=failures, codes=run['Codes'])]
+                for line, row, failures in records if failures]
+
+    def _getkeys(self, fieldnames: list) -> tuple:
+        """
+        Method to get the (key name, field positions, failure) of the
+        unique keys found in a header. Keys with a field missing from the
+        header are left out
+        :param fieldnames: header of the records to be validated
+        """
+        dc = self._dictconfig
+        positions = dict()
+        for idx, fieldname in enumerate(fieldnames):
+            if not isinstance(fieldname, str):
+                continue
+            positions.setdefault(fieldname, idx)
+            if not dc['HCaseSensitive']:
+                positions.setdefault(fieldname.lower(), idx)
+        keys = list()
+        for name, columns in dc['UniqueCheck'].items():
+            if not dc['HCaseSensitive']:
+                columns = [c.lower() for c in columns]
+            if not all(c in positions for c in columns):
+                log.info('Unique key {name} not found in the header'
+                         .format(name=name))
+                continue
+            desc = dc['UniqueCheckDesc'].format(fieldname=name)
+            keys.append((name, tuple(positions[c] for c in columns),
+                         ('UniqueCheck', name, desc)))
+        return tuple(keys)
+
+    @staticmethod
+    def _getcodes(fieldnames: list, plan: tuple, keys: tuple = ()) -> tuple:
+        """
+        Method to get the compact code of every failure of a plan, the check
+        letter followed by the field position, and the legend of the codes.
+        A unique key takes the position of its first field
+        :param fieldnames: header of the records to be validated
+        :param plan: compiled validation plan of the header
+        :param keys: unique keys of the header, as given by _getkeys()
+        """
+        codes = dict()
+        for idx, emptyfail, numeric, checks in plan:
+            failures = [emptyfail] if emptyfail else []
+            failures.extend(f for _, f in numeric)
+            failures.extend(f for _, f in checks)
+            for f in failures:
+                codes.setdefault(f, CHECKCODES[f[0]] + str(idx))
+        for _, positions, f in keys:
+            codes.setdefault(f, CHECKCODES[f[0]] + str(positions[0]))
+        columns = {idx for idx, *_ in plan}
+        columns.update(positions[0] for _, positions, _ in keys)
+        legend = {
+            'Checks': {v: k for k, v in CHECKCODES.items()},
+            'Columns': {str(idx): fieldnames[idx] for idx in sorted(columns)},
+            'Descriptions': {v: k[2] for k, v in codes.items()}
+        }
+        return codes, legend
+
+    @staticmethod
+    def _newcaches(run: dict) -> dict:
+        """
+        Method to get the verdict caches of a worker task, shared by the
+        tasks of the run that the worker thread handles
+        :param run: settings of the run as built by _run()
+        """
+        if not run['CacheSize']:
+            return None
+        return cache.runcaches(runid=run['RunId'],
+                               columns=run['CacheColumns'],
+                               maxsize=run['CacheSize'])
+
+    @staticmethod
+    def _cachestats(run: dict, caches: dict) -> dict:
+        """
+        Method to get the hit, miss and eviction counts per field since the
+        previous task of the worker thread
+        :param run: settings of the run as built by _run()
+        :param caches: dict of field position to VerdictCache
+        """
+        if not caches:
             return {}
+        return {run['Fieldnames'][idx]: c.newstats()
+                for idx, c in caches.items()}
 
-    def _process(self, writeout: bool, value: dict) -> dict:
+    def _processshard(self, run: dict, value: tuple) -> dict:
         """
-        Method to orchestrate field validations.
-        :param value: dict containing header and row as key/value
-        :param writeout: set to True if the results need to be written to
-        outout file.
+        Method to validate a chunk of records and write the annotated
+        records to the shard file of the chunk, if the results need to be
+        written to output file
+        :param run: settings of the run as built by _run()
+        :param value: (sequence number, line numbers of the records or None,
+                      list of positional records), and the (record index,
+                      failure) of its duplicate keys, if any
         """
-        ret = self._validaterecord(value=value)
-        if ret:
-            value['_is_error'] = 1
-            value['_error_desc'] = '; '.join(ret['Error'])
+        started = time.perf_counter()
+        seq, lines, rows = value[:3]
+        marks = value[3] if len(value) > 3 else None
+        caches = self._newcaches(run=run)
+        if not run['ShardDir']:
+            counts = self._processchunk(run=run, value=rows, lines=lines,
+                                        caches=caches, marks=marks)
         else:
-            value['_is_error'] = 0
-            value['_error_desc'] = None
-        if writeout:
-            self._outputqueue.put(value)
-        return ret
+            path = writer.shardpath(sharddir=run['ShardDir'], seq=seq)
+            fo, out = writer.openshard(path=path, compress=run['Compress'])
+            with fo:
+                counts = self._processchunk(run=run, value=rows, lines=lines,
+                                            out=out, caches=caches,
+                                            marks=marks)
+            counts['Shard'] = path
+        counts['CacheStats'] = self._cachestats(run=run, caches=caches)
+        if run['Metrics']:
+            counts['Timings']['Busy'] = time.perf_counter() - started
+        return counts
 
-    def _writeout(self, fieldnames: list, outputfile: str) -> None:
+    def _processrange(self, run: dict, value: tuple) -> dict:
         """
-        Method to write validation results as output
+        Method to validate the records of a newline aligned byte range of
+        the source file, read and parsed by the worker itself.
+        Returns the counts of the range with the number of lines it spans,
+        or {'Fallback': True} when the range cannot be parsed on its own: a
+        quoted field spans lines, or the range of a gzip file does not hold
+        whole members of whole lines. Line numbers of streamed records are
+        relative to the start of the range, as are the ones of the failing
+        rows index
+        :param run: settings of the run as built by _run()
+        :param value: (sequence number, start, end) of the range
         """
-        with open(file=outputfile, mode='w+', encoding='utf-8') as fo:
-            writer = csv.DictWriter(f=fo, fieldnames=fieldnames,
-                                    delimiter='\t')
-            writer.writeheader()
-            while True:
-                item = self._outputqueue.get(timeout=10)
-                if item is None:
-                    break
-                log.debug(item)
-                writer.writerow(rowdict=item)
-        self._outputqueue.task_done()
+        started = time.perf_counter()
+        seq, start, end = value
+        if run['Compression']:
+            try:
+                data = reader.readmembers(path=self._sourcefile, start=start,
+                                          end=end)
+            except ValueError:
+                return {'Fallback': True}
+            if not start:
+                # The first member starts with the header
+                header = data.find(b'\n')
+                if header == -1:
+                    return {'Fallback': True}
+                data = data[header + 1:]
+            if data[-1:] != b'\n' and end < os.path.getsize(self._sourcefile):
+                return {'Fallback': True}
+        else:
+            data = reader.readrange(path=self._sourcefile, start=start,
+                                    end=end)
+        fo = out = None
+        if run['ShardDir']:
+            path = writer.shardpath(sharddir=run['ShardDir'], seq=seq)
+            fo, out = writer.openshard(path=path, compress=run['Compress'])
+        quoted = b'"' in data
+        csvreader = self._newreader(fb=io.BytesIO(data),
+                                    columns=run['Columns'])
+        counts = self._newcounts()
+        counts['Records'] = list()
+        counts['FailedLines'] = list()
+        if run['Index']:
+            counts['Index'] = RowIndex()
+        if run['Metrics']:
+            counts['Timings'] = self._newtimings()
+        caches = self._newcaches(run=run)
+        records = 0
+        last = None
+        try:
+            for _, lines, rows, read in self._readchunks(
+                    csvreader=csvreader,
+                    withlines=bool(run['Records']) or run['FailedLines'] or
+                    run['Index'] or quoted, size=run['ChunkSize']):
+                if read is not None:
+                    records += read
+                if rows:
+                    last = rows[-1]
+                d = self._processchunk(run=run, value=rows, lines=lines,
+                                       out=out, caches=caches)
+                self._addcounts(counts, d)
+                counts['Records'].extend(d.get('Records', ()))
+                counts['FailedLines'].extend(d.get('FailedLines', ()))
+        finally:
+            if fo:
+                fo.close()
+        # Each physical line gives one record unless a quoted field spans
+        # lines. A quoted field left open at the end of the range carries
+        # the newline in its value.
+        if quoted and (records != csvreader.line_num or
+                       (last and any('\n' in f for f in last))):
+            return {'Fallback': True}
+        if fo:
+            counts['Shard'] = path
+        counts['CacheStats'] = self._cachestats(run=run, caches=caches)
+        counts['Lines'] = csvreader.line_num
+        if run['Metrics']:
+            # Reading covers decompressing, decoding and parsing the range
+            timings = counts['Timings']
+            timings['Busy'] = time.perf_counter() - started
+            timings['Read'] = timings['Busy'] - timings['Validate'] - \
+                timings['Write']
+        return counts
 
-    def getresult(self, outputdir: str = None) -> dict:
+    @staticmethod
+    def _readchunks(csvreader, withlines: bool, seq: int = 0,
+                    linebase: int = 0, size: int = None):
         """
-        Method to invoke validation process
-        Specifying output dir will write all the field level errors along
-        with original records in txt tab delimited format.
-        There will be 2 additional columns `_is_error` and `_error_desc`
-        for error flag and error description respectively
+        Generator method to group the records of a csv reader into chunks,
+        skipping blank lines.
+        Yields (sequence number, line numbers, records, records read). The
+        line numbers of the records and the number of records read,
+        including blank lines, are only tracked with withlines, and are
+        None otherwise
+        :param csvreader: csv reader of the records
+        :param withlines: set to True to track line numbers
+        :param seq: sequence number of the first chunk
+        :param linebase: number of lines before the ones of the reader
+        :param size: records per chunk, CHUNKSIZE by default
+        """
+        size = size or CHUNKSIZE
+        if not withlines:
+            for rows in helper.chunked(iterable=filter(None, csvreader),
+                                       size=size):
+                yield seq, None, rows, None
+                seq += 1
+            return
+        rows = list()
+        lines = list()
+        read = 0
+        end = csvreader.line_num
+        for row in csvreader:
+            read += 1
+            start, end = end + 1, csvreader.line_num
+            if row:
+                rows.append(row)
+                lines.append(linebase + start)
+                if len(rows) == size:
+                    yield seq, lines, rows, read
+                    seq += 1
+                    rows = list()
+                    lines = list()
+                    read = 0
+        if read:
+            yield seq, lines, rows, read
+
+    @staticmethod
+    def _newcounts() -> dict:
+        """
+        Method to get empty record and error counts
+        """
+        return {'TotalRecordsAnalysed': 0, 'RecordsPassed': 0,
+                'RecordsFailed': 0, 'ErrorCount': {}, 'Shards': [],
+                'CacheStats': {}}
+
+    @staticmethod
+    def _newtimings() -> dict:
+        """
+        Method to get empty timings: the wall seconds spent reading,
+        validating, writing and busy in total, and the cpu seconds spent
+        per check and per field
+        """
+        return {'Read': 0.0, 'Validate': 0.0, 'Write': 0.0, 'Busy': 0.0,
+                'Checks': {}, 'Columns': {}}
+
+    @staticmethod
+    def _addtimings(timings: dict, value: dict) -> None:
+        """
+        Method to add the timings of a chunk to the running timings
+        """
+        for k in ('Read', 'Validate', 'Write', 'Busy'):
+            timings[k] += value[k]
+        for k in ('Checks', 'Columns'):
+            for n, v in value[k].items():
+                timings[k][n] = timings[k].get(n, 0.0) + v
+
+    @classmethod
+    def _addcounts(cls, counts: dict, value: dict) -> None:
+        """
+        Method to add the counts of a chunk to the running counts
+        :param counts: running counts as returned by _newcounts()
+        :param value: counts of a chunk
+        """
+        for k in ('TotalRecordsAnalysed', 'RecordsPassed', 'RecordsFailed'):
+            counts[k] += value[k]
+        errcount = counts['ErrorCount']
+        for k, v in value['ErrorCount'].items():
+            errcount[k] = errcount.setdefault(k, 0) + v
+        if value.get('Shard'):
+            counts['Shards'].append(value['Shard'])
+        if 'Index' in counts and value.get('Index') is not None:
+            counts['Index'].merge(value['Index'])
+        for k, v in value.get('Profile', {}).items():
+            counts.setdefault('Profile', {}).setdefault(
+                k, profiler.ColumnProfile()).merge(v)
+        if 'Timings' in counts and value.get('Timings'):
+            cls._addtimings(counts['Timings'], value['Timings'])
+        for k, v in value.get('CacheStats', {}).items():
+            stats = counts['CacheStats'].setdefault(
+                k, {'Hits': 0, 'Misses': 0, 'Evictions': 0,
+                    'Disabled': False})
+            for n in ('Hits', 'Misses', 'Evictions'):
+                stats[n] += v[n]
+            stats['Disabled'] = stats['Disabled'] or v['Disabled']
+
+    def _getranges(self, run: dict) -> list:
+        """
+        Method to split the records of the source file into newline aligned
+        byte ranges, one per worker task.
+        Returns None when the file cannot be split safely, in which case
+        the records have to be read by a single reader
+        :param run: settings of the run as built by _run()
+        """
+        encoding = self._dictconfig['Encoding']
+        if not reader.isasciicompatible(encoding=encoding):
+            log.info('Encoding {encoding} cannot be split on newline bytes'
+                     .format(encoding=encoding))
+            return None
+        if run['Compression'] not in (None, 'gzip'):
+            log.info('{compression} file cannot be split'
+                     .format(compression=run['Compression']))
+            return None
+        # The header has to be a single line for the data to start at the
+        # next byte
+        with reader.openbinary(path=self._sourcefile,
+                               compression=run['Compression']) as fb:
+            line = fb.readline()
+        try:
+            header = next(csv.reader([line.decode(encoding)],
+                                     delimiter=self._dictconfig['_Delimiter']),
+                          [])
+        except (csv.Error, UnicodeDecodeError):
+            header = None
+        if header != run['Fieldnames']:
+            log.info('Header spans lines, cannot split the file')
+            return None
+        if run['Compression']:
+            # Each worker decompresses its own gzip members
+            ranges = reader.memberranges(path=self._sourcefile,
+                                         size=RANGESIZE)
+            return ranges if len(ranges) > 1 else None
+        return reader.splitranges(path=self._sourcefile, start=len(line),
+                                  size=RANGESIZE)
+
+    def _cachecolumns(self, fieldnames: list, plan: tuple,
+                      cachecolumns: list) -> tuple:
+        """
+        Method to get the positions of the fields to be cached
+        :param fieldnames: header of the records
+        :param plan: compiled plan as returned by _getplan()
+        :param cachecolumns: names of the fields to be cached, None for all
+        fields with rules
+        """
+        if cachecolumns is None:
+            return tuple(column[0] for column in plan)
+        names = set(cachecolumns)
+        if not self._dictconfig['HCaseSensitive']:
+            names.update(c.lower() for c in cachecolumns)
+        return tuple(column[0] for column in plan
+                     if fieldnames[column[0]] in names or
+                     fieldnames[column[0]].lower() in names)
+
+    def _profilecolumns(self, fieldnames: list,
+                        profilecolumns: list) -> tuple:
+        """
+        Method to get the (position, name) of the fields to be profiled
+        :param fieldnames: header of the records
+        :param profilecolumns: names of the fields to be profiled, None for
+        all fields
+        """
+        if profilecolumns is None:
+            return tuple(enumerate(fieldnames))
+        names = set(profilecolumns)
+        if not self._dictconfig['HCaseSensitive']:
+            names.update(c.lower() for c in profilecolumns)
+        return tuple((idx, f) for idx, f in enumerate(fieldnames)
+                     if f in names or f.lower() in names)
+
+    def _checkfilename(self) -> list:
+        """
+        Method to validate the filename if the config asks for it.
+        Returns the list of errors
+        """
+        if not self._dictconfig['Filename']:
+            return []
+        log.info('Validating filename')
+        filename = os.path.basename(self._sourcefile)
+        val = self._validatefilename(value=filename)
+        if val and reader.uncompressedname(filename) != filename:
+            # The pattern may be the one of the uncompressed file
+            val = self._validatefilename(
+                value=reader.uncompressedname(filename))
+        return [val] if val else []
+
+    def _checkheader(self, fieldnames: list) -> list:
+        """
+        Method to validate the header and the header count if the config
+        asks for it. Returns the list of errors
+        :param fieldnames: header of the source file
+        """
+        errors = list()
+        if self._dictconfig['ValidateHeader']:
+            log.info('Validating header')
+            val = self._validateheader(value=fieldnames)
+            if val:
+                errors.append(val)
+        if self._dictconfig['MatchHeaderCount']:
+            log.info('Validating header count')
+            val = self._validateheadercount(value=fieldnames)
+            if val:
+                errors.append(val)
+        return errors
+
+    @staticmethod
+    def _newresult() -> dict:
+        """
+        Method to get an empty validation result
+        """
+        return {
+            'Results': {
+                'TotalRecordsAnalysed': 0,
+                'RecordsPassed': 0,
+                'RecordsFailed': 0,
+                'ErrorDetails': [],
+                'OutputFile': None
+            }
+        }
+
+    def _run(self, result: dict, outputdir: str = None,
+             usebatch: bool = True, parallelread: bool = False,
+             cachesize: int = 0, cachecolumns: list = None,
+             records: str = None, pool=None, maxfailures: int = None,
+             maxfailureratio: float = None,
+             skiponheadererror: bool = False,
+             checkpointinterval: float = None, resume: bool = False,
+             outputmode: str = 'all', compactcodes: bool = False,
+             compressoutput: bool = False, rowindex: bool = False,
+             profile: bool = False, profilecolumns: list = None,
+             metrics: bool = False, metricscallback=None, progress=None,
+             progressinterval: float = 1.0, workers: int = None,
+             chunksize: int = None, startmethod: str = None,
+             executor: str = None, maxinflight: int = None,
+             maxqueuedrows: int = None, maxmemory: int = None,
+             uniquememory: int = None):
+        """
+        Generator method to run the validation process, filling in the
+        result as it goes.
+        Yields the filename and header level errors as they are found, then
+        the counts of every chunk of records in source order. With records
+        set to 'failures' or 'all', the counts of a chunk also carry the
+        (line number, record, failures) of its failing or of all records,
+        records being dicts of header and value
+        See getresult() for the other options
         """
-        log.info('Starting file validation process')
-        starttime = time.time()
         fo = None
-        prc = None
-        errcount = dict()
+        raw = None
+        out = None
+        sharddir = None
         writeout = False
+        checkpoint = None
+        state = None
+        runid = uuid.uuid4().hex
+        if outputmode not in OUTPUTMODES:
+            raise ValueError('outputmode must be one of {modes}'
+                             .format(modes=', '.join(OUTPUTMODES)))
+        errorsonly = outputmode == 'errors'
+        if executor is not None and executor not in EXECUTORS:
+            raise ValueError('executor must be one of {kinds}'
+                             .format(kinds=', '.join(EXECUTORS)))
+        timings = None
+        if metrics or metricscallback is not None:
+            timings = self._newtimings()
+            timings['Phases'] = dict()
+            timings['Workers'] = 0
+        starttime = time.perf_counter()
+        if checkpointinterval is not None or resume:
+            checkpoint = self._newcheckpoint(
+                outputdir=outputdir, interval=CHECKPOINTINTERVAL
+                if checkpointinterval is None else checkpointinterval)
+            state = checkpoint.load() if resume else None
         if outputdir:
             if not os.path.isdir(outputdir):
                 raise NotADirectoryError('The given path is not a valid'
@@ -351,80 +1161,1029 @@ class ValidateFile(object):
             outfilename = ''.join([random.choice('abcdefghij')
                                    for _ in range(8)] +
                                   [datetime.now().strftime('_%Y%m%d%M%S.txt')])
+            if compressoutput:
+                outfilename += '.gz'
             outputfile = os.path.join(outputdir, outfilename)
             writeout = True
-        result = {
-            'Results': {
-                'TotalRecordsAnalysed': 0,
-                'RecordsPassed': 0,
-                'RecordsFailed': 0,
-                'ErrorDetails': [],
-                'OutputFile': None
-            }
-        }
+        if state:
+            # The resumed run carries on with the same output file
+            outputfile = state['OutputFile']
+            writeout = bool(outputfile)
         try:
-            if self._dictconfig['Filename']:
-                log.info('Validating filename')
-                filename = os.path.basename(self._sourcefile)
-                val = self._validatefilename(value=filename)
-                if val:
-                    result['Results']['ErrorDetails'].append(val)
+            for val in self._checkfilename():
+                result['Results']['ErrorDetails'].append(val)
+                yield val
+            phasestart = self._phase(timings=timings, name='Filename',
+                                     start=starttime)
             if not self._dictconfig['ValidateHeader'] and \
                not self._dictconfig['MatchHeaderCount'] and \
                not self._dictconfig['ValidateColumn']:
-                return result
-            fo = open(file=self._sourcefile, mode='r',
-                      encoding=self._dictconfig['Encoding'])
-            reader = csv.DictReader(f=fo,
-                                    delimiter=self._dictconfig['Delimiter']
-                                    .encode().decode('unicode_escape'))
-            fieldnames = reader.fieldnames
-            if self._dictconfig['ValidateHeader']:
-                log.info('Validating header')
-                val = self._validateheader(value=fieldnames)
-                if val:
-                    result['Results']['ErrorDetails'].append(val)
-            if self._dictconfig['MatchHeaderCount']:
-                log.info('Validating header count')
-                val = self._validateheadercount(value=fieldnames)
-                if val:
-                    result['Results']['ErrorDetails'].append(val)
-            if self._dictconfig['ValidateColumn']:
-                log.info('Validating fields')
-                # Start the consumer process in a thread to write output only
-                # if outuput dir is available.
-                if writeout:
-                    fieldnames.extend(['_is_error', '_error_desc'])
-                    prc = Process(target=self._writeout,
-                                  args=(fieldnames, outputfile), daemon=True)
-                    prc.start()
-                # Process record validation by assigning records
-                # to pool of workers
-                pool = Pool().imap(func=partial(self._process, writeout),
-                                   iterable=reader, chunksize=25000)
-                for d in pool:
-                    result['Results']['TotalRecordsAnalysed'] += 1
-                    if d:
-                        result['Results']['RecordsFailed'] += 1
-                        for k, v in d['ErrorCount'].items():
-                            errcount[k] = errcount.setdefault(k, 0) + v
+                return
+            compression = reader.compression(path=self._sourcefile)
+            # Byte offset of the records read, tracked for checkpoints
+            position = [0]
+            fo = reader.openbinary(path=self._sourcefile,
+                                   compression=compression)
+            csvreader = self._newreader(
+                fb=fo, position=position if checkpoint else None)
+            fieldnames = next(csvreader, [])
+            for val in self._checkheader(fieldnames=fieldnames):
+                result['Results']['ErrorDetails'].append(val)
+                yield val
+            phasestart = self._phase(timings=timings, name='Header',
+                                     start=phasestart)
+            if not self._dictconfig['ValidateColumn']:
+                return
+            if skiponheadererror and result['Results']['ErrorDetails'] and \
+               result['Results']['ErrorDetails'][-1]['Level'] != 'Filename':
+                log.info('Header validation failed, skipping fields')
+                result['Results']['Aborted'] = {
+                    'Line': 1, 'Reason': 'Header validation failed'}
+                return
+            log.info('Validating fields')
+            meter = None
+            if progress is not None:
+                meter = ProgressMeter(
+                    callback=progress, interval=progressinterval,
+                    totalbytes=os.path.getsize(self._sourcefile))
+            plan = self._getplan(fieldnames=fieldnames)
+            keys = self._getkeys(fieldnames=fieldnames)
+            codes = None
+            if compactcodes:
+                codes, legend = self._getcodes(fieldnames=fieldnames,
+                                               plan=plan, keys=keys)
+            outfields = fieldnames + [
+                '_error_codes' if compactcodes else '_error_desc']
+            if errorsonly:
+                outfields = ['_line'] + outfields
+            else:
+                outfields.insert(-1, '_is_error')
+            # Workers write the annotated records of each chunk to a
+            # shard file, which are merged in source order at the end. In
+            # errors only mode the failing records are written as they come
+            # back, with their line numbers.
+            if writeout and not errorsonly:
+                sharddir = tempfile.mkdtemp(prefix='.shards_', dir=outputdir)
+            run = self._newrun(
+                fieldnames=fieldnames, plan=plan, usebatch=usebatch,
+                compression=compression, sharddir=sharddir,
+                cachesize=cachesize, runid=runid,
+                cachecolumns=self._cachecolumns(
+                    fieldnames=fieldnames, plan=plan,
+                    cachecolumns=cachecolumns),
+                # Failing records are needed to write them in errors only
+                # mode
+                records=records or (
+                    'failures' if errorsonly and writeout else None),
+                # Only the lines of the failing records are needed to find
+                # where the failure budget runs out
+                failedlines=maxfailures is not None or
+                maxfailureratio is not None,
+                codes=codes, compress=compressoutput, index=rowindex,
+                profile=self._profilecolumns(
+                    fieldnames=fieldnames, profilecolumns=profilecolumns)
+                if profile else None,
+                metrics=timings is not None, chunksize=chunksize, keys=keys)
+            # Fields without rules are only decoded by the raw splitter
+            # when whole records are needed
+            run['Columns'] = None if run['Records'] or writeout else \
+                tuple(sorted({idx for idx, _, _, _ in plan}.union(
+                    idx for idx, _ in run['Profile'] or ())))
+            if isinstance(csvreader, reader.RawReader):
+                csvreader.columns = run['Columns']
+            budget = (maxfailures, maxfailureratio)
+            aborted = None
+            counts = self._newcounts()
+            if rowindex:
+                counts['Index'] = RowIndex()
+            if timings is not None:
+                # Workers add their timings to the run ones chunk by chunk
+                counts['Timings'] = timings
+            linebase = csvreader.line_num
+            readerbase = 0
+            if state:
+                log.info('Resuming from line {line}'
+                         .format(line=state['Line']))
+                for k in ('TotalRecordsAnalysed', 'RecordsPassed',
+                          'RecordsFailed', 'ErrorCount', 'CacheStats'):
+                    counts[k] = state[k]
+                if rowindex:
+                    counts['Index'] = RowIndex.fromdict(
+                        value=state.get('Index') or {})
+                if profile:
+                    counts['Profile'] = {
+                        k: profiler.ColumnProfile.fromdict(value=v)
+                        for k, v in (state.get('Profile') or {}).items()}
+                for k in ('TotalRecordsAnalysed', 'RecordsPassed',
+                          'RecordsFailed'):
+                    result['Results'][k] = counts[k]
+                fo.seek(state['Offset'])
+                position[0] = state['Offset']
+                csvreader = self._newreader(fb=fo, position=position,
+                                            columns=run['Columns'])
+                readerbase = state['Line']
+            if writeout and (checkpoint or errorsonly):
+                # Shards are appended to the output as they complete, so a
+                # checkpoint can record the output size
+                if state:
+                    out = open(file=outputfile, mode='r+b')
+                    out.truncate(state['OutputSize'])
+                    out.seek(0, os.SEEK_END)
+                else:
+                    out = open(file=outputfile, mode='wb')
+                    with helper.timed(timings=timings, key='Write'):
+                        writer.writeheader(fieldnames=outfields, fo=out,
+                                           compress=compressoutput)
+            # Source position after the last record of each chunk in flight
+            positions = deque()
+            if pool:
+                # A given pool is taken to run workers processes, one per cpu
+                # by default
+                processes = workers or os.cpu_count() or 1
+            else:
+                executor, processes, run['ChunkSize'] = self._sizerun(
+                    run=run, executor=executor, workers=workers,
+                    chunksize=chunksize)
+                log.info('Validating with {executor} executor, {workers}'
+                         ' workers, {size} records per chunk'
+                         .format(executor=executor, workers=processes,
+                                 size=run['ChunkSize']))
+            # Chunks are only read while fewer than this many are being
+            # validated, so memory stays flat however slow the consumer is
+            maxinflight = maxinflight or 2 * processes
+            # Resident memory checked before reading each chunk
+            overmemory = partial(self._overmemory, limit=maxmemory) \
+                if maxmemory else None
+            seq = 0
+            if timings is not None:
+                timings['Workers'] = processes
+            # A given pool is shared with other runs and is left running
+            with nullcontext(pool) if pool else \
+                    newpool(executor=executor, workers=processes,
+                            startmethod=startmethod) as pool:
+                duplicates = None
+                if keys:
+                    duplicates = self._findduplicates(
+                        run=run, pool=pool, maxinflight=maxinflight,
+                        maxmemory=uniquememory or UNIQUEMEMORY,
+                        spilldir=outputdir)
+                # Checkpoints need the position of a single reader, and
+                # duplicates are matched on line numbers
+                ranges = self._getranges(run=run) \
+                    if parallelread and not checkpoint and not keys \
+                    else None
+                if ranges:
+                    tasks = [(i, start, end)
+                             for i, (start, end) in enumerate(ranges)]
+                    results = helper.imapbounded(
+                        pool=pool, func=partial(self._processrange, run),
+                        iterable=tasks, maxinflight=maxinflight,
+                        full=overmemory)
+                    for i, d in enumerate(results):
+                        if d.get('Fallback'):
+                            # The ranges before this one were parsed
+                            # correctly, the single reader takes over from
+                            # the start of this one
+                            log.info('Range cannot be read on its own,'
+                                     ' falling back to a single reader')
+                            fo.close()
+                            raw = open(file=self._sourcefile, mode='rb')
+                            raw.seek(ranges[i][0])
+                            fo = gzip.GzipFile(fileobj=raw) \
+                                if compression else raw
+                            if not ranges[i][0]:
+                                # Skip the header of the first gzip member
+                                fo.readline()
+                            csvreader = self._newreader(
+                                fb=fo, columns=run['Columns'])
+                            seq = len(ranges)
+                            readerbase = linebase
+                            break
+                        if run['Records']:
+                            d['Records'] = [
+                                (linebase + n, row, f)
+                                for n, row, f in d['Records']]
+                        if run['FailedLines']:
+                            d['FailedLines'] = [linebase + n for n
+                                                in d['FailedLines']]
+                        if run['Index']:
+                            d['Index'].shift(offset=linebase)
+                        linebase += d['Lines']
+                        if out:
+                            with helper.timed(timings=timings, key='Write'):
+                                writer.writerows(
+                                    rows=self._errorrows(
+                                        run=run, records=d['Records']),
+                                    fo=out, compress=compressoutput)
+                        yield self._addchunk(result=result, counts=counts,
+                                             records=bool(records), run=run,
+                                             value=d)
+                        if meter:
+                            meter.update(
+                                records=counts['TotalRecordsAnalysed'],
+                                position=ranges[i][1])
+                        aborted = self._checkbudget(counts=counts, value=d,
+                                                    budget=budget)
+                        if aborted:
+                            csvreader = None
+                            break
                     else:
-                        result['Results']['RecordsPassed'] += 1
-                if errcount:
-                    result['Results']['ErrorDetails'].append(errcount)
-                # Terminate the output file write consumer process if
-                # applicable
-                if prc:
-                    self._outputqueue.put(None)
-                    prc.join()
-                    result['Results']['OutputFile'] = outputfile
-            log.info('Process complete')
-            runtime = round((time.time() - starttime)/60)
-            log.info('Run time: {runtime} mins'.format(runtime=runtime))
-            return result
+                        csvreader = None
+                # Process record validation by assigning chunks of records
+                # to pool of workers. Blank lines are skipped.
+                if csvreader is not None:
+                    chunks = self._readchunks(csvreader=csvreader,
+                                              withlines=bool(run['Records'])
+                                              or run['FailedLines'] or
+                                              rowindex or bool(keys),
+                                              seq=seq, linebase=readerbase,
+                                              size=run['ChunkSize'])
+                    chunks = self._trackpositions(
+                        chunks=chunks, csvreader=csvreader,
+                        position=position, linebase=readerbase,
+                        positions=positions if checkpoint else None)
+                    if duplicates:
+                        chunks = self._markduplicates(chunks=chunks,
+                                                      duplicates=duplicates)
+                    if timings is not None:
+                        chunks = helper.timediter(iterable=chunks,
+                                                  timings=timings, key='Read')
+                    for d in helper.imapbounded(
+                            pool=pool, func=partial(self._processshard, run),
+                            iterable=chunks, maxinflight=maxinflight,
+                            weight=self._chunkrows, maxweight=maxqueuedrows,
+                            full=overmemory):
+                        if out:
+                            with helper.timed(timings=timings, key='Write'):
+                                if errorsonly:
+                                    writer.writerows(
+                                        rows=self._errorrows(
+                                            run=run, records=d['Records']),
+                                        fo=out, compress=compressoutput)
+                                else:
+                                    writer.appendshard(path=d.pop('Shard'),
+                                                       fo=out)
+                        yield self._addchunk(result=result, counts=counts,
+                                             records=bool(records), run=run,
+                                             value=d)
+                        if meter:
+                            meter.update(
+                                records=counts['TotalRecordsAnalysed'],
+                                position=reader.consumed(fo))
+                        aborted = self._checkbudget(counts=counts, value=d,
+                                                    budget=budget)
+                        if aborted:
+                            # Leaving the pool terminates its workers
+                            break
+                        if checkpoint:
+                            offset, line = positions.popleft()
+                            if checkpoint.due():
+                                self._savecheckpoint(
+                                    checkpoint=checkpoint, counts=counts,
+                                    offset=offset, line=line,
+                                    outputfile=outputfile if writeout
+                                    else None, out=out)
+            if aborted:
+                log.info('Failure budget exceeded at line {line}, aborting'
+                         .format(line=aborted['Line']))
+                result['Results']['Aborted'] = aborted
+            if counts['ErrorCount']:
+                result['Results']['ErrorDetails'].append(counts['ErrorCount'])
+            if meter:
+                meter.finish(records=counts['TotalRecordsAnalysed'])
+            if out:
+                out.close()
+                result['Results']['OutputFile'] = outputfile
+            elif writeout:
+                with helper.timed(timings=timings, key='Write'):
+                    writer.mergeshards(fieldnames=outfields,
+                                       shards=counts['Shards'],
+                                       outputfile=outputfile,
+                                       compress=compressoutput)
+                result['Results']['OutputFile'] = outputfile
+            if writeout and compactcodes:
+                legendfile = re.sub(r'\.txt(\.gz)?$', '',
+                                    outputfile) + '.legend.json'
+                writer.writelegend(legend=legend, path=legendfile)
+                result['Results']['LegendFile'] = legendfile
+            if checkpoint:
+                checkpoint.remove()
+            if cachesize:
+                result['Results']['CacheStats'] = counts['CacheStats']
+            if maxmemory:
+                # Workers of a pool of the run have ended by now
+                result['Results']['PeakRSS'] = helper.peakmemory(
+                    children=True)
+            if rowindex:
+                result['Results']['FailingRows'] = counts['Index']
+            if profile:
+                profiles = counts.get('Profile', {})
+                result['Results']['Profile'] = {
+                    f: (profiles[f] if f in profiles
+                        else profiler.ColumnProfile()).summary()
+                    for _, f in run['Profile']}
+        except BaseException:
+            # Failed or abandoned runs report no metrics
+            timings = None
+            raise
         finally:
             if fo:
                 fo.close()
+            if raw:
+                raw.close()
+            if out:
+                out.close()
+            if sharddir:
+                shutil.rmtree(sharddir, ignore_errors=True)
+            # Caches of the run held in process by serial or thread workers
+            cache.dropruncaches(runid=runid)
+            if timings is not None:
+                self._setmetrics(result=result, timings=timings,
+                                 starttime=starttime,
+                                 callback=metricscallback)
+
+    @staticmethod
+    def _phase(timings: dict, name: str, start: float) -> float:
+        """
+        Method to record the wall seconds of a phase of the run, if the run
+        collects metrics. Returns the start of the next phase
+        """
+        now = time.perf_counter()
+        if timings is not None:
+            timings['Phases'][name] = now - start
+        return now
+
+    def _setmetrics(self, result: dict, timings: dict, starttime: float,
+                    callback=None) -> None:
+        """
+        Method to add the metrics of a complete run to the result, and to
+        push them to the callback if any
+        :param result: validation result
+        :param timings: timings of the run, with the worker ones added
+        :param starttime: perf_counter() value at the start of the run
+        :param callback: callable called with the metrics
+        """
+        phases = timings['Phases']
+        total = time.perf_counter() - starttime
+        if 'Header' in phases:
+            phases['Columns'] = total - phases['Filename'] - phases['Header']
+        phases['Total'] = total
+        columns = phases.get('Columns', 0.0)
+        rows = result['Results']['TotalRecordsAnalysed']
+        size = os.path.getsize(self._sourcefile)
+        workers = timings['Workers']
+        metrics = {
+            'Phases': phases,
+            'Rows': rows,
+            'Bytes': size,
+            'RowsPerSecond': rows / columns if columns else 0.0,
+            'BytesPerSecond': size / columns if columns else 0.0,
+            'Read': timings['Read'],
+            'Validate': timings['Validate'],
+            'Write': timings['Write'],
+            'Checks': timings['Checks'],
+            'Columns': timings['Columns'],
+            'Workers': workers,
+            'WorkerUtilization': timings['Busy'] / (workers * columns)
+            if workers and columns else 0.0
+        }
+        result['Results']['Metrics'] = metrics
+        if callback is not None:
+            callback(metrics)
+
+    def _proberun(self, run: dict) -> tuple:
+        """
+        Method to validate the first records of the source file in process.
+        Returns the number of records, their size in characters and the
+        seconds taken to validate them
+        :param run: settings of the run as built by _run()
+        """
+        delimiter = self._dictconfig['_Delimiter']
+        with reader.opentext(path=self._sourcefile,
+                             encoding=self._dictconfig['Encoding'],
+                             compression=run['Compression']) as fo:
+            csvreader = csv.reader(fo, delimiter=delimiter)
+            next(csvreader, None)
+            rows = list(islice(filter(None, csvreader), PROBEROWS))
+        size = sum(len(delimiter.join(row)) + 1 for row in rows)
+        start = time.perf_counter()
+        batch.validatebatch(plan=run['Plan'], rows=rows)
+        return len(rows), size, time.perf_counter() - start
+
+    def _sizerun(self, run: dict, executor: str = None, workers: int = None,
+                 chunksize: int = None) -> tuple:
+        """
+        Method to get the executor, the number of workers and the records
+        per chunk of a run, the given ones being kept. Without an executor,
+        the first records are validated in process to estimate how long the
+        whole file takes: small files are validated in process, larger ones
+        by a pool of processes, with chunks sized to give each worker a few
+        of them
+        :param run: settings of the run as built by _run()
+        :param executor: 'serial', 'thread' or 'process', adaptive if None
+        :param workers: number of workers, the cpu count by default
+        :param chunksize: records per chunk
+        """
+        workers = workers or os.cpu_count() or 1
+        if executor is None:
+            count, size, seconds = self._proberun(run=run)
+            filesize = os.path.getsize(self._sourcefile)
+            if run['Compression']:
+                filesize *= COMPRESSIONRATIO
+            records = filesize * count / size if size else 0
+            if count < PROBEROWS or workers == 1 or \
+               records * seconds / count < SERIALSECONDS:
+                executor = 'serial'
+            else:
+                executor = 'process'
+                if chunksize is None:
+                    chunksize = int(records / (workers * CHUNKSPERWORKER))
+                    chunksize = min(CHUNKSIZE, max(MINCHUNKSIZE, chunksize))
+        if executor == 'serial':
+            workers = 1
+        return executor, workers, chunksize or CHUNKSIZE
+
+    def _newcheckpoint(self, outputdir: str, interval: float) -> Checkpoint:
+        """
+        Method to get the checkpoint of a run, kept in the output dir, or
+        next to the source file without one
+        :param outputdir: output dir of the run
+        :param interval: minimum number of seconds between two checkpoints
+        """
+        if not reader.isasciicompatible(self._dictconfig['Encoding']):
+            raise ValueError('Checkpoints need an encoding in which a newline'
+                             ' is a single byte')
+        path = os.path.join(
+            outputdir or os.path.dirname(os.path.abspath(self._sourcefile)),
+            '.{name}.checkpoint'.format(
+                name=os.path.basename(self._sourcefile)))
+        return Checkpoint(path=path, interval=interval,
+                          sourcefile=self._sourcefile,
+                          configfile=self._configfile)
+
+    def _findduplicates(self, run: dict, pool, maxinflight: int,
+                        maxmemory: int, spilldir: str = None) -> list:
+        """
+        Method to find the records whose unique key was seen on an earlier
+        line, in a first pass over the source file. The workers hash the
+        keys of each chunk into 8 byte digests and hash-partition them. The
+        partitions are spilled to disk past maxmemory bytes, then
+        deduplicated by the workers, as many at once as fit maxmemory
+        bytes. There are enough partitions for each to fit half of it.
+        Returns the failure and the sorted line numbers of the duplicates
+        of each key
+        :param run: settings of the run as built by _run()
+        :param pool: pool of workers
+        :param maxinflight: maximum number of chunks being hashed
+        :param maxmemory: bytes of digests per key held in memory, and of
+                          the partitions being deduplicated
+        :param spilldir: dir to spill the digests to, the system temporary
+                         dir by default
+        """
+        log.info('Looking for duplicate keys')
+        partitions = unique.partitioncount(
+            entries=self._estimaterecords(run=run), maxmemory=maxmemory)
+        indexes = [unique.KeyIndex(maxmemory=maxmemory, partitions=partitions,
+                                   spilldir=spilldir)
+                   for _ in run['Keys']]
+        try:
+            with reader.openbinary(path=self._sourcefile,
+                                   compression=run['Compression']) as fb:
+                csvreader = self._newreader(fb=fb, columns=tuple(sorted(
+                    {i for _, positions, _ in run['Keys']
+                     for i in positions})))
+                next(csvreader, None)
+                chunks = ((seq, lines, rows) for seq, lines, rows, _ in
+                          self._readchunks(csvreader=csvreader,
+                                           withlines=True,
+                                           size=run['ChunkSize']))
+                for d in helper.imapbounded(
+                        pool=pool,
+                        func=partial(self._digestchunk, run, partitions),
+                        iterable=chunks, maxinflight=maxinflight):
+                    for index, parts in zip(indexes, d):
+                        index.add(parts=parts)
+            duplicates = list()
+            for index, (name, _, fail) in zip(indexes, run['Keys']):
+                found = array('Q')
+                for lines in helper.imapbounded(
+                        pool=pool, func=unique.findduplicates,
+                        iterable=index.partitions(), maxinflight=maxinflight,
+                        weight=unique.dedupsize, maxweight=maxmemory):
+                    found.extend(lines)
+                log.info('{count} duplicates of key {name}'
+                         .format(count=len(found), name=name))
+                duplicates.append((fail, array('Q', sorted(found))))
+            return duplicates
+        finally:
+            for index in indexes:
+                index.close()
+
+    def _estimaterecords(self, run: dict) -> int:
+        """
+        Method to estimate the records of the source file from the lines of
+        its first ESTIMATEBYTES bytes
+        :param run: settings of the run as built by _run()
+        """
+        with reader.openbinary(path=self._sourcefile,
+                               compression=run['Compression']) as fb:
+            sample = fb.read(ESTIMATEBYTES)
+        if len(sample) < ESTIMATEBYTES:
+            return sample.count(b'\n') + 1
+        filesize = os.path.getsize(self._sourcefile)
+        if run['Compression']:
+            filesize *= COMPRESSIONRATIO
+        return filesize * (sample.count(b'\n') + 1) // len(sample)
+
+    @staticmethod
+    def _digestchunk(run: dict, partitions: int, value: tuple) -> list:
+        """
+        Method to get the digests and line numbers of the unique keys of a
+        chunk of records, split by partition, one dict of partition to pair
+        of arrays per key
+        :param run: settings of the run as built by _run()
+        :param partitions: number of partitions
+        :param value: (sequence number, line numbers, list of positional
+                      records)
+        """
+        _, lines, rows = value
+        return [unique.partitiondigests(
+                    *unique.keydigests(rows=rows, lines=lines,
+                                       positions=positions),
+                    partitions=partitions)
+                for _, positions, _ in run['Keys']]
+
+    @staticmethod
+    def _markduplicates(chunks, duplicates: list):
+        """
+        Generator method to add the (record index, failure) of the duplicate
+        keys of each chunk to the chunk
+        :param chunks: chunks as yielded by _trackpositions()
+        :param duplicates: failure and sorted line numbers of the duplicates
+                           of each key, as given by _findduplicates()
+        """
+        for seq, lines, rows in chunks:
+            marks = list()
+            if lines:
+                positions = None
+                for fail, found in duplicates:
+                    lo = bisect_left(found, lines[0])
+                    hi = bisect_right(found, lines[-1])
+                    if lo == hi:
+                        continue
+                    if positions is None:
+                        positions = {line: i for i, line in enumerate(lines)}
+                    marks.extend((positions[line], fail)
+                                 for line in found[lo:hi])
+            yield seq, lines, rows, marks
+
+    def _newreader(self, fb, position: list = None, columns: tuple = None):
+        """
+        Method to get the reader of the records of a file opened in binary
+        mode: a raw splitter when the config sets Quoting to none, a csv
+        reader otherwise
+        :param fb: file opened in binary mode, decompressing or not
+        :param position: list to keep the byte offset of the reader in, for
+                         checkpoints
+        :param columns: positions of the fields the raw splitter decodes,
+                        None for all
+        """
+        encoding = self._dictconfig['Encoding']
+        delimiter = self._dictconfig['_Delimiter']
+        if self._dictconfig['_RawSplit']:
+            return reader.RawReader(fb=fb, encoding=encoding,
+                                    delimiter=delimiter, position=position,
+                                    columns=columns)
+        if position is not None:
+            return csv.reader(reader.iterlines(fb=fb, encoding=encoding,
+                                               position=position),
+                              delimiter=delimiter)
+        return csv.reader(io.TextIOWrapper(fb, encoding=encoding),
+                          delimiter=delimiter)
+
+    @staticmethod
+    def _chunkrows(chunk: tuple) -> int:
+        """
+        Method to get the number of records of a chunk of _readchunks()
+        """
+        return len(chunk[2])
+
+    @staticmethod
+    def _overmemory(limit: int) -> bool:
+        """
+        Method to check the resident memory of the process against a limit
+        in bytes
+        """
+        return helper.residentmemory() > limit
+
+    @staticmethod
+    def _trackpositions(chunks, csvreader, position: list, linebase: int,
+                        positions: deque):
+        """
+        Generator method to pass on the chunks of _readchunks() to the
+        workers, recording the byte offset and line after the last record of
+        each chunk in positions
+        :param chunks: chunks as yielded by _readchunks()
+        :param csvreader: csv reader the chunks are read from
+        :param position: byte offset of the reader, as kept by
+                         reader.iterlines()
+        :param linebase: number of lines before the ones of the reader
+        :param positions: deque to append the positions to, or None
+        """
+        for seq, lines, rows, _ in chunks:
+            if positions is not None:
+                positions.append((position[0], linebase + csvreader.line_num))
+            yield seq, lines, rows
+
+    @staticmethod
+    def _savecheckpoint(checkpoint: Checkpoint, counts: dict, offset: int,
+                        line: int, outputfile: str, out) -> None:
+        """
+        Method to save a checkpoint after the chunk ending at the given
+        offset and line, once the output written so far is on disk
+        """
+        if out:
+            out.flush()
+            os.fsync(out.fileno())
+        checkpoint.save(state={
+            'Offset': offset,
+            'Line': line,
+            'TotalRecordsAnalysed': counts['TotalRecordsAnalysed'],
+            'RecordsPassed': counts['RecordsPassed'],
+            'RecordsFailed': counts['RecordsFailed'],
+            'ErrorCount': counts['ErrorCount'],
+            'CacheStats': counts['CacheStats'],
+            'OutputFile': outputfile,
+            'OutputSize': out.tell() if out else 0,
+            'Index': counts['Index'].todict() if 'Index' in counts else None,
+            'Profile': {k: v.todict()
+                        for k, v in counts.get('Profile', {}).items()}
+        })
+
+    def _addchunk(self, result: dict, counts: dict, records: bool,
+                  run: dict, value: dict) -> dict:
+        """
+        Method to add the counts of a chunk to the running counts and to
+        the result. Returns the chunk counts, with records as dicts of
+        header and value if the run streams records
+        :param result: validation result
+        :param counts: running counts as returned by _newcounts()
+        :param records: set to True if the run streams records
+        :param run: settings of the run as built by _run()
+        :param value: counts of a chunk
+        """
+        self._addcounts(counts, value)
+        for k in ('TotalRecordsAnalysed', 'RecordsPassed', 'RecordsFailed'):
+            result['Results'][k] = counts[k]
+        if records:
+            fieldnames = run['Fieldnames']
+            value['Records'] = [(line, dict(zip(fieldnames, row)), failures)
+                                for line, row, failures in value['Records']]
+        return value
+
+    @staticmethod
+    def _checkbudget(counts: dict, value: dict, budget: tuple) -> dict:
+        """
+        Method to check the failure budget after a chunk.
+        Returns None while the budget holds, or the line of the failing
+        record that exceeded it and the reason
+        :param counts: running counts as returned by _newcounts()
+        :param value: counts of the last chunk, with the lines of its
+                      failing records
+        :param budget: (max failing records, max failing records ratio)
+        """
+        maxfailures, maxfailureratio = budget
+        failed = counts['RecordsFailed']
+        if maxfailures is not None and failed > maxfailures:
+            lines = value['FailedLines']
+            return {'Line': lines[maxfailures - failed + len(lines)],
+                    'Reason': 'More than {maxfailures} records failed'
+                    .format(maxfailures=maxfailures)}
+        if maxfailureratio is not None and \
+           failed > maxfailureratio * counts['TotalRecordsAnalysed']:
+            return {'Line': value['FailedLines'][-1],
+                    'Reason': 'More than {ratio:.2%} of the records failed'
+                    .format(ratio=maxfailureratio)}
+        return None
+
+    def getresult(self, outputdir: str = None, **kwargs) -> dict:
+        """
+        Method to invoke validation process
+        Specifying output dir will write all the field level errors along
+        with original records in txt tab delimited format.
+        There will be 2 additional columns `_is_error` and `_error_desc`
+        for error flag and error description respectively
+        The other options are listed in the README
+        """
+        log.info('Starting file validation process')
+        starttime = time.time()
+        result = self._newresult()
+        for _ in self._run(result=result, outputdir=outputdir, **kwargs):
+            pass
+        log.info('Process complete')
+        runtime = round((time.time() - starttime)/60)
+        log.info('Run time: {runtime} mins'.format(runtime=runtime))
+        return result
+
+    def iterresults(self, failuresonly: bool = False, **kwargs):
+        """
+        Generator method to stream the validation results as the validation
+        progresses, with a bounded number of chunks in memory.
+        Yields (line_number, record, errors) for every record, or for the
+        failing records only with failuresonly set. The record is a dict of
+        header and value, and errors is {} for a valid record or a dict
+        with the `Error` descriptions and the `ErrorCount` per check.
+        Filename and header errors are yielded first, with line number 0
+        and 1 respectively and None as record.
+        See getresult() for the other options
+        """
+        result = self._newresult()
+        for d in self._run(result=result,
+                           records='failures' if failuresonly else 'all',
+                           **kwargs):
+            yield from self._iterchunk(value=d)
+
+    @classmethod
+    def _iterchunk(cls, value: dict):
+        """
+        Generator method to get the (line_number, record, errors) of a
+        filename or header error, or of the records of a chunk, as yielded
+        by _run()
+        :param value: error or counts of a chunk
+        """
+        if 'Level' in value:
+            yield (0 if value['Level'] == 'Filename' else 1), None, value
+            return
+        for line, record, failures in value['Records']:
+            yield line, record, cls._asresult(failures=failures)
+
+    def _samplerows(self, samplesize: int, method: str, rnd) -> tuple:
+        """
+        Method to read the header and a sample of the records of the source
+        file. Returns the header, the sampled positional records and the
+        method actually used, as seeking falls back to reservoir sampling
+        when the file is compressed or cannot be split on newline bytes
+        :param samplesize: number of records to sample
+        :param method: 'seek' or 'reservoir'
+        :param rnd: random.Random instance
+        """
+        encoding = self._dictconfig['Encoding']
+        delimiter = self._dictconfig['_Delimiter']
+        compression = reader.compression(path=self._sourcefile)
+        with reader.opentext(path=self._sourcefile, encoding=encoding,
+                             compression=compression) as fo:
+            csvreader = csv.reader(fo, delimiter=delimiter)
+            fieldnames = next(csvreader, [])
+            if method == 'seek' and (csvreader.line_num > 1 or compression or
+                                     not reader.isasciicompatible(encoding)):
+                log.info('Cannot seek into the file, sampling all records')
+                method = 'reservoir'
+            if method == 'reservoir':
+                # Algorithm R, each record is kept with equal probability
+                rows = list()
+                for i, row in enumerate(filter(None, csvreader)):
+                    if i < samplesize:
+                        rows.append(row)
+                    else:
+                        j = rnd.randrange(i + 1)
+                        if j < samplesize:
+                            rows[j] = row
+                return fieldnames, rows, method
+        with open(file=self._sourcefile, mode='rb') as fb:
+            start = len(fb.readline())
+        lines = reader.samplelines(path=self._sourcefile, start=start,
+                                   count=samplesize, rnd=rnd)
+        # A line with an odd number of quotes is part of a record spanning
+        # lines, and cannot be parsed on its own
+        lines = [line.decode(encoding) for line in lines
+                 if line.strip() and not line.count(b'"') % 2]
+        return fieldnames, list(csv.reader(lines, delimiter=delimiter)), \
+            method
+
+    def getsample(self, samplesize: int = 1000, method: str = 'seek',
+                  confidence: float = 0.95, seed: int = None) -> dict:
+        """
+        Method to estimate the failure rates of the fields from a random
+        sample of the records, for a quick go/no-go on a large file.
+        The filename and the header are validated as with getresult().
+        Set method to 'seek' to read records around random offsets of the
+        file, which is fast but favours longer records, or to 'reservoir' to
+        read all the records and keep a uniform sample of them.
+        Returns the failure rate of the records and of each check with its
+        Wilson score interval at the given confidence level
+        :param samplesize: number of records to sample
+        :param method: 'seek' or 'reservoir'
+        :param confidence: confidence level of the intervals
+        :param seed: seed of the random sample, for repeatable samples
+        """
+        if method not in ('seek', 'reservoir'):
+            raise ValueError('method must be "seek" or "reservoir"')
+        result = self._newresult()
+        del result['Results']['OutputFile']
+        result['Results']['ErrorDetails'].extend(self._checkfilename())
+        fieldnames, rows, method = self._samplerows(
+            samplesize=samplesize, method=method, rnd=random.Random(seed))
+        result['Results']['ErrorDetails'].extend(
+            self._checkheader(fieldnames=fieldnames))
+        if not self._dictconfig['ValidateColumn']:
+            return result
+        log.info('Validating a sample of {count} records'
+                 .format(count=len(rows)))
+        failures = batch.validatebatch(plan=self._getplan(fieldnames),
+                                       rows=rows)
+        checks = dict()
+        for fails in failures.values():
+            for name in {f[0] for f in fails}:
+                checks[name] = checks.get(name, 0) + 1
+
+        def estimate(count):
+            lower, upper = helper.wilsoninterval(
+                count=count, total=len(rows), confidence=confidence)
+            return {'Failed': count,
+                    'Rate': count / len(rows) if rows else 0.0,
+                    'Lower': lower, 'Upper': upper}
+
+        result['Results'].update({
+            'TotalRecordsAnalysed': len(rows),
+            'RecordsPassed': len(rows) - len(failures),
+            'RecordsFailed': len(failures),
+            'Sample': {'Method': method, 'Confidence': confidence,
+                       'Records': estimate(len(failures)),
+                       'Checks': {name: estimate(count) for name, count
+                                  in sorted(checks.items())}}
+        })
+        return result
+
+    def follow(self, interval: float = 1.0, idletimeout: float = None,
+               outputdir: str = None, usebatch: bool = True):
+        """
+        Generator method to validate a file that is still being appended
+        to. The filename and the header are validated once, then only the
+        complete lines appended since the last poll, every interval seconds.
+        Yields a report for every FOLLOWBYTES of new records, with the
+        running totals under `Results`, in the same shape as the result of
+        getresult(), and the counts and failing records of the new records
+        under `Increment`. A file replaced by a new one (new inode or
+        truncated) is followed from its start, header included: a last
+        report of the replaced file is yielded with `Replaced` set and
+        without `Increment`, then the totals and the filename and header
+        errors start over, and the output file gets a new header.
+        Stops once no new line was appended for idletimeout seconds, or
+        when the caller stops iterating.
+        Specifying output dir appends the annotated records to an output
+        file as they are validated
+        :param interval: number of seconds between two polls
+        :param idletimeout: number of idle seconds to stop after, never by
+                            default
+        :param outputdir: output dir
+        :param usebatch: set to False to validate record by record
+        """
+        encoding = self._dictconfig['Encoding']
+        if not reader.isasciicompatible(encoding=encoding):
+            raise ValueError('Following a file needs an encoding in which a'
+                             ' newline is a single byte')
+        if os.path.exists(self._sourcefile) and \
+           reader.compression(path=self._sourcefile):
+            raise ValueError('A compressed file cannot be followed')
+        if outputdir and not os.path.isdir(outputdir):
+            raise NotADirectoryError('The given path is not a valid dir path')
+        errors = self._checkfilename()
+        totals = self._newcounts()
+        outputfile = None
+        out = None
+        run = None
+        inode = None
+        offset = 0
+        line = 0
+        idle = 0.0
+        try:
+            while True:
+                try:
+                    stat = os.stat(self._sourcefile)
+                except FileNotFoundError:
+                    stat = None
+                if stat and (stat.st_ino != inode or stat.st_size < offset):
+                    if inode is not None:
+                        log.info('Source file replaced, following the new'
+                                 ' one from its start')
+                        if out:
+                            fo.flush()
+                        report = self._followreport(errors=errors,
+                                                    totals=totals,
+                                                    increment=None,
+                                                    outputfile=outputfile)
+                        report['Replaced'] = True
+                        yield report
+                        errors = self._checkfilename()
+                        totals = self._newcounts()
+                    inode = stat.st_ino
+                    offset = 0
+                    line = 0
+                    run = None
+                data = b''
+                if stat and stat.st_size > offset:
+                    data = self._readappended(offset=offset,
+                                              end=stat.st_size)
+                if not data:
+                    if idletimeout is not None and idle >= idletimeout:
+                        return
+                    time.sleep(interval)
+                    idle += interval
+                    continue
+                idle = 0.0
+                offset += len(data)
+                csvreader = csv.reader(
+                    reader.iterlines(fb=io.BytesIO(data), encoding=encoding,
+                                     position=[0]),
+                    delimiter=self._dictconfig['_Delimiter'])
+                if run is None:
+                    log.info('Validating header')
+                    fieldnames = next(csvreader, [])
+                    errors.extend(self._checkheader(fieldnames=fieldnames))
+                    if not self._dictconfig['ValidateColumn']:
+                        yield self._followreport(errors=errors,
+                                                 totals=totals,
+                                                 increment=None,
+                                                 outputfile=outputfile)
+                        return
+                    run = self._newrun(
+                        fieldnames=fieldnames,
+                        plan=self._getplan(fieldnames=fieldnames),
+                        usebatch=usebatch, records='failures')
+                    if outputdir and out is None:
+                        outfilename = '{name}_{time}.txt'.format(
+                            name=os.path.basename(self._sourcefile),
+                            time=datetime.now().strftime('%Y%m%d%H%M%S'))
+                        outputfile = os.path.join(outputdir, outfilename)
+                        fo, out = writer.openshard(path=outputfile)
+                    if out:
+                        # Records of a replaced file follow a header of
+                        # their own
+                        out.writerow(fieldnames + ['_is_error',
+                                                   '_error_desc'])
+                increment = self._newcounts()
+                increment['Records'] = list()
+                for _, lines, rows, _ in self._readchunks(
+                        csvreader=csvreader, withlines=True, linebase=line):
+                    d = self._processchunk(run=run, value=rows, lines=lines,
+                                           out=out)
+                    self._addcounts(increment, d)
+                    increment['Records'].extend(
+                        (n, dict(zip(run['Fieldnames'], row)),
+                         self._asresult(failures=f))
+                        for n, row, f in d['Records'])
+                line += csvreader.line_num
+                self._addcounts(totals, increment)
+                if out:
+                    fo.flush()
+                yield self._followreport(errors=errors, totals=totals,
+                                         increment=increment,
+                                         outputfile=outputfile)
+        finally:
+            if out:
+                fo.close()
+
+    def _readappended(self, offset: int, end: int) -> bytes:
+        """
+        Method to read the complete lines of the followed file from offset,
+        FOLLOWBYTES at a time, or more when a record does not fit in them
+        :param offset: offset to read from
+        :param end: size of the file
+        """
+        size = FOLLOWBYTES
+        with open(file=self._sourcefile, mode='rb') as fb:
+            while True:
+                fb.seek(offset)
+                data = fb.read(min(size, end - offset))
+                complete = reader.completeprefix(data)
+                if complete or offset + len(data) >= end:
+                    return data[:complete]
+                size *= 2
+
+    @staticmethod
+    def _followreport(errors: list, totals: dict, increment: dict,
+                      outputfile: str) -> dict:
+        """
+        Method to build a report of follow()
+        :param errors: filename and header errors
+        :param totals: running counts as returned by _newcounts()
+        :param increment: counts of the new records, with their failures
+        :param outputfile: output file path
+        """
+        report = {'Results': {
+            'TotalRecordsAnalysed': totals['TotalRecordsAnalysed'],
+            'RecordsPassed': totals['RecordsPassed'],
+            'RecordsFailed': totals['RecordsFailed'],
+            'ErrorDetails': list(errors) + ([dict(totals['ErrorCount'])]
+                                            if totals['ErrorCount'] else []),
+            'OutputFile': outputfile
+        }}
+        if increment is not None:
+            report['Increment'] = {
+                k: increment[k] for k in ('TotalRecordsAnalysed',
+                                          'RecordsPassed', 'RecordsFailed',
+                                          'ErrorCount', 'Records')}
+        return report
 
 
 # if __name__ == '__main__':
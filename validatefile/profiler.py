@@ -0,0 +1,229 @@
+"""
+Module with the column profiles collected alongside the validation
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from collections import Counter
+import hashlib
+import heapq
+import math
+from validatefile import helper
+
+
+# Number of most frequent values reported per column
+TOPK = 10
+# Number of value counters kept per column to find the most frequent ones
+TOPKCAPACITY = 100
+# Bits of the hash picking the register of a HyperLogLog, 2 ** 12
+# registers give a standard error of about 1.6%
+PRECISION = 12
+
+
+class HyperLogLog(object):
+    """
+    HyperLogLog estimate of the number of distinct values, on the 8 byte
+    blake2b digest of the values. Sketches merge by keeping the largest
+    register of each
+    """
+    __slots__ = ('_precision', '_registers')
+
+    def __init__(self, precision: int = PRECISION) -> None:
+        self._precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def update(self, values) -> None:
+        """
+        Method to add values to the sketch
+        :param values: iterable of str values
+        """
+        registers = self._registers
+        p = self._precision
+        bits = 64 - p
+        mask = (1 << bits) - 1
+        for v in values:
+            h = int.from_bytes(hashlib.blake2b(
+                v.encode('utf-8', 'surrogatepass'), digest_size=8).digest(),
+                'big')
+            idx = h >> bits
+            rank = bits - (h & mask).bit_length() + 1
+            if rank > registers[idx]:
+                registers[idx] = rank
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Method to add the values of another sketch of the same precision
+        """
+        self._registers = bytearray(map(max, self._registers,
+                                        other._registers))
+
+    def estimate(self) -> int:
+        """
+        Method to get the estimated number of distinct values
+        """
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def todict(self) -> dict:
+        return {'Precision': self._precision,
+                'Registers': self._registers.hex()}
+
+    @classmethod
+    def fromdict(cls, value: dict) -> 'HyperLogLog':
+        hll = cls(precision=value['Precision'])
+        hll._registers = bytearray.fromhex(value['Registers'])
+        return hll
+
+
+class ColumnProfile(object):
+    """
+    Profile of the values of a column: the count of values, of null
+    (missing from short records) and empty values, the minimum and maximum
+    length, the minimum and maximum of the numeric values, the most
+    frequent values and the distinct count estimate. Profiles of chunks
+    merge in any order. The most frequent values are kept as a mergeable
+    Misra-Gries summary, so their counts are lower bounds once more
+    distinct values than the capacity were seen
+    """
+    __slots__ = ('count', 'nulls', 'empty', 'minlength', 'maxlength',
+                 'minnumber', 'maxnumber', 'numbers', '_topk', '_hll')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.nulls = 0
+        self.empty = 0
+        self.minlength = None
+        self.maxlength = None
+        self.minnumber = None
+        self.maxnumber = None
+        self.numbers = 0
+        self._topk = dict()
+        self._hll = HyperLogLog()
+
+    def update(self, values: list) -> 'ColumnProfile':
+        """
+        Method to add the values of a chunk to the profile. Values are
+        counted first, so each distinct value of the chunk is measured,
+        classified and hashed once
+        :param values: values of the column, None for a missing field
+        """
+        counter = Counter(values)
+        self.count += len(values)
+        self.nulls += counter.pop(None, 0)
+        if not counter:
+            return self
+        distinct = list(counter)
+        self.empty += sum(counter[v] for v in distinct if helper.isempty(v))
+        lengths = [len(v) for v in distinct]
+        self._minmax('length', min(lengths), max(lengths))
+        numbers = [(helper.tonumber(value=v, kind=k), counter[v])
+                   for v, k in zip(distinct, helper.classifynumbers(distinct))
+                   if k]
+        # Integers too long to convert are left out of the min and max
+        numbers = [(n, c) for n, c in numbers if n is not None]
+        if numbers:
+            self.numbers += sum(c for _, c in numbers)
+            self._minmax('number', min(n for n, _ in numbers),
+                         max(n for n, _ in numbers))
+        self._hll.update(distinct)
+        self._mergetopk(counter)
+        return self
+
+    def _minmax(self, name: str, low, high) -> None:
+        current = getattr(self, 'min' + name)
+        if current is None or low < current:
+            setattr(self, 'min' + name, low)
+        current = getattr(self, 'max' + name)
+        if current is None or high > current:
+            setattr(self, 'max' + name, high)
+
+    def _mergetopk(self, counts: dict) -> None:
+        """
+        Method to merge value counts into the Misra-Gries summary, keeping
+        at most TOPKCAPACITY counters
+        """
+        merged = Counter(self._topk)
+        merged.update(counts)
+        if len(merged) > TOPKCAPACITY:
+            cut = heapq.nlargest(TOPKCAPACITY + 1, merged.values())[-1]
+            merged = {k: v - cut for k, v in merged.items() if v > cut}
+        self._topk = dict(merged)
+
+    def merge(self, other: 'ColumnProfile') -> None:
+        """
+        Method to add the profile of another chunk of the column
+        """
+        for k in ('count', 'nulls', 'empty', 'numbers'):
+            setattr(self, k, getattr(self, k) + getattr(other, k))
+        for name in ('length', 'number'):
+            if getattr(other, 'min' + name) is not None:
+                self._minmax(name, getattr(other, 'min' + name),
+                             getattr(other, 'max' + name))
+        self._hll.merge(other._hll)
+        self._mergetopk(other._topk)
+
+    def summary(self, topk: int = TOPK) -> dict:
+        """
+        Method to get the profile as reported in the result
+        """
+        top = sorted(self._topk.items(), key=lambda kv: (-kv[1], kv[0]))
+        return {'Count': self.count,
+                'Nulls': self.nulls,
+                'Empty': self.empty,
+                'MinLength': self.minlength,
+                'MaxLength': self.maxlength,
+                'Numeric': self.numbers,
+                'MinNumber': self.minnumber,
+                'MaxNumber': self.maxnumber,
+                'TopValues': [list(kv) for kv in top[:topk]],
+                'Distinct': self._hll.estimate()}
+
+    def todict(self) -> dict:
+        """
+        Method to get the full state as a json serializable dict
+        """
+        return {'Count': self.count, 'Nulls': self.nulls,
+                'Empty': self.empty, 'MinLength': self.minlength,
+                'MaxLength': self.maxlength, 'Numeric': self.numbers,
+                'MinNumber': self.minnumber, 'MaxNumber': self.maxnumber,
+                'TopK': self._topk, 'HyperLogLog': self._hll.todict()}
+
+    @classmethod
+    def fromdict(cls, value: dict) -> 'ColumnProfile':
+        """
+        Method to load a profile from the dict returned by todict()
+        """
+        profile = cls()
+        profile.count = value['Count']
+        profile.nulls = value['Nulls']
+        profile.empty = value['Empty']
+        profile.minlength = value['MinLength']
+        profile.maxlength = value['MaxLength']
+        profile.numbers = value['Numeric']
+        profile.minnumber = value['MinNumber']
+        profile.maxnumber = value['MaxNumber']
+        profile._topk = dict(value['TopK'])
+        profile._hll = HyperLogLog.fromdict(value['HyperLogLog'])
+        return profile
+
+
+def profilechunk(rows: list, columns: tuple) -> dict:
+    """
+    Function that profiles the given columns of a chunk of records.
+    Returns a dict of field name to ColumnProfile
+    :param rows: positional records
+    :param columns: (position, field name) of the columns to profile
+    """
+    ret = dict()
+    for idx, fieldname in columns:
+        values = [row[idx] if idx < len(row) else None for row in rows]
+        ret[fieldname] = ColumnProfile().update(values)
+    return ret
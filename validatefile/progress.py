@@ -0,0 +1,77 @@
+"""
+Module to report the progress of a validation run
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import time
+
+
+class ProgressMeter(object):
+    """
+    Class that reports the records validated and the bytes of the source
+    file consumed to a callback, along with the current rate and the
+    estimated time left. It is updated once per chunk and reports at most
+    once per interval, the first update being always reported. The end of
+    the run is always reported, with an ETA of 0, even if it repeats the
+    last report
+    """
+
+    __slots__ = ('_callback', '_interval', '_totalbytes', '_started',
+                 '_reportedat', '_last', '_pending')
+
+    def __init__(self, callback, interval: float, totalbytes: int) -> None:
+        """
+        :param callback: callable called with each report
+        :param interval: minimum number of seconds between two reports
+        :param totalbytes: size of the source file
+        """
+        self._callback = callback
+        self._interval = interval or 0
+        self._totalbytes = totalbytes
+        self._started = time.monotonic()
+        self._reportedat = None
+        # (time, records, bytes) of the last report
+        self._last = (self._started, 0, 0)
+        self._pending = None
+
+    def update(self, records: int, position: int) -> None:
+        """
+        Method to record the records validated and bytes consumed so far,
+        reporting them if the interval has passed
+        """
+        now = time.monotonic()
+        self._pending = (records, position)
+        if self._reportedat is None or \
+           now - self._reportedat >= self._interval:
+            self._report(now=now)
+
+    def finish(self, records: int) -> None:
+        """
+        Method to report the end of the run
+        """
+        self._pending = (records, self._totalbytes)
+        self._report(now=time.monotonic(), done=True)
+
+    def _report(self, now: float, done: bool = False) -> None:
+        records, position = self._pending
+        lasttime, lastrecords, _ = self._last
+        elapsed = now - self._started
+        rate = (records - lastrecords) / (now - lasttime) \
+            if now > lasttime else 0.0
+        eta = None
+        if done:
+            eta = 0.0
+        elif position and self._totalbytes:
+            eta = max(self._totalbytes - position, 0) * elapsed / position
+        self._callback({'Records': records,
+                        'Bytes': position,
+                        'TotalBytes': self._totalbytes,
+                        'RecordsPerSecond': rate,
+                        'Elapsed': elapsed,
+                        'ETA': eta})
+        self._reportedat = now
+        self._last = (now, records, position)
+        self._pending = None
@@ -0,0 +1,348 @@
+"""
+Module with helper functions to read the source file, compressed or not,
+in byte ranges
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import bz2
+import csv
+import gzip
+import lzma
+import mmap
+import os
+import zlib
+
+# Leading bytes of the compressed formats
+MAGICS = ((b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'xz'))
+# Extensions of the compressed formats, used for empty files
+EXTENSIONS = {'.gz': 'gzip', '.gzip': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+# Start of a gzip member: magic bytes and the deflate method
+GZIPMEMBER = b'\x1f\x8b\x08'
+# Bytes read at a time by RawReader
+BLOCKSIZE = 1 << 20
+
+
+def compression(path: str) -> str:
+    """
+    Function that returns the compression of the file, 'gzip', 'bz2' or
+    'xz', from its leading bytes, or from its extension when it is empty.
+    Returns None for an uncompressed file
+    """
+    with open(file=path, mode='rb') as fb:
+        head = fb.read(6)
+    for magic, name in MAGICS:
+        if head.startswith(magic):
+            return name
+    # A level digit follows the bzip2 magic
+    if head[:3] == b'BZh' and head[3:4].isdigit() and head[3:4] != b'0':
+        return 'bz2'
+    if not head:
+        return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    return None
+
+
+def uncompressedname(path: str) -> str:
+    """
+    Function that returns the file name without its compression extension
+    """
+    name = os.path.basename(path)
+    root, ext = os.path.splitext(name)
+    return root if ext.lower() in EXTENSIONS else name
+
+
+def openbinary(path: str, compression: str = None):
+    """
+    Function that opens the file for binary reading, decompressing it on
+    the fly
+    """
+    if compression:
+        return OPENERS[compression](path, mode='rb')
+    return open(file=path, mode='rb')
+
+
+def opentext(path: str, encoding: str, compression: str = None):
+    """
+    Function that opens the file for text reading, decompressing it on the
+    fly
+    """
+    if compression:
+        return OPENERS[compression](path, mode='rt', encoding=encoding)
+    return open(file=path, mode='r', encoding=encoding)
+
+
+def consumed(fo) -> int:
+    """
+    Function that returns the number of bytes of the file on disk read so
+    far by a file object, decompressing or not, from the position of its
+    file descriptor. It runs ahead of the records by the read buffers
+    """
+    return os.lseek(fo.fileno(), 0, os.SEEK_CUR)
+
+
+def isasciicompatible(encoding: str) -> bool:
+    """
+    Function that checks whether a newline and a quote are single bytes in
+    the given encoding, so the file can be split on raw newline bytes
+    """
+    try:
+        return '\n"'.encode(encoding) == b'\n"'
+    except LookupError:
+        return False
+
+
+def splitranges(path: str, start: int, size: int) -> list:
+    """
+    Function that splits the file from the start offset into newline
+    aligned (start, end) byte ranges of roughly the given size
+    """
+    filesize = os.path.getsize(path)
+    if start >= filesize:
+        return []
+    ranges = list()
+    with open(file=path, mode='rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while start < filesize:
+            end = mm.find(b'\n', min(start + size, filesize) - 1)
+            end = filesize if end == -1 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def readrange(path: str, start: int, end: int, encoding: str = None):
+    """
+    Function that reads and decodes a byte range of the file, or returns
+    its bytes as they are without encoding
+    """
+    with open(file=path, mode='rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    return data.decode(encoding) if encoding else data
+
+
+def samplelines(path: str, start: int, count: int, rnd) -> list:
+    """
+    Function that picks up to count distinct lines of the file from the
+    start offset, by seeking to random offsets and taking the line around
+    each one. Longer lines are more likely to be picked. Lines are returned
+    as bytes without their newline, in file order
+    """
+    filesize = os.path.getsize(path)
+    if start >= filesize:
+        return []
+    lines = dict()
+    with open(file=path, mode='rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Give up after a few misses per line, on files with few lines
+        for _ in range(3 * count):
+            offset = rnd.randrange(start, filesize)
+            linestart = mm.rfind(b'\n', start, offset) + 1 or start
+            if linestart not in lines:
+                end = mm.find(b'\n', offset)
+                lines[linestart] = mm[linestart:filesize if end == -1
+                                      else end]
+                if len(lines) == count:
+                    break
+    return [lines[k] for k in sorted(lines)]
+
+
+def iterlines(fb, encoding: str, position: list):
+    """
+    Generator function that decodes the lines of a file opened in binary
+    mode one at a time, keeping position[0] at the byte offset after the
+    last line read. The encoding must be ascii compatible
+    """
+    for line in fb:
+        position[0] += len(line)
+        yield line.decode(encoding)
+
+
+def completeprefix(data: bytes) -> int:
+    """
+    Function that returns the length of the part of the data made of
+    complete lines, cutting before a last record whose quoted field is still
+    open
+    """
+    end = data.rfind(b'\n') + 1
+    if not data.count(b'"', 0, end) % 2:
+        return end
+    complete = 0
+    quotes = 0
+    start = 0
+    while start < end:
+        newline = data.find(b'\n', start, end)
+        quotes += data.count(b'"', start, newline)
+        start = newline + 1
+        if not quotes % 2:
+            complete = start
+    return complete
+
+
+def memberranges(path: str, size: int) -> list:
+    """
+    Function that splits a gzip file into (start, end) byte ranges of
+    roughly the given size, starting where a gzip member seems to start.
+    The member magic bytes can also occur inside compressed data, so the
+    ranges are only candidates, see readmembers()
+    """
+    filesize = os.path.getsize(path)
+    starts = [0]
+    with open(file=path, mode='rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = mm.find(GZIPMEMBER, size)
+        while start != -1:
+            starts.append(start)
+            start = mm.find(GZIPMEMBER, start + size)
+    return list(zip(starts, starts[1:] + [filesize]))
+
+
+def readmembers(path: str, start: int, end: int) -> bytes:
+    """
+    Function that decompresses the gzip members of a byte range of the
+    file. Raises ValueError when the range does not hold whole members
+    """
+    with open(file=path, mode='rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    members = list()
+    try:
+        while data:
+            decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            members.append(decompressor.decompress(data))
+            if not decompressor.eof:
+                raise ValueError('Range ends inside a gzip member')
+            data = decompressor.unused_data
+    except zlib.error as e:
+        raise ValueError('Range does not start with a gzip member') from e
+    return b''.join(members)
+
+
+class RawReader(object):
+    """
+    Reader of delimited records without quoting, a faster stand-in for
+    csv.reader over a file opened in binary mode. The file is read in
+    blocks of bytes that are split into lines and fields with bytes.split,
+    and only the fields at the positions in columns are decoded, the
+    others being left empty, or all of them when columns is None. Once a
+    block holds a quote character, the rest of the file is parsed by
+    csv.reader instead. line_num counts the lines read like the one of
+    csv.reader, and position[0], if given, is kept at the byte offset after
+    the last line read. The encoding must be ascii compatible
+    """
+
+    __slots__ = ('columns', '_fb', '_encoding', '_delimiter', '_position',
+                 '_lines', '_csvreader', '_rows')
+
+    def __init__(self, fb, encoding: str, delimiter: str,
+                 position: list = None, columns: tuple = None) -> None:
+        """
+        :param fb: file opened in binary mode, decompressing or not
+        :param encoding: encoding of the file
+        :param delimiter: field delimiter
+        :param position: list holding the byte offset of the reader
+        :param columns: positions of the fields to be decoded
+        """
+        self.columns = columns
+        self._fb = fb
+        self._encoding = encoding
+        self._delimiter = delimiter
+        self._position = position
+        self._lines = 0
+        self._csvreader = None
+        self._rows = self._iterrows()
+
+    @property
+    def line_num(self) -> int:
+        if self._csvreader is not None:
+            return self._lines + self._csvreader.line_num
+        return self._lines
+
+    def __iter__(self):
+        return self._rows
+
+    def __next__(self) -> list:
+        return next(self._rows)
+
+    def _iterrows(self):
+        position = self._position
+        rest = b''
+        while True:
+            block = self._fb.read(BLOCKSIZE)
+            if b'"' in block:
+                self._csvreader = csv.reader(
+                    self._iterlines(data=rest + block),
+                    delimiter=self._delimiter)
+                yield from self._csvreader
+                return
+            if not block:
+                break
+            lines = (rest + block).split(b'\n')
+            rest = lines.pop()
+            rows = self._split(lines=lines)
+            if position is None:
+                for row in rows:
+                    self._lines += 1
+                    yield row
+            else:
+                for line, row in zip(lines, rows):
+                    self._lines += 1
+                    position[0] += len(line) + 1
+                    yield row
+        if rest:
+            self._lines += 1
+            if position is not None:
+                position[0] += len(rest)
+            yield self._split(lines=[rest])[0]
+
+    def _split(self, lines: list) -> list:
+        """
+        Method to split lines into records, blank lines giving empty ones
+        """
+        encoding = self._encoding
+        if any(line[-1:] == b'\r' for line in lines):
+            lines = [line[:-1] if line[-1:] == b'\r' else line
+                     for line in lines]
+        columns = self.columns
+        if columns is None:
+            delimiter = self._delimiter
+            return [line.decode(encoding).split(delimiter) if line else []
+                    for line in lines]
+        delimiter = self._delimiter.encode(encoding)
+        rows = list()
+        for line in lines:
+            if not line:
+                rows.append([])
+                continue
+            fields = line.split(delimiter)
+            row = [''] * len(fields)
+            for i in columns:
+                if i < len(fields):
+                    row[i] = fields[i].decode(encoding)
+            rows.append(row)
+        return rows
+
+    def _iterlines(self, data: bytes):
+        """
+        Generator method to decode the lines of the file from the given
+        bytes on, for csv.reader
+        """
+        position = self._position
+        while True:
+            lines = data.split(b'\n')
+            data = lines.pop()
+            for line in lines:
+                if position is not None:
+                    position[0] += len(line) + 1
+                yield (line + b'\n').decode(self._encoding)
+            block = self._fb.read(BLOCKSIZE)
+            if not block:
+                break
+            data += block
+        if data:
+            if position is not None:
+                position[0] += len(data)
+            yield data.decode(self._encoding)
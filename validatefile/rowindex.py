@@ -0,0 +1,132 @@
+"""
+Module with the index of the failing line numbers per check and column
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+from array import array
+import heapq
+
+
+# Unsigned 8 byte line numbers
+TYPECODE = 'Q'
+
+
+class RowIndex(object):
+    """
+    Index of the line numbers of the failing records, per (check, column).
+    Each set is a sorted array of 8 byte line numbers, so indexes built by
+    the workers for consecutive chunks merge by appending
+    """
+    __slots__ = ('_rows',)
+
+    def __init__(self) -> None:
+        self._rows = dict()
+
+    @classmethod
+    def fromfailures(cls, lines: list, failures: dict) -> 'RowIndex':
+        """
+        Method to build the index of a chunk of records
+        :param lines: line numbers of the records of the chunk
+        :param failures: dict of record position to its failures, a failure
+                         being a (checkname, fieldname, description) tuple
+        """
+        index = cls()
+        rows = index._rows
+        for i in sorted(failures):
+            line = lines[i]
+            for checkname, fieldname, _ in failures[i]:
+                key = (checkname, fieldname)
+                arr = rows.get(key)
+                if arr is None:
+                    arr = rows[key] = array(TYPECODE)
+                arr.append(line)
+        return index
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RowIndex):
+            return NotImplemented
+        return self._rows == other._rows
+
+    def __repr__(self) -> str:
+        return 'RowIndex({counts})'.format(
+            counts={k: len(v) for k, v in sorted(self._rows.items())})
+
+    def keys(self) -> list:
+        """
+        Method to get the (checkname, fieldname) pairs with failing records
+        """
+        return sorted(self._rows)
+
+    def shift(self, offset: int) -> None:
+        """
+        Method to add an offset to all line numbers, to turn the line
+        numbers relative to a byte range into absolute ones
+        """
+        if offset:
+            self._rows = {k: array(TYPECODE, (n + offset for n in v))
+                          for k, v in self._rows.items()}
+
+    def merge(self, other: 'RowIndex') -> None:
+        """
+        Method to add the line numbers of another index. Appending the
+        index of a later chunk keeps the arrays sorted without sorting
+        """
+        for key, arr in other._rows.items():
+            mine = self._rows.get(key)
+            if mine is None:
+                self._rows[key] = array(TYPECODE, arr)
+                continue
+            start = len(mine)
+            mine.extend(arr)
+            if start and arr and arr[0] < mine[start - 1]:
+                self._rows[key] = array(TYPECODE, sorted(mine))
+
+    def rows(self, check: str = None, column: str = None) -> array:
+        """
+        Method to get the sorted line numbers of the records failing any
+        check on any column matching the given check name and column name,
+        all checks or all columns when not given
+        """
+        arrs = [v for (c, f), v in self._rows.items()
+                if (check is None or c == check) and
+                (column is None or f == column)]
+        if len(arrs) == 1:
+            return array(TYPECODE, arrs[0])
+        ret = array(TYPECODE)
+        last = None
+        for n in heapq.merge(*arrs):
+            if n != last:
+                ret.append(n)
+                last = n
+        return ret
+
+    def count(self, check: str = None, column: str = None) -> int:
+        """
+        Method to get the number of records failing any check on any column
+        matching the given check name and column name
+        """
+        return len(self.rows(check=check, column=column))
+
+    def todict(self) -> dict:
+        """
+        Method to get the index as a json serializable dict of check name
+        to column name to line numbers
+        """
+        ret = dict()
+        for (checkname, fieldname), arr in sorted(self._rows.items()):
+            ret.setdefault(checkname, dict())[fieldname] = arr.tolist()
+        return ret
+
+    @classmethod
+    def fromdict(cls, value: dict) -> 'RowIndex':
+        """
+        Method to load an index from the dict returned by todict()
+        """
+        index = cls()
+        for checkname, columns in value.items():
+            for fieldname, lines in columns.items():
+                index._rows[(checkname, fieldname)] = array(TYPECODE, lines)
+        return index
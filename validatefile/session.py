@@ -0,0 +1,179 @@
+"""
+Module to validate many files with one long-lived worker pool
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+import glob
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from validatefile.cache import resetruncaches
+from validatefile.executor import BoundedPool
+from validatefile.main import ValidateFile
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class ValidationSession(object):
+    """
+    Class to validate many files with one worker pool, started on first use
+    and kept until the session is closed. Configs are parsed and compiled
+    once per config file, and reparsed only when the file changes.
+    The validations running at once share a bound of twice the workers on
+    the chunks queued or being validated.
+    Use it as a context manager, or call close() when done
+    """
+
+    __slots__ = ('_processes', '_pool', '_bounded', '_configs', '_lock')
+
+    def __init__(self, processes: int = None) -> None:
+        """
+        :param processes: number of worker processes, the cpu count by
+                          default
+        """
+        self._processes = processes or os.cpu_count() or 1
+        self._pool = None
+        self._bounded = None
+        self._configs = dict()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'ValidationSession':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def pool(self):
+        """
+        Worker pool of the session
+        """
+        with self._lock:
+            if self._configs is None:
+                raise ValueError('Session is closed')
+            if self._pool is None:
+                self._pool = Pool(processes=self._processes,
+                                  initializer=resetruncaches)
+                self._bounded = BoundedPool(pool=self._pool,
+                                            maxinflight=2 * self._processes)
+            return self._pool
+
+    @property
+    def _boundedpool(self) -> BoundedPool:
+        """
+        Worker pool of the session as used by its validations
+        """
+        self.pool
+        return self._bounded
+
+    def close(self) -> None:
+        """
+        Method to let the running validations finish and stop the workers
+        """
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+            self._bounded = None
+            self._configs = None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    def _getvalidator(self, configfile: str,
+                      sourcefile: str) -> ValidateFile:
+        """
+        Method to get the validator of a source file, reusing the parsed
+        config of the config file
+        :param configfile: path of the config file
+        :param sourcefile: path of the file to validate
+        """
+        if self._configs is None:
+            raise ValueError('Session is closed')
+        configfile = os.path.abspath(configfile)
+        mtime = os.stat(configfile).st_mtime_ns
+        val = self._configs.get(configfile)
+        if val is None or val[0] != mtime:
+            val = (mtime, ValidateFile(configfile=configfile,
+                                       sourcefile=None))
+            self._configs[configfile] = val
+        return val[1].withsource(sourcefile=sourcefile)
+
+    def validate(self, configfile: str, sourcefile: str, **kwargs) -> dict:
+        """
+        Method to validate a file, see ValidateFile.getresult() for the
+        parameters and the result
+        :param configfile: path of the config file
+        :param sourcefile: path of the file to validate
+        """
+        val = self._getvalidator(configfile=configfile,
+                                 sourcefile=sourcefile)
+        return val.getresult(pool=self._boundedpool,
+                             workers=self._processes, **kwargs)
+
+    def iterresults(self, configfile: str, sourcefile: str, **kwargs):
+        """
+        Generator method to stream the results of a file, see
+        ValidateFile.iterresults() for the parameters and what is yielded
+        :param configfile: path of the config file
+        :param sourcefile: path of the file to validate
+        """
+        val = self._getvalidator(configfile=configfile,
+                                 sourcefile=sourcefile)
+        return val.iterresults(pool=self._boundedpool,
+                               workers=self._processes, **kwargs)
+
+    @staticmethod
+    def _getsources(sources) -> list:
+        """
+        Method to get the source files of a dir path, a glob pattern or a
+        list of file paths, in sorted order
+        """
+        if isinstance(sources, str):
+            if os.path.isdir(sources):
+                sources = [os.path.join(sources, f)
+                           for f in os.listdir(sources)]
+            else:
+                sources = glob.glob(sources)
+            sources = sorted(f for f in sources if os.path.isfile(f))
+        return list(sources)
+
+    def validatemany(self, configfile: str, sources, **kwargs) -> dict:
+        """
+        Method to validate many files with the same config. A few files are
+        read at a time, so the workers are kept busy with small files too.
+        Returns the result of each file by its path, or {'Error': repr of
+        the exception} for a file whose validation failed
+        :param configfile: path of the config file
+        :param sources: dir path, glob pattern or list of file paths
+        See ValidateFile.getresult() for the other parameters
+        """
+        if self._configs is None:
+            raise ValueError('Session is closed')
+        sources = self._getsources(sources)
+        log.info('Validating {count} files'.format(count=len(sources)))
+        with ThreadPoolExecutor(max_workers=self._processes) as executor:
+            results = executor.map(
+                lambda sourcefile: self._validateone(configfile=configfile,
+                                                     sourcefile=sourcefile,
+                                                     **kwargs),
+                sources)
+            return dict(zip(sources, results))
+
+    def _validateone(self, configfile: str, sourcefile: str,
+                     **kwargs) -> dict:
+        """
+        Method to validate a file of validatemany(), so that a file failing
+        to validate does not lose the results of the others
+        """
+        try:
+            return self.validate(configfile=configfile,
+                                 sourcefile=sourcefile, **kwargs)
+        except Exception as e:
+            log.exception('Validation of {path} failed'
+                          .format(path=sourcefile))
+            return {'Error': repr(e)}
@@ -0,0 +1,226 @@
+"""
+Module to find the records sharing a key across a file in bounded memory.
+Keys are reduced to fixed-width digests, hash-partitioned, spilled to disk
+past a memory limit and deduplicated a few partitions at a time, as many
+as fit the memory limit
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import os
+import shutil
+import tempfile
+from array import array
+from hashlib import blake2b
+
+
+DIGESTSIZE = 8
+# Fewest and most partitions. The low bits of a digest choose its
+# partition and the bits from the 17th on its slot in the hash set
+PARTITIONS = 64
+MAXPARTITIONS = 1 << 16
+# Bytes held per record: its digest and its line number
+ENTRYSIZE = 16
+# Bytes per record to deduplicate a partition: its entry and the up to four
+# slots of the hash set it takes
+DEDUPSIZE = ENTRYSIZE + 4 * DIGESTSIZE
+# Separator of the fields of a composite key
+KEYSEPARATOR = '\x1f'
+
+
+def keydigests(rows: list, lines: list, positions: tuple) -> tuple:
+    """
+    Function that returns the digests of the key of the records and their
+    line numbers, as two arrays. Records whose key fields are all empty or
+    missing have no key and are left out
+    :param rows: positional records
+    :param lines: line numbers of the records
+    :param positions: positions of the fields of the key
+    """
+    digests = array('Q')
+    keylines = array('Q')
+    single = positions[0] if len(positions) == 1 else None
+    for line, row in zip(lines, rows):
+        if single is not None:
+            key = row[single] if single < len(row) else ''
+        else:
+            values = [row[i] if i < len(row) else '' for i in positions]
+            key = KEYSEPARATOR.join(values) if any(values) else ''
+        if not key:
+            continue
+        digests.append(int.from_bytes(
+            blake2b(key.encode('utf-8'), digest_size=DIGESTSIZE).digest(),
+            'little'))
+        keylines.append(line)
+    return digests, keylines
+
+
+def partitioncount(entries: int, maxmemory: int) -> int:
+    """
+    Function that returns the number of partitions, a power of 2, that
+    splits entries into partitions deduplicated in half of maxmemory bytes
+    each, leaving room for uneven partitions
+    :param entries: estimated number of entries
+    :param maxmemory: bytes of memory of the deduplication
+    """
+    needed = 2 * entries * DEDUPSIZE // max(maxmemory, 1) + 1
+    return min(MAXPARTITIONS,
+               max(PARTITIONS, 1 << (needed - 1).bit_length()))
+
+
+def partitiondigests(digests: array, lines: array, partitions: int) -> dict:
+    """
+    Function that splits the digests of a chunk and their line numbers by
+    partition, keeping their order. Returns the pair of arrays of each
+    partition that has any
+    :param digests: digests as returned by keydigests()
+    :param lines: line numbers of the digests
+    :param partitions: number of partitions, a power of 2
+    """
+    mask = partitions - 1
+    parts = dict()
+    for digest, line in zip(digests, lines):
+        part = parts.get(digest & mask)
+        if part is None:
+            part = parts[digest & mask] = (array('Q'), array('Q'))
+        part[0].append(digest)
+        part[1].append(line)
+    return parts
+
+
+def dedupsize(value: tuple) -> int:
+    """
+    Function that returns the bytes of memory findduplicates() takes to
+    deduplicate a partition
+    :param value: partition as taken by findduplicates()
+    """
+    paths, digests, _ = value
+    entries = len(digests)
+    if paths:
+        entries += os.path.getsize(paths[0]) // DIGESTSIZE
+    return entries * DEDUPSIZE
+
+
+def findduplicates(value: tuple) -> array:
+    """
+    Function that returns the line numbers of the records of a partition
+    whose digest was seen on an earlier line, using an open addressing
+    hash set held in an array. Entries must be in line order
+    :param value: (spill file paths or None, digests, line numbers) of the
+                  entries kept in memory
+    """
+    paths, digests, lines = value
+    if paths:
+        spilled = array('Q')
+        spilledlines = array('Q')
+        with open(paths[0], 'rb') as fo:
+            spilled.frombytes(fo.read())
+        with open(paths[1], 'rb') as fo:
+            spilledlines.frombytes(fo.read())
+        spilled.extend(digests)
+        spilledlines.extend(lines)
+        digests, lines = spilled, spilledlines
+    size = 1 << max(len(digests) * 2, 1).bit_length()
+    mask = size - 1
+    table = array('Q', bytes(size * DIGESTSIZE))
+    duplicates = array('Q')
+    for digest, line in zip(digests, lines):
+        # Zero marks an empty slot, and the low bits choose the partition
+        digest = digest or 1
+        slot = (digest >> 16) & mask
+        while True:
+            found = table[slot]
+            if not found:
+                table[slot] = digest
+                break
+            if found == digest:
+                duplicates.append(line)
+                break
+            slot = (slot + 1) & mask
+    return duplicates
+
+
+class KeyIndex(object):
+    """
+    Class that collects the digests of the keys of a file with their line
+    numbers, hash-partitioned by the workers, and spills the partitions to
+    disk once they hold more than maxmemory bytes. Digests are 8 bytes, so
+    two distinct keys collide with a probability of about n * n / 2 ** 65
+    over n records
+    """
+
+    __slots__ = ('_partitions', '_maxmemory', '_entries', '_spilldir',
+                 '_digests', '_lines', '_spilled')
+
+    def __init__(self, maxmemory: int, partitions: int = PARTITIONS,
+                 spilldir: str = None) -> None:
+        """
+        :param maxmemory: bytes of entries kept in memory before spilling
+        :param partitions: number of partitions, a power of 2
+        :param spilldir: dir to create the spill dir in, the system
+                         temporary dir by default
+        """
+        self._partitions = partitions
+        self._maxmemory = maxmemory
+        self._entries = 0
+        self._spilldir = spilldir
+        self._digests = [array('Q') for _ in range(partitions)]
+        self._lines = [array('Q') for _ in range(partitions)]
+        # Spill file paths of each partition, once spilled
+        self._spilled = None
+
+    def add(self, parts: dict) -> None:
+        """
+        Method to add the digests of a chunk of records, in line order
+        :param parts: digests and line numbers of each partition, as
+                      returned by partitiondigests()
+        """
+        for p, (digests, lines) in parts.items():
+            self._digests[p].extend(digests)
+            self._lines[p].extend(lines)
+            self._entries += len(digests)
+        if self._entries * ENTRYSIZE > self._maxmemory:
+            self.spill()
+
+    def spill(self) -> None:
+        """
+        Method to append the entries held in memory to the spill files of
+        their partitions
+        """
+        if self._spilled is None:
+            spilldir = tempfile.mkdtemp(prefix='.unique_', dir=self._spilldir)
+            self._spilled = [
+                (os.path.join(spilldir, '{p}.digests'.format(p=p)),
+                 os.path.join(spilldir, '{p}.lines'.format(p=p)))
+                for p in range(self._partitions)]
+        for p, paths in enumerate(self._spilled):
+            for path, entries in zip(paths, (self._digests[p],
+                                             self._lines[p])):
+                with open(path, 'ab') as fo:
+                    entries.tofile(fo)
+        self._digests = [array('Q') for _ in range(self._partitions)]
+        self._lines = [array('Q') for _ in range(self._partitions)]
+        self._entries = 0
+
+    @property
+    def spilled(self) -> bool:
+        return self._spilled is not None
+
+    def partitions(self):
+        """
+        Generator method to get the partitions as taken by findduplicates()
+        """
+        for p in range(self._partitions):
+            yield (self._spilled[p] if self._spilled else None,
+                   self._digests[p], self._lines[p])
+
+    def close(self) -> None:
+        """
+        Method to remove the spill files
+        """
+        if self._spilled:
+            shutil.rmtree(os.path.dirname(self._spilled[0][0]),
+                          ignore_errors=True)
+            self._spilled = None
@@ -0,0 +1,118 @@
+"""
+Module with helper functions to write the validation output through
+per-chunk shard files, optionally gzip compressed. Each shard is a gzip
+member of its own, so the concatenated output is a valid gzip file
+"""
+
+__Author__ = "Ram J"
+__PyVersion__ = 3
+
+
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+
+# Buffer size of the shard files and of the merge copy
+BUFSIZE = 1024 * 1024
+
+
+def shardpath(sharddir: str, seq: int) -> str:
+    """
+    Function that returns the path of the shard file of a chunk
+    """
+    return os.path.join(sharddir, '{seq:010d}.txt'.format(seq=seq))
+
+
+def openshard(path: str, compress: bool = False):
+    """
+    Function that opens a shard file for buffered writing.
+    Returns the file object and a tab delimited csv writer on it
+    """
+    if compress:
+        fo = io.TextIOWrapper(
+            io.BufferedWriter(gzip.GzipFile(filename=path, mode='wb'),
+                              buffer_size=BUFSIZE),
+            encoding='utf-8', newline='')
+    else:
+        fo = open(file=path, mode='w', encoding='utf-8', newline='',
+                  buffering=BUFSIZE)
+    return fo, csv.writer(fo, delimiter='\t')
+
+
+def mergeshards(fieldnames: list, shards: list, outputfile: str,
+                compress: bool = False) -> None:
+    """
+    Function that writes the header and concatenates the shard files, in
+    the given order, into the output file
+    """
+    with open(file=outputfile, mode='wb') as fo:
+        writeheader(fieldnames=fieldnames, fo=fo, compress=compress)
+        for path in shards:
+            with open(file=path, mode='rb') as fi:
+                _copyfile(src=fi, dst=fo)
+
+
+def writeheader(fieldnames: list, fo, compress: bool = False) -> None:
+    """
+    Function that writes the header to the output file opened in binary
+    mode
+    """
+    writerows(rows=[fieldnames], fo=fo, compress=compress)
+    fo.flush()
+
+
+def writerows(rows: list, fo, compress: bool = False) -> None:
+    """
+    Function that writes records to the output file opened in binary mode,
+    as a gzip member of their own if compressed
+    """
+    text = io.StringIO(newline='')
+    csv.writer(text, delimiter='\t').writerows(rows)
+    data = text.getvalue().encode('utf-8')
+    fo.write(gzip.compress(data) if compress and data else data)
+
+
+def writelegend(legend: dict, path: str) -> None:
+    """
+    Function that writes the legend of the compact error codes as json
+    """
+    with open(file=path, mode='w', encoding='utf-8') as fo:
+        json.dump(legend, fo, indent=2)
+
+
+def appendshard(path: str, fo) -> None:
+    """
+    Function that appends a shard file to the output file opened in binary
+    mode, and removes the shard
+    """
+    with open(file=path, mode='rb') as fi:
+        _copyfile(src=fi, dst=fo)
+    os.remove(path)
+
+
+def _copyfile(src, dst) -> None:
+    """
+    Function that appends the whole content of src to dst, in the kernel
+    where the platform allows it
+    """
+    size = os.fstat(src.fileno()).st_size
+    offset = 0
+    if hasattr(os, 'sendfile'):
+        try:
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset,
+                                   size - offset)
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            # Some platforms only send to sockets
+            if offset:
+                raise
+    if offset < size:
+        src.seek(offset)
+        shutil.copyfileobj(src, dst, BUFSIZE)
+        dst.flush()